@@ -17,7 +17,7 @@ class BottleError(Exception):
 
 class Bottle:
     """
-    A bottle contains doses of colored water (up to Bottle.MAX_DOSES)
+    A bottle contains doses of colored water (up to max_doses, Bottle.MAX_DOSES by default)
 
     The content of a bottle is a list of objects where each objet identifies a color.
 
@@ -29,19 +29,33 @@ class Bottle:
     """
 
     # Speedup properties for this class
-    __slots__ = "doses", "nb_doses"
+    # nb_top_doses caches the number of consecutive doses of the top color
+    __slots__ = "doses", "nb_doses", "nb_top_doses", "max_doses"
 
+    # Default capacity of the bottles (the bottles of a puzzle should have the same capacity)
     MAX_DOSES = 4
 
-    def __init__(self, doses: Sequence):
+    def __init__(self, doses: Sequence, max_doses: Optional[int] = None):
+        self.max_doses: int = Bottle.MAX_DOSES if max_doses is None else max_doses
         self.doses: list[Any] = [
             None,
-        ] * Bottle.MAX_DOSES
+        ] * self.max_doses
         self.nb_doses = 0
         for dose in doses:
             if dose is not None:
                 self.doses[self.nb_doses] = dose
                 self.nb_doses += 1
+        self.nb_top_doses = self._count_top_doses()
+
+    def _count_top_doses(self) -> int:
+        """@return number of consecutive doses of the top color (computed from doses)."""
+        if self.nb_doses == 0:
+            return 0
+        top_color = self.doses[self.nb_doses - 1]
+        nb = 1
+        while nb < self.nb_doses and self.doses[self.nb_doses - 1 - nb] == top_color:
+            nb += 1
+        return nb
 
     @property
     def is_empty(self) -> bool:
@@ -51,7 +65,7 @@ class Bottle:
     @property
     def is_full(self) -> bool:
         """@return True if the bottle is full."""
-        return self.nb_doses == Bottle.MAX_DOSES
+        return self.nb_doses == self.max_doses
 
     @property
     def colors(self) -> Set[Any]:
@@ -63,6 +77,16 @@ class Bottle:
         """Number of different colors in the bottle."""
         return len(self.colors)
 
+    @property
+    def is_single_color(self) -> bool:
+        """@return True if the bottle is not empty and holds only one color."""
+        return self.nb_doses != 0 and self.nb_top_doses == self.nb_doses
+
+    @property
+    def is_complete(self) -> bool:
+        """@return True if the bottle is full of only one color."""
+        return self.nb_top_doses == self.max_doses
+
     @property
     def top_color(self) -> Optional[Any]:
         """Top color in the bottle."""
@@ -70,6 +94,17 @@ class Bottle:
             return None
         return self.doses[self.nb_doses - 1]
 
+    @property
+    def nb_runs(self) -> int:
+        """Number of consecutive same color segments in the bottle (0 when empty)."""
+        nb = 0
+        previous_color = None
+        for i in range(self.nb_doses):
+            if self.doses[i] != previous_color:
+                nb += 1
+                previous_color = self.doses[i]
+        return nb
+
     def iter_doses(self):
         """Iterator on every dose holding a color in the bottle."""
         for i in range(self.nb_doses):
@@ -94,13 +129,17 @@ class Bottle:
         ret = self.doses[self.nb_doses - 1]
         self.doses[self.nb_doses - 1] = None
         self.nb_doses -= 1
+        if self.nb_top_doses > 1:
+            self.nb_top_doses -= 1
+        else:
+            self.nb_top_doses = self._count_top_doses()
         return ret
 
     def can_push_dose(self, color: Any) -> bool:
         """@return True if one dose of the color can be poured into the bottle."""
         if self.nb_doses == 0:
             return True
-        if self.nb_doses == Bottle.MAX_DOSES:
+        if self.nb_doses == self.max_doses:
             return False
         return self.doses[self.nb_doses - 1] == color
 
@@ -108,6 +147,10 @@ class Bottle:
         """Pour one dose of the color into the bottle."""
         if not self.can_push_dose(color):
             raise BottleError(f"Cannot pour {color} into {self}")
+        if self.nb_doses == 0:
+            self.nb_top_doses = 1
+        else:
+            self.nb_top_doses += 1
         self.doses[self.nb_doses] = color
         self.nb_doses += 1
 
@@ -120,7 +163,7 @@ class Bottle:
             return False
         if destination.nb_doses == 0:
             return True
-        if destination.nb_doses == Bottle.MAX_DOSES:
+        if destination.nb_doses == destination.max_doses:
             return False
         # Same top colors ?
         return (
@@ -133,12 +176,12 @@ class Bottle:
         (Quite the same as is_possible_to_pour_one_dose_into but also checking for
         interesting resulting situation)
         """
-        if destination.nb_doses == Bottle.MAX_DOSES:
+        if destination.nb_doses == destination.max_doses:
             return False  # destination is full
         if self.nb_doses == 0:
             return False  # Source empty
         if destination.nb_doses == 0:
-            if self.nb_different_colors == 1:
+            if self.nb_top_doses == self.nb_doses:
                 return False  # Because de resulting situation would be the same
             return True
         # Same top colors ?
@@ -150,17 +193,41 @@ class Bottle:
         """Pour all possible doses of top color into the destination bottle.
         @return number of poured doses
         """
-        nb_doses = 0
-        while self.is_possible_to_pour_one_dose_into(destination):
-            color = self.pop_dose()
-            destination.push_dose(color)
-            nb_doses += 1
+        if not self.is_possible_to_pour_one_dose_into(destination):
+            return 0
+
+        # The whole top segment is moved at once, up to the free space in destination
+        nb_doses = min(self.nb_top_doses, destination.max_doses - destination.nb_doses)
+        source_end = self.nb_doses
+        source_start = source_end - nb_doses
+        destination_start = destination.nb_doses
+        destination.doses[destination_start : destination_start + nb_doses] = self.doses[
+            source_start:source_end
+        ]
+        self.doses[source_start:source_end] = [None] * nb_doses
+
+        # Update cached metadata
+        if destination_start == 0:
+            destination.nb_top_doses = nb_doses
+        else:
+            destination.nb_top_doses += nb_doses
+        destination.nb_doses += nb_doses
+        self.nb_doses = source_start
+        if nb_doses < self.nb_top_doses:
+            self.nb_top_doses -= nb_doses
+        else:
+            self.nb_top_doses = self._count_top_doses()
         return nb_doses
 
     def clone(self) -> Bottle:
         """@return Create a copy clone of the bottle."""
-        copy_list_doses = self.doses.copy()
-        return Bottle(copy_list_doses)
+        # Bypass __init__ as the content of the bottle is already consistent
+        copy_bottle = Bottle.__new__(Bottle)
+        copy_bottle.doses = self.doses.copy()
+        copy_bottle.nb_doses = self.nb_doses
+        copy_bottle.nb_top_doses = self.nb_top_doses
+        copy_bottle.max_doses = self.max_doses
+        return copy_bottle
 
     def __repr__(self):
         return f"<{self.doses[:self.nb_doses]}>"
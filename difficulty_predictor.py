@@ -0,0 +1,406 @@
+#! coding:utf-8
+
+"""
+The difficulty_predictor module predicts the search difficulty of a level before solving it
+and routes the level to the solving engine fitting this difficulty.
+
+Example (fit the model on the reports of batch runs with the 'auto' strategy):
+    python puzzle_cli.py levels.wsp --strategy auto --dispatch-log dispatch.jsonl
+    python difficulty_predictor.py dispatch.jsonl
+
+The features of a level (@see LevelFeatures) are computed in one pass on its doses, without
+creating any Puzzle. The difficulty is the log10 of the number of puzzles expanded by the DFS
+search, predicted by a linear model of the features (@see DEFAULT_COEFFICIENTS, fitted on
+random levels of 2 to 40 colors, @see puzzle_generator).
+
+Engines (@see ENGINE_OPTIONS for their level_solver.BatchOptions):
+- ENGINE_INLINE: DFS in the calling thread for trivial levels (no worker round trip) that are
+  also small (@see INLINE_MAX_NB_COLORS),
+- ENGINE_WORKER: weighted A* in a worker process for medium levels,
+- ENGINE_HEAVY: race of strategies in separate processes (@see portfolio_solver) for huge
+  levels.
+
+Every dispatch decision can be logged with the actual number of expansions of its engine
+(@see DispatchLog): the expansions of the DFS search of the inline engine measure the
+accuracy of the predictions and fit the model again (@see DifficultyPredictor.fit and the
+limits of these samples in iter_dispatch_samples).
+"""
+
+from __future__ import annotations
+
+import argparse
+from dataclasses import asdict, dataclass, replace
+import json
+import math
+import sys
+import threading
+from typing import Any, Iterable, Iterator, Optional, Sequence, Tuple
+
+from level_solver import BatchOptions
+from puzzle_io import Level
+
+# Features of the linear model (@see LevelFeatures)
+FEATURE_NAMES = (
+    "nb_bottles",
+    "nb_colors",
+    "capacity",
+    "nb_empty_bottles",
+    "spare_space",
+    "fragmentation",
+    "buried_doses",
+)
+
+# Intercept then one coefficient per feature of FEATURE_NAMES
+DEFAULT_COEFFICIENTS = (0.3924, -0.1532, 0.2278, 0.1642, 0.1245, 0.0121, 0.0174, -0.0189)
+
+# Engines
+ENGINE_INLINE = "inline"
+ENGINE_WORKER = "worker"
+ENGINE_HEAVY = "heavy"
+
+# Changes of the BatchOptions for each engine
+ENGINE_OPTIONS: dict[str, dict[str, Any]] = {
+    ENGINE_INLINE: {"strategy": "dfs", "move_ordering": "none", "decompose": False},
+    ENGINE_WORKER: {"strategy": "weighted", "weight": 2.0, "decompose": False},
+    ENGINE_HEAVY: {"strategy": "portfolio", "decompose": False},
+}
+
+# Maximum predicted log10 of the expansions of the inline and worker engines
+INLINE_MAX_LOG_EXPANSIONS = 2.5
+WORKER_MAX_LOG_EXPANSIONS = 3.7
+
+# Maximum number of colors of a level solved by the inline engine whatever its prediction:
+# the expansions of the DFS search grow much faster than the linear model beyond (a few
+# seconds or a timeout for some random levels of 15 to 20 colors predicted as trivial)
+INLINE_MAX_NB_COLORS = 12
+
+# Status of the searches whose expansions are the expansions of the whole search
+COMPLETED_STATUS = ("solved", "no solution")
+
+# Engines whose expansions are the predicted ones (expansions of the DFS search)
+PREDICTED_ENGINES = tuple(
+    engine for engine, options in ENGINE_OPTIONS.items() if options["strategy"] == "dfs"
+)
+
+# A prediction is accurate when it is within this factor of the actual expansions
+ACCURATE_FACTOR = 3.0
+
+
+@dataclass(frozen=True)
+class LevelFeatures:
+    """Features of a level predicting its search difficulty."""
+
+    nb_bottles: int
+    nb_colors: int
+    capacity: int
+    nb_empty_bottles: int
+    spare_space: int  # Free doses in all the bottles
+    fragmentation: int  # Color segments in the bottles beyond one per color
+    buried_doses: int  # Doses under the top color segment of their bottle
+
+    @classmethod
+    def from_level(cls, level: Level) -> LevelFeatures:
+        """@return the features of a level."""
+        colors = set()
+        nb_segments = 0
+        nb_doses = 0
+        buried_doses = 0
+        for doses in level.bottles:
+            colors.update(doses)
+            nb_doses += len(doses)
+            for i_dose, color in enumerate(doses):
+                if i_dose == 0 or doses[i_dose - 1] != color:
+                    nb_segments += 1
+            i_top = len(doses)
+            while i_top > 0 and doses[i_top - 1] == doses[-1]:
+                i_top -= 1
+            buried_doses += i_top
+        return cls(
+            nb_bottles=len(level.bottles),
+            nb_colors=len(colors),
+            capacity=level.capacity,
+            nb_empty_bottles=sum(1 for doses in level.bottles if not doses),
+            spare_space=level.capacity * len(level.bottles) - nb_doses,
+            fragmentation=nb_segments - len(colors),
+            buried_doses=buried_doses,
+        )
+
+    def values(self) -> Tuple[float, ...]:
+        """@return the values of the features in FEATURE_NAMES order."""
+        return tuple(float(getattr(self, name)) for name in FEATURE_NAMES)
+
+
+@dataclass(frozen=True)
+class Prediction:
+    """Predicted difficulty of a level and the engine chosen to solve it."""
+
+    features: LevelFeatures
+    log_expansions: float  # Predicted log10 of the expansions of the DFS search
+    engine: str
+
+    @property
+    def expansions(self) -> float:
+        """Predicted number of expansions."""
+        return 10.0**self.log_expansions
+
+    def options(self, options: BatchOptions) -> BatchOptions:
+        """@return the options changed for the engine of the prediction."""
+        return replace(options, **ENGINE_OPTIONS[self.engine])
+
+    def to_json(self) -> dict[str, Any]:
+        """@return the prediction as a JSON object."""
+        return {
+            "engine": self.engine,
+            "log_expansions": round(self.log_expansions, 4),
+            "features": asdict(self.features),
+        }
+
+
+def _solve_linear_system(matrix: list[list[float]], vector: list[float]) -> list[float]:
+    """@return x such as matrix.x = vector (Gauss-Jordan elimination with partial pivoting)."""
+    size = len(vector)
+    rows = [matrix[i][:] + [vector[i]] for i in range(size)]
+    for i_column in range(size):
+        i_pivot = max(range(i_column, size), key=lambda i_row: abs(rows[i_row][i_column]))
+        rows[i_column], rows[i_pivot] = rows[i_pivot], rows[i_column]
+        pivot = rows[i_column][i_column]
+        if pivot == 0.0:
+            raise ValueError("Singular system: not enough different samples")
+        for i_row in range(size):
+            if i_row != i_column and rows[i_row][i_column]:
+                factor = rows[i_row][i_column] / pivot
+                rows[i_row] = [a - factor * b for a, b in zip(rows[i_row], rows[i_column])]
+    return [rows[i][size] / rows[i][i] for i in range(size)]
+
+
+class DifficultyPredictor:
+    """
+    Linear model of the log10 of the expansions of the DFS search given the level features.
+
+    coefficients: intercept then one coefficient per feature of FEATURE_NAMES.
+    inline_max: maximum predicted log10 of the expansions of the inline engine.
+    worker_max: maximum predicted log10 of the expansions of the worker engine.
+    inline_max_nb_colors: maximum number of colors of a level of the inline engine.
+    """
+
+    def __init__(
+        self,
+        coefficients: Sequence[float] = DEFAULT_COEFFICIENTS,
+        inline_max: float = INLINE_MAX_LOG_EXPANSIONS,
+        worker_max: float = WORKER_MAX_LOG_EXPANSIONS,
+        inline_max_nb_colors: int = INLINE_MAX_NB_COLORS,
+    ) -> None:
+        if len(coefficients) != len(FEATURE_NAMES) + 1:
+            raise ValueError(f"{len(FEATURE_NAMES) + 1} coefficients expected")
+        self.coefficients = tuple(coefficients)
+        self.inline_max = inline_max
+        self.worker_max = worker_max
+        self.inline_max_nb_colors = inline_max_nb_colors
+
+    def predict_log_expansions(self, features: LevelFeatures) -> float:
+        """@return the predicted log10 of the expansions (never negative)."""
+        log_expansions = self.coefficients[0] + sum(
+            coefficient * value
+            for coefficient, value in zip(self.coefficients[1:], features.values())
+        )
+        return max(0.0, log_expansions)
+
+    def predict(self, level: Level) -> Prediction:
+        """@return the prediction of the difficulty of a level and its engine."""
+        features = LevelFeatures.from_level(level)
+        log_expansions = self.predict_log_expansions(features)
+        if (
+            log_expansions <= self.inline_max
+            and features.nb_colors <= self.inline_max_nb_colors
+        ):
+            engine = ENGINE_INLINE
+        elif log_expansions <= self.worker_max:
+            engine = ENGINE_WORKER
+        else:
+            engine = ENGINE_HEAVY
+        return Prediction(features, log_expansions, engine)
+
+    @classmethod
+    def fit(
+        cls, samples: Iterable[Tuple[LevelFeatures, int]], ridge: float = 1e-3, **kwargs: Any
+    ) -> DifficultyPredictor:
+        """
+        @return the predictor fitted by least squares on (features, actual expansions) samples.
+        ridge: regularization of the coefficients of the features (not of the intercept).
+        kwargs: other arguments of the predictor.
+        """
+        size = len(FEATURE_NAMES) + 1
+        matrix = [[0.0] * size for _ in range(size)]
+        vector = [0.0] * size
+        for features, expansions in samples:
+            row = (1.0,) + features.values()
+            target = math.log10(max(1, expansions))
+            for i in range(size):
+                vector[i] += row[i] * target
+                for j in range(size):
+                    matrix[i][j] += row[i] * row[j]
+        for i in range(1, size):
+            matrix[i][i] += ridge
+        return cls(_solve_linear_system(matrix, vector), **kwargs)
+
+
+# Predictor of the 'auto' strategy (@see level_solver.solve_level)
+DIFFICULTY_PREDICTOR = DifficultyPredictor()
+
+
+class _EngineStatistics:
+    """Statistics of the levels dispatched to an engine."""
+
+    __slots__ = (
+        "nb_levels",
+        "nb_completed",
+        "sum_log_expansions",
+        "nb_predicted",
+        "sum_errors",
+        "sum_absolute_errors",
+        "nb_accurate",
+    )
+
+    def __init__(self) -> None:
+        self.nb_levels = 0
+        # Expansions of the engine in its completed searches
+        self.nb_completed = 0
+        self.sum_log_expansions = 0.0
+        # Accuracy of the predictions of the completed searches (@see PREDICTED_ENGINES)
+        self.nb_predicted = 0
+        self.sum_errors = 0.0
+        self.sum_absolute_errors = 0.0
+        self.nb_accurate = 0
+
+    def to_json(self) -> dict[str, Any]:
+        """@return the statistics as a JSON object."""
+        json_statistics: dict[str, Any] = {
+            "count": self.nb_levels,
+            "completed": self.nb_completed,
+        }
+        if self.nb_completed:
+            json_statistics["mean_log_expansions"] = round(
+                self.sum_log_expansions / self.nb_completed, 4
+            )
+        if self.nb_predicted:
+            json_statistics.update(
+                mean_error=round(self.sum_errors / self.nb_predicted, 4),
+                mean_absolute_error=round(self.sum_absolute_errors / self.nb_predicted, 4),
+                accurate=round(self.nb_accurate / self.nb_predicted, 4),
+            )
+        return json_statistics
+
+
+class DispatchLog:
+    """
+    Log of the dispatch decisions with the accuracy of their predictions.
+    Level reports with a prediction (@see level_solver.solve_level) are recorded, optionally
+    appended to a JSON Lines file (one JSON object per report) to fit the models later.
+    The expansions of a report are the expansions of its engine: DFS search (inline), weighted
+    A* search (worker) or sum of the racing strategies (heavy). They are only measured on the
+    completed searches (@see COMPLETED_STATUS): the expansions of a timeout are not the
+    expansions of the whole search. The prediction is the expansions of the DFS search: its
+    accuracy is only measured for the engines solving by DFS (@see PREDICTED_ENGINES).
+    Thread safe.
+
+    path: JSON Lines file of the records (None for statistics only).
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._engine_statistics: dict[str, _EngineStatistics] = {}
+
+    def record(self, report: dict[str, Any]) -> None:
+        """Record the report of a level (ignored without prediction)."""
+        prediction = report.get("prediction")
+        if prediction is None:
+            return
+        log_expansions = math.log10(max(1, report["expansions"]))
+        error = prediction["log_expansions"] - log_expansions
+        with self._lock:
+            statistics = self._engine_statistics.get(prediction["engine"])
+            if statistics is None:
+                statistics = self._engine_statistics[prediction["engine"]] = _EngineStatistics()
+            statistics.nb_levels += 1
+            if report["status"] in COMPLETED_STATUS:
+                statistics.nb_completed += 1
+                statistics.sum_log_expansions += log_expansions
+                if prediction["engine"] in PREDICTED_ENGINES:
+                    statistics.nb_predicted += 1
+                    statistics.sum_errors += error
+                    statistics.sum_absolute_errors += abs(error)
+                    statistics.nb_accurate += abs(error) <= math.log10(ACCURATE_FACTOR)
+            if self.path is not None:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(report) + "\n")
+
+    def statistics(self) -> dict[str, dict[str, Any]]:
+        """
+        @return for each engine: number of levels and of completed searches, mean log10 of the
+        expansions of the engine in its completed searches and, for the engines solving by DFS
+        (@see PREDICTED_ENGINES), mean error (bias) and mean absolute error of the predicted
+        log10 of the expansions and fraction of accurate predictions.
+        """
+        with self._lock:
+            return {
+                engine: statistics.to_json()
+                for engine, statistics in sorted(self._engine_statistics.items())
+            }
+
+
+def iter_dispatch_samples(path: str) -> Iterator[Tuple[LevelFeatures, int]]:
+    """
+    Iterator on the (features, actual expansions) samples of a dispatch log file.
+    Only the levels solved by a DFS engine (@see PREDICTED_ENGINES) are samples of the DFS
+    search difficulty: the expansions of the other engines are not comparable.
+    Limitation: these levels are the ones predicted as trivial (log10 of the expansions up to
+    inline_max), a level wrongly predicted as hard never gives a sample. A model fitted on these
+    samples only is biased to easy levels: the samples should be completed by DFS searches of
+    harder levels (for example the levels of a puzzle_generator corpus).
+    """
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            report = json.loads(line)
+            prediction = report.get("prediction")
+            if prediction is None or report["status"] not in COMPLETED_STATUS:
+                continue
+            if prediction["engine"] not in PREDICTED_ENGINES:
+                continue
+            yield LevelFeatures(**prediction["features"]), report["expansions"]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Command line entry point: fit the model on dispatch logs. @return exit code."""
+    parser = argparse.ArgumentParser(
+        description="Fit the difficulty predictor on dispatch logs (JSON Lines)."
+    )
+    parser.add_argument("paths", nargs="+", help="Dispatch log files")
+    parser.add_argument("--ridge", type=float, default=1e-3, help="Regularization")
+    args = parser.parse_args(argv)
+
+    try:
+        samples = [sample for path in args.paths for sample in iter_dispatch_samples(path)]
+        predictor = DifficultyPredictor.fit(samples, args.ridge)
+    except (OSError, ValueError, KeyError, TypeError) as err:
+        print(f"Cannot fit the predictor: {err}", file=sys.stderr)
+        return 1
+    errors = [
+        predictor.predict_log_expansions(features) - math.log10(max(1, expansions))
+        for features, expansions in samples
+    ]
+    print(
+        json.dumps(
+            {
+                "nb_samples": len(samples),
+                "coefficients": [round(coefficient, 4) for coefficient in predictor.coefficients],
+                "mean_absolute_error": round(sum(map(abs, errors)) / len(errors), 4),
+            }
+        )
+    )
+    return 0
+
+
+if __name__ == "__main__":
+
+    sys.exit(main())
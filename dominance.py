@@ -0,0 +1,115 @@
+#! coding:utf-8
+
+"""
+The dominance module recognizes puzzles dominated by already expanded puzzles.
+
+A puzzle P2 dominates a puzzle P1 when both have the same mixed bottles (bottles holding more
+than one color) and when, for each color, the single color bottles of P2 are obtained by
+merging single color bottles of P1 (P2 is 'further along', for example with an extra
+completed bottle and an extra empty bottle).
+Merging two single color bottles of the same color never increases the number of moves to
+solve a puzzle, so:
+- a puzzle dominated by an expanded puzzle does not need to be expanded to find a solution,
+- when the expanded puzzle was reached with a lower or equal number of moves, the shortest
+  solution is not lost either.
+
+Puzzles are indexed by a cheap signature (their sorted mixed bottles) and the dominance is only
+checked between puzzles having the same signature.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from typing import Any, Hashable, Tuple
+
+from puzzle import Puzzle
+
+# Sizes (number of doses) of the single color bottles of each color
+SingleColorProfile = dict[Any, Tuple[int, ...]]
+
+
+def _signature_and_profile(puzzle: Puzzle) -> Tuple[Hashable, SingleColorProfile]:
+    """@return (signature, single color profile) of the puzzle."""
+    mixed_bottles = []
+    sizes: dict[Any, list[int]] = {}
+    for bottle in puzzle.iter_bottles():
+        if bottle.nb_doses == 0:
+            continue
+        if bottle.nb_top_doses == bottle.nb_doses:
+            sizes.setdefault(bottle.doses[0], []).append(bottle.nb_doses)
+        else:
+            mixed_bottles.append(tuple(bottle.doses[: bottle.nb_doses]))
+    try:
+        mixed_bottles.sort()
+        signature: Hashable = tuple(mixed_bottles)
+    except TypeError:
+        # Colors that cannot be sorted
+        signature = frozenset(Counter(mixed_bottles).items())
+    profile = {color: tuple(sorted(nbs, reverse=True)) for color, nbs in sizes.items()}
+    return signature, profile
+
+
+def _is_merge_of(merged: Tuple[int, ...], parts: Tuple[int, ...]) -> bool:
+    """
+    @return True if the parts (sorted in decreasing order) can be grouped so that the sums
+    of the groups are the merged sizes.
+    """
+    if len(merged) > len(parts) or sum(merged) != sum(parts):
+        return False
+    remaining = list(merged)
+
+    def assign(i_part: int) -> bool:
+        if i_part == len(parts):
+            return True
+        tried = set()
+        for i, nb in enumerate(remaining):
+            if nb >= parts[i_part] and nb not in tried:
+                tried.add(nb)
+                remaining[i] -= parts[i_part]
+                if assign(i_part + 1):
+                    return True
+                remaining[i] += parts[i_part]
+        return False
+
+    return assign(0)
+
+
+class DominanceTable:
+    """
+    Table of the expanded puzzles to recognize dominated puzzles.
+
+    nb_checks: number of puzzles checked.
+    nb_dominated: number of dominated puzzles found (expansions saved).
+    """
+
+    def __init__(self) -> None:
+        self._table: dict[Hashable, list[Tuple[SingleColorProfile, float]]] = {}
+        self.nb_checks = 0
+        self.nb_dominated = 0
+
+    def add(self, puzzle: Puzzle, depth: float) -> None:
+        """Add an expanded puzzle reached in 'depth' moves (or cost)."""
+        signature, profile = _signature_and_profile(puzzle)
+        self._table.setdefault(signature, []).append((profile, depth))
+
+    def is_dominated(self, puzzle: Puzzle, depth: float) -> bool:
+        """
+        @return True if the puzzle reached in 'depth' moves (or cost) is dominated by an
+        expanded puzzle reached in a lower or equal depth.
+        """
+        self.nb_checks += 1
+        signature, profile = _signature_and_profile(puzzle)
+        for other_profile, other_depth in self._table.get(signature, ()):
+            if other_depth > depth or other_profile == profile:
+                continue  # Same puzzles are not dominated (@see Puzzle.state_key)
+            if all(
+                _is_merge_of(other_profile.get(color, ()), sizes)
+                for color, sizes in profile.items()
+            ):
+                self.nb_dominated += 1
+                return True
+        return False
+
+    def __len__(self) -> int:
+        """@return number of puzzles in the table."""
+        return sum(len(entries) for entries in self._table.values())
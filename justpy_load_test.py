@@ -0,0 +1,565 @@
+#! coding:utf-8
+
+"""
+justpy_load_test module simulates concurrent users of the justpy_puzzle_solver web server.
+
+Every simulated session does what a user does with a browser: load the page, set the puzzle
+sizes, select the colors and fill the bottles, solve the puzzle and step through the solution.
+The events are sent on the JustPy websocket as the browser does. The puzzles of the sessions
+are generated with varied difficulties and bottle capacities (@see DIFFICULTIES).
+
+Example (starts a local server on port 8000 and runs 200 sessions, 50 at once):
+    python justpy_load_test.py --start-server --port 8000 --sessions 200 --concurrency 50
+
+The report gives the latency percentiles of every operation, the throughput, the lag of the
+event loops (of the server and of the load test itself) and the memory of the server.
+The 'websockets' package is needed (it is also needed by the uvicorn server of JustPy).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections import defaultdict
+from dataclasses import dataclass, field
+import json
+import math
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Iterator, Optional, Sequence, Tuple
+from urllib.request import urlopen
+
+from puzzle_generator import generate_level
+from puzzle_io import Level
+
+# Puzzle sizes of the sessions by difficulty: (nb_colors, nb_empty_bottles, capacities)
+# The capacity of a session is one of the capacities: sessions of different capacities share
+# the server process at the same time.
+DIFFICULTIES: dict[str, Tuple[int, int, Tuple[int, ...]]] = {
+    "easy": (3, 2, (2, 3, 4, 5, 6)),
+    "medium": (7, 2, (3, 4, 5, 6)),
+    "hard": (12, 2, (3, 4, 5)),
+}
+
+# Period (seconds) of the event loop lag measures
+LOOP_LAG_PERIOD: float = 0.1
+
+# Period (seconds) of the server memory measures
+RSS_PERIOD: float = 0.5
+
+# Maximum number of solution steps of a session
+MAX_NB_STEPS: int = 500
+
+# JustPy component (as sent by the server)
+Component = dict[str, Any]
+
+
+class LoadTestError(Exception):
+    """Unexpected page or server answer in a session."""
+
+
+def http_get(url: str, timeout: float = 60.0) -> str:
+    """@return the body of the HTTP GET of the url."""
+    with urlopen(url, timeout=timeout) as response:
+        return response.read().decode("utf-8")
+
+
+def parse_page(html: str) -> Tuple[int, list[Component]]:
+    """@return (page id, components) of a JustPy HTML page."""
+    match_page_id = re.search(r"page_id\W+(\d+)", html)
+    match_components = re.search(r"justpyComponents\s*=\s*", html)
+    if match_page_id is None or match_components is None:
+        raise LoadTestError("Not a JustPy page")
+    components, _ = json.JSONDecoder().raw_decode(html, match_components.end())
+    return int(match_page_id.group(1)), components
+
+
+def iter_components(components: list[Component], shown_only: bool = False) -> Iterator[Component]:
+    """
+    Iterator on the components and on all their children (in page order).
+    shown_only: skip the hidden components (and their children).
+    """
+    for component in components:
+        if not isinstance(component, dict):
+            continue
+        if shown_only and not component.get("show", True):
+            continue
+        yield component
+        yield from iter_components(component.get("object_props") or [], shown_only)
+
+
+class JustPyPage:
+    """Components of a JustPy page as last sent by the server."""
+
+    def __init__(self, page_id: int, components: list[Component]) -> None:
+        self.page_id = page_id
+        self.components = components
+
+    def update(self, message: dict[str, Any]) -> None:
+        """Update the components from a message of the server."""
+        if message.get("type") == "page_update":
+            self.components = message["data"]
+        elif message.get("type") == "component_update":
+            self._replace_component(self.components, message["data"])
+
+    def _replace_component(self, components: list[Component], new_component: Component) -> bool:
+        """Replace the component having the id of the new component. @return True if found"""
+        for i, component in enumerate(components):
+            if not isinstance(component, dict):
+                continue
+            if component.get("id") is not None and component.get("id") == new_component.get("id"):
+                components[i] = new_component
+                return True
+            if self._replace_component(component.get("object_props") or [], new_component):
+                return True
+        return False
+
+    def find(self, predicate: Callable[[Component], bool]) -> Optional[Component]:
+        """@return the first shown component matching the predicate (None if none)."""
+        for component in iter_components(self.components, shown_only=True):
+            if predicate(component):
+                return component
+        return None
+
+    def find_text(self, text: str) -> Optional[Component]:
+        """@return the first shown component with this text (None if none)."""
+        return self.find(lambda component: component.get("text") == text)
+
+    def find_input(self, placeholder: str) -> Optional[Component]:
+        """@return the first shown input with this placeholder (None if none)."""
+        return self.find(
+            lambda component: component.get("html_tag") == "input"
+            and (component.get("attrs") or {}).get("placeholder") == placeholder
+        )
+
+    def color_buttons(self) -> list[Component]:
+        """@return the color buttons (in color id order)."""
+        for component in iter_components(self.components, shown_only=True):
+            children = component.get("object_props") or []
+            buttons = [child for child in children if child.get("html_tag") == "button"]
+            if buttons and len(buttons) == len(children):
+                return buttons  # First div of buttons only
+        return []
+
+    def dose_buttons(self) -> list[list[Component]]:
+        """@return the dose buttons of every bottle of the puzzle (from bottom to top)."""
+        return [
+            [
+                child
+                for child in component.get("object_props") or []
+                if child.get("html_tag") == "button"
+            ]
+            for component in iter_components(self.components, shown_only=True)
+            if str(component.get("text", "")).startswith("Bottle #")
+        ]
+
+
+def level_doses_by_color(level: Level) -> list[Tuple[int, list[Tuple[int, int]]]]:
+    """
+    @return the (i_color, [(i_bottle, i_dose), ...]) doses of each color of the level where
+    i_color is the index of the color in the sorted colors of the level (one color selection
+    for all the doses of the color, as a user does).
+    """
+    colors = sorted({color for bottle in level.bottles for color in bottle})
+    doses: dict[int, list[Tuple[int, int]]] = defaultdict(list)
+    for i_bottle, bottle in enumerate(level.bottles):
+        for i_dose, color in enumerate(bottle):
+            doses[colors.index(color)].append((i_bottle, i_dose))
+    return sorted(doses.items())
+
+
+def iter_load_test_levels(
+    nb_sessions: int, difficulties: Sequence[str], seed: Optional[int] = None
+) -> Iterator[Tuple[str, Level]]:
+    """Iterator on the (difficulty, level) of the sessions (random difficulties and capacities)."""
+    rng = random.Random(seed)
+    for _ in range(nb_sessions):
+        difficulty = rng.choice(list(difficulties))
+        nb_colors, nb_empty_bottles, capacities = DIFFICULTIES[difficulty]
+        capacity = rng.choice(capacities)
+        yield difficulty, generate_level(
+            rng, nb_colors, capacity=capacity, nb_empty_bottles=nb_empty_bottles
+        )
+
+
+def percentile(values: Sequence[float], ratio: float) -> float:
+    """@return the (nearest rank) percentile of the values (ratio is in [0, 1])."""
+    if not values:
+        raise ValueError("No value")
+    sorted_values = sorted(values)
+    return sorted_values[max(0, math.ceil(ratio * len(sorted_values)) - 1)]
+
+
+def parse_server_report(html: str) -> dict[str, str]:
+    """@return the 'name: value' lines of the /memory page of the server."""
+    _, components = parse_page(html)
+    report: dict[str, str] = {}
+    for component in iter_components(components):
+        name, separator, value = str(component.get("text") or "").partition(": ")
+        if separator:
+            report[name] = value
+    return report
+
+
+def process_rss_kb(pid: int) -> Optional[int]:
+    """@return the resident memory (in kB) of a process (None if unknown, Linux only)."""
+    try:
+        with open(f"/proc/{pid}/status") as file:
+            for line in file:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+@dataclass
+class LoadTestReport:
+    """Measures of a load test."""
+
+    # Latencies (seconds) by operation
+    latencies: defaultdict[str, list[float]] = field(
+        default_factory=lambda: defaultdict(list)
+    )
+    # Number of errors by type
+    errors: defaultdict[str, int] = field(default_factory=lambda: defaultdict(int))
+    nb_sessions: int = 0
+    nb_failed_sessions: int = 0
+    duration: float = 0.0
+    # Lags (seconds) of the event loop of the load test
+    client_loop_lags: list[float] = field(default_factory=list)
+    # Resident memory samples (kB) of the server process
+    server_rss_kb: list[int] = field(default_factory=list)
+    # Report of the server (@see justpy_puzzle_solver.sessions_memory_page)
+    server_report: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def nb_events(self) -> int:
+        """Number of measured operations."""
+        return sum(len(latencies) for latencies in self.latencies.values())
+
+    def statistics(self) -> dict[str, dict[str, float]]:
+        """@return the count and latency percentiles (in milliseconds) by operation."""
+        return {
+            name: {
+                "count": len(latencies),
+                "mean": 1000.0 * sum(latencies) / len(latencies),
+                "p50": 1000.0 * percentile(latencies, 0.50),
+                "p90": 1000.0 * percentile(latencies, 0.90),
+                "p99": 1000.0 * percentile(latencies, 0.99),
+                "max": 1000.0 * max(latencies),
+            }
+            for name, latencies in sorted(self.latencies.items())
+        }
+
+    def to_dict(self) -> dict[str, Any]:
+        """@return the report as a JSON compatible dict."""
+        return {
+            "nb_sessions": self.nb_sessions,
+            "nb_failed_sessions": self.nb_failed_sessions,
+            "duration": self.duration,
+            "events_per_second": self.nb_events / self.duration if self.duration else 0.0,
+            "sessions_per_second": self.nb_sessions / self.duration if self.duration else 0.0,
+            "latencies_ms": self.statistics(),
+            "errors": dict(self.errors),
+            "client_loop_lag_ms": {
+                "mean": 1000.0 * sum(self.client_loop_lags) / len(self.client_loop_lags)
+                if self.client_loop_lags
+                else 0.0,
+                "max": 1000.0 * max(self.client_loop_lags, default=0.0),
+            },
+            "server_max_rss_kb": max(self.server_rss_kb, default=None),
+            "server": self.server_report,
+        }
+
+    def format(self) -> str:
+        """@return the report as text."""
+        report = self.to_dict()
+        lines = [
+            f"{'operation':<16}{'count':>8}{'mean':>10}{'p50':>10}{'p90':>10}"
+            f"{'p99':>10}{'max':>10}  (ms)"
+        ]
+        for name, statistics in report["latencies_ms"].items():
+            lines.append(
+                f"{name:<16}{statistics['count']:>8}"
+                + "".join(
+                    f"{statistics[key]:>10.1f}" for key in ("mean", "p50", "p90", "p99", "max")
+                )
+            )
+        lines.append(
+            f"sessions: {self.nb_sessions} ({self.nb_failed_sessions} failed) "
+            f"in {self.duration:.1f}s: {report['sessions_per_second']:.2f} sessions/s, "
+            f"{report['events_per_second']:.1f} events/s"
+        )
+        if self.errors:
+            lines.append(f"errors: {dict(self.errors)}")
+        lines.append(
+            f"load test event loop lag: {report['client_loop_lag_ms']['mean']:.1f}ms mean, "
+            f"{report['client_loop_lag_ms']['max']:.1f}ms max"
+        )
+        if report["server_max_rss_kb"] is not None:
+            lines.append(f"server max rss: {report['server_max_rss_kb']} kB")
+        for name, value in self.server_report.items():
+            lines.append(f"server {name}: {value}")
+        return "\n".join(lines)
+
+
+class LoadTestSession:
+    """
+    One simulated user of the web server.
+
+    url: URL of the puzzle page.
+    settle: time (seconds) without message from the server after which an event is done
+        (the latency of an event is the time of the last message of the server).
+    timeout: maximum time (seconds) to wait for the first message after an event.
+    """
+
+    def __init__(self, url: str, report: LoadTestReport, settle: float, timeout: float) -> None:
+        self.url = url
+        self.report = report
+        self.settle = settle
+        self.timeout = timeout
+        self.page: Optional[JustPyPage] = None
+        self.websocket: Any = None
+        self.websocket_id: Any = None
+
+    async def run(self, difficulty: str, level: Level) -> None:
+        """Load the page, fill the puzzle of the level, solve it and step through the solution."""
+        import websockets  # type: ignore  # Only needed by the load test
+
+        time_start = time.perf_counter()
+        html = await asyncio.to_thread(http_get, self.url, self.timeout)
+        self.report.latencies["page_load"].append(time.perf_counter() - time_start)
+        self.page = JustPyPage(*parse_page(html))
+
+        ws_url = re.sub(r"^http", "ws", self.url)
+        async with websockets.connect(ws_url, max_size=None) as websocket:
+            self.websocket = websocket
+            message = json.loads(await asyncio.wait_for(websocket.recv(), self.timeout))
+            self.websocket_id = message.get("data")
+            await websocket.send(json.dumps({"type": "connect", "page_id": self.page.page_id}))
+
+            # Sizes
+            for placeholder, value in (
+                ("Nb bottles", len(level.bottles)),
+                ("Nb doses per bottle", level.capacity),
+            ):
+                await self.event(
+                    "sizes",
+                    self._get(self.page.find_input(placeholder)),
+                    "change",
+                    value=value,
+                    input_type="number",
+                )
+
+            # Colors and doses
+            color_buttons = self.page.color_buttons()
+            for i_color, doses in level_doses_by_color(level):
+                if i_color >= len(color_buttons):
+                    raise LoadTestError(f"No button for the color #{i_color}")
+                await self.event("color_click", color_buttons[i_color])
+                for i_bottle, i_dose in doses:
+                    await self.event("dose_click", self.page.dose_buttons()[i_bottle][i_dose])
+
+            # Solution
+            await self.event(f"solve_{difficulty}", self._get(self.page.find_text("Solve it !")))
+            for _ in range(MAX_NB_STEPS):
+                button_next = self.page.find_text("Next step")
+                if button_next is None:
+                    break
+                await self.event("step", button_next)
+
+    def _get(self, component: Optional[Component]) -> Component:
+        """@return the component (error if not found on the page)."""
+        if component is None:
+            raise LoadTestError("Component not found on the page")
+        return component
+
+    async def event(
+        self, name: str, component: Component, event_type: str = "click", **kwargs: Any
+    ) -> None:
+        """Send an event on the component and measure the latency of the server answer."""
+        assert self.page is not None
+        event_data = {
+            "event_type": event_type,
+            "id": component.get("id"),
+            "class_name": component.get("class_name"),
+            "html_tag": component.get("html_tag"),
+            "vue_type": component.get("vue_type"),
+            "page_id": self.page.page_id,
+            "websocket_id": self.websocket_id,
+            **kwargs,
+        }
+        time_start = time.perf_counter()
+        await self.websocket.send(json.dumps({"type": "event", "event_data": event_data}))
+        time_last: Optional[float] = None
+        timeout = self.timeout
+        while True:
+            try:
+                message = await asyncio.wait_for(self.websocket.recv(), timeout)
+            except asyncio.TimeoutError:
+                break
+            time_last = time.perf_counter()
+            self.page.update(json.loads(message))
+            timeout = self.settle
+        if time_last is None:
+            raise LoadTestError(f"No answer to the '{name}' event")
+        self.report.latencies[name].append(time_last - time_start)
+
+
+async def monitor_loop_lag(lags: list[float], period: float = LOOP_LAG_PERIOD) -> None:
+    """Measure the delay of the event loop to wake up a task."""
+    loop = asyncio.get_running_loop()
+    while True:
+        time_start = loop.time()
+        await asyncio.sleep(period)
+        lags.append(max(0.0, loop.time() - time_start - period))
+
+
+async def monitor_rss(pid: int, rss_kb: list[int], period: float = RSS_PERIOD) -> None:
+    """Measure the resident memory of a process."""
+    while True:
+        rss = process_rss_kb(pid)
+        if rss is not None:
+            rss_kb.append(rss)
+        await asyncio.sleep(period)
+
+
+async def run_load_test(
+    url: str,
+    levels: Sequence[Tuple[str, Level]],
+    concurrency: int = 10,
+    settle: float = 0.05,
+    timeout: float = 60.0,
+    server_pid: Optional[int] = None,
+) -> LoadTestReport:
+    """
+    Run a session for each (difficulty, level) with at most concurrency sessions at once.
+    server_pid: process of the server (for its memory measures).
+    """
+    report = LoadTestReport()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_session(difficulty: str, level: Level) -> None:
+        async with semaphore:
+            report.nb_sessions += 1
+            try:
+                await LoadTestSession(url, report, settle, timeout).run(difficulty, level)
+            except Exception as error:  # The failures are measures of the load test
+                report.nb_failed_sessions += 1
+                report.errors[type(error).__name__] += 1
+
+    monitors = [asyncio.create_task(monitor_loop_lag(report.client_loop_lags))]
+    if server_pid is not None:
+        monitors.append(asyncio.create_task(monitor_rss(server_pid, report.server_rss_kb)))
+    time_start = time.perf_counter()
+    try:
+        await asyncio.gather(*(run_session(difficulty, level) for difficulty, level in levels))
+    finally:
+        report.duration = time.perf_counter() - time_start
+        for monitor in monitors:
+            monitor.cancel()
+    try:
+        report.server_report = parse_server_report(
+            await asyncio.to_thread(http_get, url.rstrip("/") + "/memory", timeout)
+        )
+    except (OSError, LoadTestError, ValueError) as error:
+        report.errors[f"server_report_{type(error).__name__}"] += 1
+    return report
+
+
+def start_server(port: int) -> subprocess.Popen:
+    """Start a local justpy_puzzle_solver server."""
+    env = dict(os.environ, WATER_SORT_HOST="127.0.0.1", WATER_SORT_PORT=str(port))
+    return subprocess.Popen(
+        [sys.executable, "justpy_puzzle_solver.py"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+    )
+
+
+def wait_server(url: str, process: Optional[subprocess.Popen], timeout: float = 30.0) -> None:
+    """Wait until the server answers (error if it does not answer before timeout)."""
+    time_end = time.monotonic() + timeout
+    while True:
+        if process is not None and process.poll() is not None:
+            raise LoadTestError(f"Server exited with code {process.returncode}")
+        try:
+            http_get(url, timeout=1.0)
+            return
+        except OSError:
+            if time.monotonic() > time_end:
+                raise LoadTestError(f"No server at {url}")
+            time.sleep(0.2)
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """Parse the command line arguments."""
+    parser = argparse.ArgumentParser(description="Load test of the JustPy puzzle solver.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--start-server", action="store_true", help="Start a local server for the test"
+    )
+    parser.add_argument("--sessions", type=int, default=20, help="Number of sessions")
+    parser.add_argument(
+        "--concurrency", type=int, default=10, help="Maximum number of sessions at once"
+    )
+    parser.add_argument(
+        "--difficulty",
+        action="append",
+        choices=list(DIFFICULTIES),
+        help="Difficulty of the puzzles (repeatable, default is all)",
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument(
+        "--settle",
+        type=float,
+        default=0.05,
+        help="Seconds without server message ending an event",
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=60.0, help="Maximum seconds to wait for an answer"
+    )
+    parser.add_argument("--json", default=None, help="Write the report to this JSON file")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Command line entry point. @return exit code."""
+    args = parse_args(argv)
+    url = f"http://{args.host}:{args.port}/"
+    levels = list(
+        iter_load_test_levels(args.sessions, args.difficulty or list(DIFFICULTIES), args.seed)
+    )
+    process = start_server(args.port) if args.start_server else None
+    try:
+        wait_server(url, process)
+        report = asyncio.run(
+            run_load_test(
+                url,
+                levels,
+                concurrency=args.concurrency,
+                settle=args.settle,
+                timeout=args.timeout,
+                server_pid=None if process is None else process.pid,
+            )
+        )
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+    print(report.format())
+    if args.json is not None:
+        with open(args.json, "w") as file:
+            json.dump(report.to_dict(), file, indent=2)
+    return 0 if report.nb_failed_sessions == 0 else 1
+
+
+if __name__ == "__main__":
+
+    sys.exit(main())
@@ -3,7 +3,13 @@ Water sort solver solver
 """
 from __future__ import annotations
 
-from dataclasses import dataclass
+import asyncio
+import contextlib
+import logging
+import os
+import sys
+import weakref
+from concurrent.futures import Executor, ThreadPoolExecutor
 from typing import Any, Iterator, Optional
 from collections import defaultdict
 
@@ -12,14 +18,54 @@ import justpy as jp  # type: ignore
 # Puzzle solver classes
 from puzzle import Puzzle
 from bottle import Bottle
-from puzzle_solver import PuzzleSolver, PuzzleChain
+from puzzle_solver import PuzzleSolver, PuzzleChain, SolveStatus
+from puzzle_hint import HintSolver
+from solution_navigator import DoseChange, SolutionNavigator
+from speculative_solver import SolveResult, SpeculativeSolver, solution_moves
+from solver_profiling import SolverProfiler
+from web_components import (
+    ALL_COLORS,
+    SERVER_TIMES,
+    MyBottlePool,
+    MyColor,
+    do_update_bottle_dose_button_color,
+    get_my_color_from_id,
+    reset_my_bottle,
+    server_time,
+)
 
 APP_TITLE: str = "water sort puzzle solver"
 APP_FAVICON: str = "./jigsaw.ico"
 
+# HTTP server address (the environment variables are used by the load test, @see justpy_load_test)
+APP_HOST: str = os.environ.get("WATER_SORT_HOST", "0.0.0.0")
+APP_PORT: int = int(os.environ.get("WATER_SORT_PORT", "80"))
+
 MIN_NB_BOTTLES, MAX_NB_BOTTLES = 3, 20
 MIN_NB_DOSES_PER_BOTTLE, MAX_NB_DOSES_PER_BOTTLE = 2, 6
 
+# Log the timings of the solver hot paths after each solving (@see solver_profiling)
+PROFILE_SOLVING: bool = False
+
+LOGGER = logging.getLogger(__name__)
+
+# Delay (seconds) without puzzle edit before its background solving (@see speculative_solver)
+SPECULATIVE_SOLVE_DELAY: float = 0.5
+
+# Executor of the solvings asked by the solve button without background result: they do not
+# wait for the background solvings of the other sessions (@see do_solve_my_puzzle)
+SOLVE_EXECUTOR: Executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="solve")
+
+# Maximum number of MyBottle components kept for reuse by the sessions of this process
+MAX_BOTTLE_POOL_SIZE: int = 50 * MAX_NB_BOTTLES
+
+# Period (seconds) of the solving progress messages while waiting for a solution
+SOLVE_PROGRESS_PERIOD: float = 1.0
+
+# Next move hints of all the sessions (the cache of the next moves is shared, the searches
+# are done in the hint executor, @see puzzle_hint)
+HINT_SOLVER = HintSolver(time_limit=10.0)
+
 # Type alias for JustPy object
 JustPy_Page = Any  # JustPy HTML page
 JustPy_Component = Any  # JustPy component on a page
@@ -28,45 +74,28 @@ JustPy_Message = Any  # JustPy message in a callback
 # Tailwind class for message div component
 div_message_classes = "text-xl border m-4 p-2"
 
+# Period (seconds) of the event loop lag measures (@see event_loop_lag_monitor)
+EVENT_LOOP_LAG_PERIOD: float = 0.1
+
+# Lag of the event loop: [number of measures, total lag, max lag] in seconds
+EVENT_LOOP_LAG: list = [0, 0.0, 0.0]
+
+
+async def event_loop_lag_monitor() -> None:
+    """Measure the delay of the event loop to wake up a task (blocked by long callbacks)"""
+    loop = asyncio.get_running_loop()
+    while True:
+        time_start = loop.time()
+        await asyncio.sleep(EVENT_LOOP_LAG_PERIOD)
+        lag = max(0.0, loop.time() - time_start - EVENT_LOOP_LAG_PERIOD)
+        EVENT_LOOP_LAG[0] += 1
+        EVENT_LOOP_LAG[1] += lag
+        EVENT_LOOP_LAG[2] = max(EVENT_LOOP_LAG[2], lag)
 
-@dataclass
-class MyColor:
-    """This class is used to store one possible puzzle color"""
-
-    id: int  # Unique color identifier
-    html_color: str  # color name when talking to HTML component
-    text_color: str  # color name when talking to the user
-
-
-# List of all possible colors proposed to the user
-ALL_COLORS: list[MyColor] = [
-    MyColor(0, "yellow", "Yellow"),
-    MyColor(1, "orange", "Orange"),
-    MyColor(2, "pink", "Pink"),
-    MyColor(3, "deeppink", "Deep pink"),
-    MyColor(4, "red", "Red"),
-    MyColor(5, "darkorchid", "Light purple"),
-    MyColor(6, "magenta", "Magenta"),
-    MyColor(7, "purple", "Purple"),
-    MyColor(8, "lightgrey", "Light grey"),
-    MyColor(9, "grey", "Grey"),
-    MyColor(10, "aquamarine", "Light green"),
-    MyColor(11, "chartreuse", "Green"),
-    MyColor(12, "green", "Dark green"),
-    MyColor(13, "cyan", "Light blue"),
-    MyColor(14, "cornflowerblue", "Blue"),
-    MyColor(15, "blue", "Dark blue"),
-    MyColor(16, "chocolate", "Light brown"),
-    MyColor(17, "brown", "Brown"),
-]
-
-
-def get_my_color_from_id(id: int) -> MyColor:
-    """Return a MyColor instance having a specific id color"""
-    for color in ALL_COLORS:
-        if color.id == id:
-            return color
-    return MyColor(id, "black", "Black")
+
+def start_event_loop_lag_monitor() -> None:
+    """Start the event loop lag measures (server startup)"""
+    asyncio.get_running_loop().create_task(event_loop_lag_monitor())
 
 
 class MyPuzzle:
@@ -97,6 +126,8 @@ class MyPuzzle:
         # --------------
         # Div component with the puzzle
         self.div_my_puzzle: Optional[JustPy_Component] = None
+        # Div component with the bottles
+        self.div_bottles: Optional[JustPy_Component] = None
         # Bottle objects in the puzzle
         self.bottles: list[MyBottle] = []
         # Div component for puzzle status message
@@ -106,6 +137,12 @@ class MyPuzzle:
         # --------------------
         # Button component for solving the puzzle
         self.button_my_puzzle_solve: Optional[JustPy_Component] = None
+        # Button component for the next move hint
+        self.button_my_puzzle_hint: Optional[JustPy_Component] = None
+        # Background solving while the puzzle is edited
+        self.speculative_solver = SpeculativeSolver(
+            solve=solve_human_like, delay=SPECULATIVE_SOLVE_DELAY
+        )
 
         # Explore solution section
         # ------------------------
@@ -176,69 +213,146 @@ class MyPuzzle:
         return True, "Puzzle OK"
 
 
-class MyPuzzleSolver:
-    """Instance of MyPuzzleSolver does the puzzle solving"""
-
-    def __init__(self, my_puzzle: MyPuzzle) -> None:
-        self.my_puzzle: MyPuzzle = my_puzzle
-        puzzle: Puzzle = self._create_puzzle(my_puzzle)
-        solver: PuzzleSolver = PuzzleSolver(puzzle)
-        solution: Optional[PuzzleChain] = solver.solve(
-            nb_chains_without_empty_bottle=4,  # More human looklike solution...
-            verbose_cycle=0,
-        )
-        self.solution_steps: Optional[list[PuzzleChain]] = None
-        if solution is not None:
-            self.solution_steps = solution.get_puzzle_chain_as_list()
-        self.i_current_step = 0
+def solve_human_like(solver: PuzzleSolver) -> Optional[PuzzleChain]:
+    """Solving of the puzzles of the sessions"""
+    return solver.solve(
+        nb_chains_without_empty_bottle=4,  # More human looklike solution...
+        verbose_cycle=0,
+    )
 
-    def _create_puzzle(self, my_puzzle: MyPuzzle) -> Puzzle:
-        """Create the puzzle object from my_puzzle construction"""
-        puzzle = Puzzle()
-        if my_puzzle.nb_doses is not None:
-            # TODO : Next line breaks the multi-session capability (need to refactor the Bottle module)
-            Bottle.MAX_DOSES = my_puzzle.nb_doses
-        for my_bottle in my_puzzle.iter_on_bottles():
-            my_doses: list[Any] = []
-            for my_dose in my_bottle.doses:
-                if my_dose.color is None:
-                    break
-                else:
-                    my_doses.append(my_dose.color.id)
-            bottle = Bottle(my_doses)
-            puzzle.add_bottle(bottle)
-        return puzzle
-
-
-def do_show_puzzle(my_puzzle: MyPuzzle, puzzle: Puzzle) -> None:
-    """Show the puzzle"""
-    for my_bottle, bottle in zip(my_puzzle.iter_on_bottles(), puzzle.iter_bottles()):
-        for my_dose, id_color in zip(my_bottle.doses, bottle.doses):
-            if id_color is None:
-                do_update_bottle_dose_button_color(my_dose, None)
+
+def solve_my_puzzle(puzzle: Puzzle, time_limit: float) -> SolveResult:
+    """Solving of a puzzle of a session out of the event loop (@see do_solve_my_puzzle)"""
+    solver: PuzzleSolver = PuzzleSolver(puzzle, time_limit=time_limit)
+    profiler = SolverProfiler() if PROFILE_SOLVING else None
+    with profiler if profiler is not None else contextlib.nullcontext():
+        solution: Optional[PuzzleChain] = solve_human_like(solver)
+    if profiler is not None:
+        LOGGER.info("Solving of %s:\n%s", puzzle, profiler.report())
+    return solver.status, solution_moves(solution)
+
+
+def create_puzzle(my_puzzle: MyPuzzle) -> Puzzle:
+    """Create the puzzle object from my_puzzle construction"""
+    puzzle = Puzzle()
+    for my_bottle in my_puzzle.iter_on_bottles():
+        my_doses: list[Any] = []
+        for my_dose in my_bottle.doses:
+            if my_dose.color is None:
+                break
             else:
-                my_color = get_my_color_from_id(id_color)
-                do_update_bottle_dose_button_color(my_dose, my_color)
+                my_doses.append(my_dose.color.id)
+        bottle = Bottle(my_doses, max_doses=my_puzzle.nb_doses)
+        puzzle.add_bottle(bottle)
+    return puzzle
+
+
+class MyPuzzleSolver:
+    """
+    Instance of MyPuzzleSolver keeps the puzzle solving
+
+    solve_result: result of the solving of the puzzle (@see do_solve_my_puzzle).
 
+    Only the moves of the solution are kept in the session: the doses changed by the moves
+    are computed when the steps are shown (@see solution_navigator).
+    """
 
-def do_show_solution_step(my_puzzle: MyPuzzle) -> None:
-    """Show the current solution step"""
+    def __init__(self, my_puzzle: MyPuzzle, solve_result: SolveResult) -> None:
+        self.nb_doses: Optional[int] = my_puzzle.nb_doses
+        self.puzzle: Puzzle = create_puzzle(my_puzzle)
+        self.status: SolveStatus
+        self.solution_moves: Optional[list[tuple[int, int]]]
+        self.status, self.solution_moves = solve_result
+        self.i_current_step = 0
+        # Navigation through the solution steps
+        self.navigator: Optional[SolutionNavigator] = None
+        if self.solution_moves is not None:
+            self.navigator = SolutionNavigator(self.puzzle, self.solution_moves)
+        MY_PUZZLE_SOLVERS.add(self)
+
+    @property
+    def nb_steps(self) -> int:
+        """Number of steps of the solution (including the initial puzzle)"""
+        if self.solution_moves is None:
+            return 0
+        return len(self.solution_moves) + 1
+
+    def retained_size(self) -> int:
+        """Approximate size (in bytes) of the data retained by this session"""
+        size = sys.getsizeof(self.solution_moves)
+        if self.solution_moves is not None:
+            size += sum(sys.getsizeof(move) for move in self.solution_moves)
+        size += sys.getsizeof(self.puzzle)
+        for bottle in self.puzzle.iter_bottles():
+            size += sys.getsizeof(bottle) + sys.getsizeof(bottle.doses)
+        if self.navigator is not None:
+            size += self.navigator.retained_size()
+        return size
+
+
+# Puzzle solvers of the sessions of this process (@see sessions_memory_report)
+MY_PUZZLE_SOLVERS: weakref.WeakSet[MyPuzzleSolver] = weakref.WeakSet()
+
+
+def sessions_memory_report() -> dict[str, int]:
+    """Return the memory retained by the puzzle solvers of the sessions of this process"""
+    my_puzzle_solvers = list(MY_PUZZLE_SOLVERS)
+    report = {
+        "nb_sessions": len(my_puzzle_solvers),
+        "nb_solutions": sum(
+            1 for solver in my_puzzle_solvers if solver.solution_moves is not None
+        ),
+        "nb_moves": sum(
+            len(solver.solution_moves)
+            for solver in my_puzzle_solvers
+            if solver.solution_moves is not None
+        ),
+        "retained_bytes": sum(solver.retained_size() for solver in my_puzzle_solvers),
+    }
+    try:
+        import resource  # Unix only
+
+        report["max_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except ImportError:
+        pass
+    return report
+
+
+def do_show_dose_changes(
+    my_puzzle: MyPuzzle, changes: list[DoseChange]
+) -> list[JustPy_Component]:
+    """Show the changed doses of the puzzle. Return the changed dose components"""
+    my_doses: list[JustPy_Component] = []
+    for change in changes:
+        my_dose = my_puzzle.bottles[change.i_bottle].doses[change.i_dose]
+        if change.color is None:
+            do_update_bottle_dose_button_color(my_dose, None)
+        else:
+            do_update_bottle_dose_button_color(my_dose, get_my_color_from_id(change.color))
+        my_doses.append(my_dose)
+    return my_doses
+
+
+def do_show_solution_step(my_puzzle: MyPuzzle) -> list[JustPy_Component]:
+    """
+    Show the current solution step (only the doses changed since the shown step are updated)
+    Return the changed components
+    """
     if my_puzzle.my_puzzle_solver is None:
-        return
+        return []
     my_puzzle_solver: MyPuzzleSolver = my_puzzle.my_puzzle_solver
-    i_current_step: int = my_puzzle_solver.i_current_step
-    if my_puzzle_solver.solution_steps is None:
-        return
-    solution_steps: list[PuzzleChain] = my_puzzle_solver.solution_steps
-    nb_steps: int = len(solution_steps)
-    if i_current_step < 0:
-        i_current_step = 0
-    elif i_current_step >= nb_steps:
-        i_current_step = nb_steps - 1
-    step: PuzzleChain = solution_steps[i_current_step]
+    if my_puzzle_solver.navigator is None:
+        return []
+    navigator: SolutionNavigator = my_puzzle_solver.navigator
+    nb_steps: int = navigator.nb_steps
+    changes = navigator.go_to(my_puzzle_solver.i_current_step)
+    my_puzzle_solver.i_current_step = navigator.i_step
+    i_current_step: int = navigator.i_step
+    step_message: str = navigator.message()
 
     if (
-        my_puzzle.button_explore_solution_previous is not None
+        my_puzzle.div_explore_solution is not None
+        and my_puzzle.button_explore_solution_previous is not None
         and my_puzzle.div_explore_solution_message is not None
         and my_puzzle.button_explore_solution_next is not None
     ):
@@ -254,50 +368,109 @@ def do_show_solution_step(my_puzzle: MyPuzzle) -> None:
             # Show final step
             my_puzzle.button_explore_solution_previous.show = True
             my_puzzle.div_explore_solution_message.text = (
-                f"{step.message} and it's done !"
+                f"{step_message} and it's done !"
             )
             my_puzzle.button_explore_solution_next.show = False
         else:
             # Show intermediate step
             my_puzzle.button_explore_solution_previous.show = True
             my_puzzle.div_explore_solution_message.text = (
-                f"Step {i_current_step}/{nb_steps - 1} : {step.message}"
+                f"Step {i_current_step}/{nb_steps - 1} : {step_message}"
             )
             my_puzzle.button_explore_solution_next.show = True
 
-        do_show_puzzle(my_puzzle, step.puzzle)
+        return do_show_dose_changes(my_puzzle, changes) + [my_puzzle.div_explore_solution]
+    return []
+
+
+async def do_update_components(components: list[JustPy_Component]) -> bool:
+    """
+    Send only these components to the browser (instead of the whole page)
+    Return True to be returned by the event callback (no update of the whole page)
+    """
+    for component in components:
+        await component.update()
+    return True
 
 
-def button_explore_solution_previous_click(
+async def button_explore_solution_previous_click(
     self: JustPy_Component, msg: JustPy_Message
-) -> None:
+) -> Optional[bool]:
     my_puzzle: MyPuzzle = msg.page.my_puzzle
     if my_puzzle.my_puzzle_solver is not None:
-        my_puzzle.my_puzzle_solver.i_current_step -= 1
-        do_show_solution_step(my_puzzle)
+        with server_time("step"):
+            my_puzzle.my_puzzle_solver.i_current_step -= 1
+            return await do_update_components(do_show_solution_step(my_puzzle))
+    return None
 
 
-def button_explore_solution_next_click(
+async def button_explore_solution_next_click(
     self: JustPy_Component, msg: JustPy_Message
-) -> None:
+) -> Optional[bool]:
     my_puzzle: MyPuzzle = msg.page.my_puzzle
     if my_puzzle.my_puzzle_solver is not None:
-        my_puzzle.my_puzzle_solver.i_current_step += 1
-        do_show_solution_step(my_puzzle)
+        with server_time("step"):
+            my_puzzle.my_puzzle_solver.i_current_step += 1
+            return await do_update_components(do_show_solution_step(my_puzzle))
+    return None
+
+
+async def do_wait_speculative_result(
+    my_puzzle: MyPuzzle, page: JustPy_Page
+) -> Optional[SolveResult]:
+    """Wait for the background solving of the puzzle and show its progress meanwhile"""
+    result_task = asyncio.ensure_future(
+        my_puzzle.speculative_solver.result(create_puzzle(my_puzzle))
+    )
+    while True:
+        done, _ = await asyncio.wait({result_task}, timeout=SOLVE_PROGRESS_PERIOD)
+        if done:
+            return result_task.result()
+        estimate = my_puzzle.speculative_solver.progress_estimate()
+        if estimate is not None and my_puzzle.div_my_puzzle_status_message is not None:
+            my_puzzle.div_my_puzzle_status_message.text = f"Solving... {estimate}"
+            await page.update()
+
+
+async def do_solve_my_puzzle(my_puzzle: MyPuzzle, page: JustPy_Page) -> SolveResult:
+    """
+    Result of the background solving of the puzzle when it is started or, without it (puzzle
+    changed, timeout, still waiting for the background solvings of other sessions...), of a
+    new solving in SOLVE_EXECUTOR (with the time limit of the background solvings)
+    """
+    puzzle = create_puzzle(my_puzzle)
+    speculative_solver = my_puzzle.speculative_solver
+    if speculative_solver.is_started(puzzle):
+        speculative_result = await do_wait_speculative_result(my_puzzle, page)
+        if speculative_result is not None:
+            return speculative_result
+    else:
+        speculative_solver.cancel()  # The user no longer waits behind the background work
+    return await asyncio.get_running_loop().run_in_executor(
+        SOLVE_EXECUTOR, solve_my_puzzle, puzzle, speculative_solver.time_limit
+    )
 
 
-def button_my_puzzle_solve_click(self: JustPy_Component, msg: JustPy_Message) -> None:
+async def button_my_puzzle_solve_click(
+    self: JustPy_Component, msg: JustPy_Message
+) -> None:
     """Click on the button for the current puzzle solving"""
     my_puzzle: MyPuzzle = msg.page.my_puzzle
     if (
         my_puzzle.my_puzzle_solver is None  # Avoid multiple reentrance
         and my_puzzle.button_my_puzzle_solve is not None
+        and my_puzzle.button_my_puzzle_solve.show  # Avoid reentrance while waiting
         and my_puzzle.div_my_puzzle_status_message is not None
     ):
         my_puzzle.button_my_puzzle_solve.show = False
+        if my_puzzle.button_my_puzzle_hint is not None:
+            my_puzzle.button_my_puzzle_hint.show = False
         do_change_show_div_colors(my_puzzle, False)
-        my_puzzle.my_puzzle_solver = MyPuzzleSolver(my_puzzle)
-        if my_puzzle.my_puzzle_solver.solution_steps is None:
+        solve_result = await do_solve_my_puzzle(my_puzzle, msg.page)
+        my_puzzle.my_puzzle_solver = MyPuzzleSolver(my_puzzle, solve_result)
+        if my_puzzle.my_puzzle_solver.status == SolveStatus.TIMEOUT:
+            my_puzzle.div_my_puzzle_status_message.text = "NO SOLUTION FOUND IN TIME !"
+        elif my_puzzle.my_puzzle_solver.solution_moves is None:
             my_puzzle.div_my_puzzle_status_message.text = "NO SOLUTION FOUND !"
         else:
             # Init explore solution
@@ -307,29 +480,53 @@ def button_my_puzzle_solve_click(self: JustPy_Component, msg: JustPy_Message) ->
                 do_show_solution_step(my_puzzle)
 
 
+async def button_my_puzzle_hint_click(
+    self: JustPy_Component, msg: JustPy_Message
+) -> None:
+    """Click on the button for the next move of the current puzzle"""
+    my_puzzle: MyPuzzle = msg.page.my_puzzle
+    if my_puzzle.div_my_puzzle_status_message is not None:
+        puzzle: Puzzle = create_puzzle(my_puzzle)
+        speculative_result = my_puzzle.speculative_solver.done_result(puzzle)
+        if speculative_result is not None:
+            # Already solved in background: no hint search (unless the solving was pruned)
+            HINT_SOLVER.add_solution(puzzle, *speculative_result)
+        try:
+            # A new search must not block the other sessions
+            status, move = await HINT_SOLVER.hint_async(puzzle)
+        except ValueError:  # Puzzle not consistent
+            _, message = my_puzzle.my_puzzle_status()
+        else:
+            if move is not None:
+                i_source, i_destination = move
+                message = f"Next move: pour #{i_source + 1} into #{i_destination + 1}"
+            elif puzzle.is_done:
+                message = "The puzzle is already solved !"
+            elif status == SolveStatus.TIMEOUT:
+                message = "NO SOLUTION FOUND IN TIME !"
+            else:
+                message = "NO SOLUTION FOUND !"
+        my_puzzle.div_my_puzzle_status_message.text = message
+
+
 def do_update_my_puzzle_status_message(my_puzzle: MyPuzzle) -> None:
     """Update the puzzle status message"""
     if my_puzzle.div_my_puzzle_status_message is not None:
         ok, message = my_puzzle.my_puzzle_status()
+        # (Re)start the background solving as soon as the puzzle is OK
+        my_puzzle.speculative_solver.update(create_puzzle(my_puzzle) if ok else None)
         if ok:
             my_puzzle.div_my_puzzle_status_message.text = ""
             if my_puzzle.button_my_puzzle_solve is not None:
                 my_puzzle.button_my_puzzle_solve.show = True
+            if my_puzzle.button_my_puzzle_hint is not None:
+                my_puzzle.button_my_puzzle_hint.show = True
         else:
             my_puzzle.div_my_puzzle_status_message.text = message
             if my_puzzle.button_my_puzzle_solve is not None:
                 my_puzzle.button_my_puzzle_solve.show = False
-
-
-def do_update_bottle_dose_button_color(
-    self: JustPy_Component, color: Optional[MyColor]
-) -> None:
-    self.color = color
-    if color is not None:
-        self.style = f"background-color: {color.html_color}"
-    else:
-        self.style = "color: white"
-        self.set_class("bg-black")
+            if my_puzzle.button_my_puzzle_hint is not None:
+                my_puzzle.button_my_puzzle_hint.show = False
 
 
 def button_bottle_dose_click(self: JustPy_Component, msg: JustPy_Message):
@@ -349,17 +546,14 @@ class MyBottle(jp.Div):
         root = self
 
         super().__init__(
-            text=f"Bottle #{i_bottle + 1}",
             classes="flex flex-col-reverse  m-2",
             **kwargs,
         )
-        self.i_bottle: int = i_bottle
-        self.my_puzzle: MyPuzzle = my_puzzle
-        my_puzzle.bottles.append(self)
         self.doses: list[JustPy_Component] = []
 
         # Create dose buttons
         button_classes = "w-16 bg-black hover:bg-white text-white font-bold"
+        self.nb_doses: Optional[int] = my_puzzle.nb_doses
         if my_puzzle.nb_doses is not None:
             for i in range(my_puzzle.nb_doses):
                 b = jp.Button(
@@ -367,11 +561,15 @@ class MyBottle(jp.Div):
                     a=root,
                     classes=button_classes,
                     click=button_bottle_dose_click,
+                    temp=False,  # Updated alone when stepping through the solution
                 )
-                b.my_puzzle = my_puzzle
                 self.doses.append(b)
                 b.i_dose = i
-                b.color = None
+        self.reset(my_puzzle, i_bottle)
+
+    def reset(self, my_puzzle: MyPuzzle, i_bottle: int) -> None:
+        """(Re)use the bottle as an empty bottle of the puzzle"""
+        reset_my_bottle(self, my_puzzle, i_bottle)
 
     def is_correctly_fullfiled(self) -> bool:
         """Return True if there is no empty dose below a colored dose"""
@@ -384,6 +582,10 @@ class MyBottle(jp.Div):
         return True
 
 
+# Bottles kept for reuse by the sessions of this process
+MY_BOTTLE_POOL = MyBottlePool(MAX_BOTTLE_POOL_SIZE, MyBottle)
+
+
 def do_change_show_div_sizes(my_puzzle: MyPuzzle, show: bool) -> None:
     """Change the visibility of the div containing the input sizes"""
     if my_puzzle.div_sizes is not None:
@@ -445,67 +647,107 @@ async def nb_doses_change(self: JustPy_Component, msg: JustPy_Message) -> None:
 
 async def my_puzzle_div_construction(my_puzzle: MyPuzzle) -> None:
     """Construct the puzzle once its size is known"""
+    with server_time("puzzle_construction"):
+        await do_my_puzzle_div_construction(my_puzzle)
+
+
+async def do_my_puzzle_div_construction(my_puzzle: MyPuzzle) -> None:
     div_root = my_puzzle.div_my_puzzle
 
-    # Puzzle section
-    div_bottles = jp.Div(classes="flex m-2 flex-wrap", a=div_root)
+    # Puzzle section (the bottles of the previous sizes are reused)
+    if my_puzzle.div_bottles is None:
+        my_puzzle.div_bottles = jp.Div(classes="flex m-2 flex-wrap", a=div_root)
+    MY_BOTTLE_POOL.release(my_puzzle)
     if my_puzzle.nb_bottles is not None:
         for i_bottle in range(my_puzzle.nb_bottles):
-            MyBottle(
-                my_puzzle=my_puzzle,
-                i_bottle=i_bottle,
-                a=div_bottles,
-            )
-        div_my_puzzle_status_message = jp.Div(
-            text="... and click on bottle dose to set/unset the color",
-            classes=div_message_classes,
-            a=div_root,
-        )
-        my_puzzle.div_my_puzzle_status_message = div_my_puzzle_status_message
+            my_puzzle.div_bottles.add(MY_BOTTLE_POOL.acquire(my_puzzle, i_bottle))
+        if my_puzzle.div_my_puzzle_status_message is None:
+            my_puzzle_sections_construction(my_puzzle)
+        else:
+            do_update_my_puzzle_status_message(my_puzzle)
 
-        # Puzzle solve section
-        button_my_puzzle_solve = jp.Button(
-            text="Solve it !",
-            a=div_my_puzzle_status_message,
-            classes="w-32 mr-2 mb-2 bg-green-400 hover:bg-green-600 font-bold py-2 px-4 rounded-full",
-            click=button_my_puzzle_solve_click,
-        )
-        button_my_puzzle_solve.show = False
-        my_puzzle.button_my_puzzle_solve = button_my_puzzle_solve
+        await my_puzzle.page.update()
 
-        # Explore solution section
-        div_explore_solution = jp.Div(classes="inline-flex items-baseline", a=div_root)
-        my_puzzle.div_explore_solution = div_explore_solution
-        button_explore_classes = "w-64 h-12 mr-2 mb-2 bg-green-400 hover:bg-green-600 font-bold py-2 px-4 rounded-full"
-        button_explore_solution_previous = jp.Button(
-            text="Previous step",
-            a=div_explore_solution,
-            classes=button_explore_classes,
-            click=button_explore_solution_previous_click,
-        )
-        my_puzzle.button_explore_solution_previous = button_explore_solution_previous
-        div_explore_solution_message = jp.Div(
-            text="Current step",
-            classes=div_message_classes,
-            a=div_explore_solution,
-        )
-        my_puzzle.div_explore_solution_message = div_explore_solution_message
-        button_explore_solution_next = jp.Button(
-            text="Next step",
-            a=div_explore_solution,
-            classes=button_explore_classes,
-            click=button_explore_solution_next_click,
-        )
-        my_puzzle.button_explore_solution_next = button_explore_solution_next
 
-        div_explore_solution.show = False
+def my_puzzle_sections_construction(my_puzzle: MyPuzzle) -> None:
+    """Construct the puzzle status, solve and explore solution sections (once per page)"""
+    div_root = my_puzzle.div_my_puzzle
+    div_my_puzzle_status_message = jp.Div(
+        text="... and click on bottle dose to set/unset the color",
+        classes=div_message_classes,
+        a=div_root,
+    )
+    my_puzzle.div_my_puzzle_status_message = div_my_puzzle_status_message
+
+    # Puzzle solve section
+    button_my_puzzle_solve = jp.Button(
+        text="Solve it !",
+        a=div_my_puzzle_status_message,
+        classes="w-32 mr-2 mb-2 bg-green-400 hover:bg-green-600 font-bold py-2 px-4 rounded-full",
+        click=button_my_puzzle_solve_click,
+    )
+    button_my_puzzle_solve.show = False
+    my_puzzle.button_my_puzzle_solve = button_my_puzzle_solve
+    button_my_puzzle_hint = jp.Button(
+        text="Next move ?",
+        a=div_my_puzzle_status_message,
+        classes="w-32 mr-2 mb-2 bg-green-400 hover:bg-green-600 font-bold py-2 px-4 rounded-full",
+        click=button_my_puzzle_hint_click,
+    )
+    button_my_puzzle_hint.show = False
+    my_puzzle.button_my_puzzle_hint = button_my_puzzle_hint
+
+    # Explore solution section
+    div_explore_solution = jp.Div(
+        classes="inline-flex items-baseline",
+        a=div_root,
+        temp=False,  # Updated alone when stepping through the solution
+    )
+    my_puzzle.div_explore_solution = div_explore_solution
+    button_explore_classes = "w-64 h-12 mr-2 mb-2 bg-green-400 hover:bg-green-600 font-bold py-2 px-4 rounded-full"
+    button_explore_solution_previous = jp.Button(
+        text="Previous step",
+        a=div_explore_solution,
+        classes=button_explore_classes,
+        click=button_explore_solution_previous_click,
+    )
+    my_puzzle.button_explore_solution_previous = button_explore_solution_previous
+    div_explore_solution_message = jp.Div(
+        text="Current step",
+        classes=div_message_classes,
+        a=div_explore_solution,
+    )
+    my_puzzle.div_explore_solution_message = div_explore_solution_message
+    button_explore_solution_next = jp.Button(
+        text="Next step",
+        a=div_explore_solution,
+        classes=button_explore_classes,
+        click=button_explore_solution_next_click,
+    )
+    my_puzzle.button_explore_solution_next = button_explore_solution_next
 
-        await my_puzzle.page.update()
+    div_explore_solution.show = False
+
+
+class MyWebPage(jp.WebPage):
+    """JustPy page of a session"""
+
+    async def on_disconnect(self, websocket=None) -> None:
+        """End of the session: its bottles are kept for reuse before the page is deleted"""
+        if hasattr(self, "my_puzzle"):
+            self.my_puzzle.speculative_solver.cancel()
+            MY_BOTTLE_POOL.release(self.my_puzzle)
+        await super().on_disconnect(websocket)
 
 
 def my_puzzle_solver_construction() -> JustPy_Page:
     """Puzzle construction for justpy"""
-    wp = jp.WebPage()
+    with server_time("page_load"):
+        return do_my_puzzle_solver_construction()
+
+
+def do_my_puzzle_solver_construction() -> JustPy_Page:
+    wp = MyWebPage()
     wp.my_puzzle = MyPuzzle(wp)
     wp.title = APP_TITLE
     wp.favicon = APP_FAVICON
@@ -580,5 +822,41 @@ def my_puzzle_solver_construction() -> JustPy_Page:
     return wp
 
 
+@jp.SetRoute("/memory")
+def sessions_memory_page() -> JustPy_Page:
+    """Page with the memory retained by the sessions of this process"""
+    wp = jp.WebPage()
+    wp.title = f"{APP_TITLE} - memory"
+    for name, value in sessions_memory_report().items():
+        jp.Div(text=f"{name}: {value}", classes=div_message_classes, a=wp)
+    jp.Div(
+        text=f"bottle pool: {MY_BOTTLE_POOL.size} bottles, "
+        f"{MY_BOTTLE_POOL.nb_created} created, {MY_BOTTLE_POOL.nb_reused} reused",
+        classes=div_message_classes,
+        a=wp,
+    )
+    for name, (nb_operations, total_time) in sorted(SERVER_TIMES.items()):
+        jp.Div(
+            text=f"{name}: {nb_operations} in {total_time:.3f}s "
+            f"({1000.0 * total_time / nb_operations:.3f}ms each)",
+            classes=div_message_classes,
+            a=wp,
+        )
+    nb_lags, total_lag, max_lag = EVENT_LOOP_LAG
+    if nb_lags > 0:
+        jp.Div(
+            text=f"event_loop_lag: {1000.0 * total_lag / nb_lags:.3f}ms mean, "
+            f"{1000.0 * max_lag:.3f}ms max",
+            classes=div_message_classes,
+            a=wp,
+        )
+    return wp
+
+
 # This starts de HTML server
-jp.justpy(my_puzzle_solver_construction, host="0.0.0.0", port=80)
+jp.justpy(
+    my_puzzle_solver_construction,
+    host=APP_HOST,
+    port=APP_PORT,
+    startup=start_event_loop_lag_monitor,
+)
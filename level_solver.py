@@ -0,0 +1,199 @@
+#! coding:utf-8
+
+"""
+The level_solver module solves one level with the options of a batch (@see BatchOptions): it is
+the solving shared by the command line batch runner (@see puzzle_cli), the worker processes of
+the solving API (@see solve_api) and the processes of the portfolio strategy
+(@see portfolio_solver).
+
+With the 'auto' strategy, the level is routed to the engine predicted for its difficulty
+(@see difficulty_predictor) and the prediction is added to its report.
+With the 'portfolio' strategy, the level is solved by a race of strategies in separate
+processes (@see portfolio_solver) and the winning strategy is added to its report. The worker
+processes share a budget of processes for these races (@see create_portfolio_slots).
+
+Solver modules are only imported when solving so that the command line starts fast
+(and never imports the JustPy web server); portfolio_solver and difficulty_predictor import
+this module.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+import time
+from typing import Any, Callable, Optional, Tuple
+
+# Strategies that can be selected on the command line
+STRATEGIES = ("dfs", "beam", "weighted", "auto", "portfolio")
+
+# Strategy choosing the engine of each level by its predicted difficulty
+STRATEGY_AUTO = "auto"
+
+# Strategy racing several strategies in separate processes (@see portfolio_solver)
+STRATEGY_PORTFOLIO = "portfolio"
+
+# Move orderings of the dfs strategy (@see puzzle_solver.MOVE_ORDERINGS)
+MOVE_ORDERING_NAMES = ("none", "progress", "history")
+
+# Status of the levels not solved by the solver (other status are SolveStatus values)
+STATUS_BAD_PUZZLE = "bad puzzle"
+STATUS_MEMORY_LIMIT = "memory limit"
+
+# Default budget of the processes of the portfolio strategy shared by the workers
+# (processes of one race, @see portfolio_solver.DEFAULT_PORTFOLIO)
+DEFAULT_PORTFOLIO_PROCESSES = 5
+
+# Budget of the processes of the portfolio strategy in a worker process (@see init_worker)
+_portfolio_slots: Any = None
+
+
+@dataclass
+class BatchOptions:
+    """Options of the batch solving."""
+
+    strategy: str = "dfs"
+    time_limit: float = 0.0  # Seconds per level (0 for no limit)
+    memory_limit: int = 0  # Megabytes per worker process (0 for no limit)
+    nb_chains_without_empty_bottle: int = 0  # dfs strategy
+    move_ordering: str = "none"  # dfs strategy
+    transposition_table_size: int = 0  # dfs strategy (0 for an unbounded set of puzzles)
+    beam_width: int = 100  # beam strategy
+    beam_max_width: int = 10000  # beam strategy
+    weight: float = 1.0  # weighted strategy
+    decompose: bool = False  # Solve independent color clusters separately
+    wait_best: bool = False  # portfolio strategy: shortest solution by the time limit
+
+
+def create_portfolio_slots(nb_workers: int, max_portfolio_processes: int = 0) -> Any:
+    """
+    @return the semaphore shared by the worker processes to bound the total number of processes
+    of the portfolio strategy (each worker would else start a whole race).
+    max_portfolio_processes: budget of processes (0 for the default budget: the processes of
+        one race, or one per worker if more).
+    """
+    import multiprocessing
+
+    if not max_portfolio_processes:
+        max_portfolio_processes = max(nb_workers, DEFAULT_PORTFOLIO_PROCESSES)
+    return multiprocessing.BoundedSemaphore(max_portfolio_processes)
+
+
+def init_worker(memory_limit: int, portfolio_slots: Any = None) -> None:
+    """
+    Initialization of a worker process: memory budget in megabytes and budget of the processes
+    of the portfolio strategy (@see create_portfolio_slots, None for no budget).
+    """
+    global _portfolio_slots  # pylint: disable=global-statement
+    _portfolio_slots = portfolio_slots
+    if memory_limit:
+        import resource  # Unix only
+
+        nb_bytes = memory_limit * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (nb_bytes, nb_bytes))
+
+
+def solve_with_strategy(solver: Any, options: BatchOptions) -> Any:
+    """Solve with the strategy of the options. @return the solution PuzzleChain or None."""
+    from puzzle_solver import MOVE_ORDERINGS, EmptyBottleCostModel
+    from transposition_table import TranspositionTable
+
+    if options.strategy == "beam":
+        return solver.solve_beam(width=options.beam_width, max_width=options.beam_max_width)
+    if options.strategy == "weighted":
+        cost_model = None
+        if options.nb_chains_without_empty_bottle:
+            cost_model = EmptyBottleCostModel(options.nb_chains_without_empty_bottle)
+        return solver.solve_weighted(cost_model, options.weight)
+    transposition_table = None
+    if options.transposition_table_size:
+        transposition_table = TranspositionTable(options.transposition_table_size)
+    return solver.solve(
+        nb_chains_without_empty_bottle=options.nb_chains_without_empty_bottle,
+        move_ordering=MOVE_ORDERINGS[options.move_ordering](),
+        transposition_table=transposition_table,
+    )
+
+
+def solve_level(
+    job: Tuple[str, int, Any, BatchOptions], on_solver: Optional[Callable[[Any], None]] = None
+) -> dict[str, Any]:
+    """
+    Solve one level. @return the report of the level.
+    on_solver: If not None, called with the solver before the solving (for example to follow
+        its progress from another thread, @see solve_api).
+    """
+    from portfolio_solver import PortfolioSolver
+    from puzzle_decomposition import DecomposedPuzzleSolver
+    from puzzle_solver import PuzzleSolver
+
+    path, index, level, options = job
+    prediction = None
+    if options.strategy == STRATEGY_AUTO:
+        from difficulty_predictor import DIFFICULTY_PREDICTOR
+
+        prediction = DIFFICULTY_PREDICTOR.predict(level)
+        options = prediction.options(options)
+    report: dict[str, Any] = {
+        "file": path,
+        "index": index,
+        "status": STATUS_BAD_PUZZLE,
+        "moves": None,
+        "length": None,
+        "expansions": 0,
+        "time": 0.0,
+    }
+    if prediction is not None:
+        report["prediction"] = prediction.to_json()
+    time_start = time.perf_counter()
+    try:
+        # The bottles of the puzzle have the capacity of the level (@see Level.to_puzzle)
+        if options.strategy == STRATEGY_PORTFOLIO:
+            solver = PortfolioSolver(
+                level.to_puzzle(),
+                time_limit=options.time_limit,
+                wait_best=options.wait_best,
+                options=options,
+                process_slots=_portfolio_slots,
+            )
+        else:
+            solver_class = DecomposedPuzzleSolver if options.decompose else PuzzleSolver
+            solver = solver_class(level.to_puzzle(), time_limit=options.time_limit)
+    except ValueError:
+        return report
+
+    if on_solver is not None:
+        on_solver(solver)
+    try:
+        if options.strategy == STRATEGY_PORTFOLIO:
+            solution = solver.solve()
+        elif options.decompose:
+            solution = solver.solve(
+                lambda sub_solver: solve_with_strategy(sub_solver, options)
+            )
+        else:
+            solution = solve_with_strategy(solver, options)
+        report["status"] = solver.status.value
+    except MemoryError:
+        solution = None
+        report["status"] = STATUS_MEMORY_LIMIT
+
+    report["time"] = round(time.perf_counter() - time_start, 6)
+    report["expansions"] = solver.nb_expanded_puzzles
+    if getattr(solver, "transposition_table", None) is not None:
+        report["transposition_table"] = solver.transposition_table.statistics()
+    if options.strategy == STRATEGY_PORTFOLIO:
+        report["portfolio"] = {
+            "winner": solver.winner,
+            "configurations": {
+                name: {key: configuration_report[key] for key in ("status", "expansions", "time")}
+                for name, configuration_report in solver.reports.items()
+            },
+        }
+    if solution is not None:
+        report["moves"] = [
+            list(puzzle_chain.move)
+            for puzzle_chain in solution.iter_puzzle_chains()
+            if puzzle_chain.move is not None
+        ]
+        report["length"] = solution.depth
+    return report
@@ -0,0 +1,299 @@
+#! coding:utf-8
+
+"""
+The pattern_database module precomputes lower bounds of the number of moves to solve a puzzle.
+
+A pattern database holds, for puzzles of a given shape (number of bottles, bottle capacity),
+the exact number of moves to gather a subset of nb_colors colors (the pattern) when the doses
+of all the other colors are removed from the bottles.
+Removing doses only gives more free space and longer runs of the pattern colors, so this
+abstract problem is a relaxation of the real one (pattern doses may be poured by any number
+of doses up to the top run in the abstract problem).
+Each real move pours only one color: the lower bounds of disjoint color patterns can be added
+(@see PatternDatabaseLowerBound).
+
+The databases are computed once (@see PatternDatabase.build) with a backward breadth-first
+search from the solved abstract puzzle, saved in a file and memory-mapped when used.
+The file is an open addressing hash table so that a lookup is O(1):
+    header (@see _HEADER),
+    nb_slots slots of key_size bytes of key and 1 byte of number of moves (UNKNOWN if empty).
+A key holds the sorted not empty abstract bottles, each one as capacity bytes of pattern color
+numbers (1 .. nb_colors, 0 for no dose).
+
+Example (databases for 14 bottles of 4 doses, 2 colors patterns):
+    python pattern_database.py --bottles 14 --capacity 4 --colors 2 --output pdb_14_4_2.wpd
+"""
+
+from __future__ import annotations
+
+import argparse
+import collections
+import mmap
+import struct
+import sys
+import zlib
+from typing import Any, Hashable, Iterator, Optional, Sequence, Tuple
+
+from puzzle import Puzzle
+
+PDB_MAGIC = b"WSPD"
+PDB_VERSION = 1
+_HEADER = struct.Struct("<4sBBBBII")  # magic, version, bottles, capacity, colors, slots, keys
+UNKNOWN = 255  # Number of moves of an empty slot (and max number of moves stored is 254)
+
+# Abstract puzzle: sorted tuple of not empty bottles (tuple of pattern colors 1 .. nb_colors)
+AbstractPuzzle = Tuple[Tuple[int, ...], ...]
+
+
+def _iter_reverse_moves(
+    abstract_puzzle: AbstractPuzzle, nb_bottles: int, capacity: int
+) -> Iterator[AbstractPuzzle]:
+    """
+    Iterator on the abstract puzzles from which one move leads to abstract_puzzle.
+    The move (source -> destination) poured k doses of the color c: the destination has at
+    least k doses of c on top and, before the move, was empty or had c on top.
+    """
+    bottles = list(abstract_puzzle)
+    nb_empty_bottles = nb_bottles - len(bottles)
+    for i_destination, destination in enumerate(bottles):
+        color = destination[-1]
+        nb_top = 1
+        while nb_top < len(destination) and destination[-1 - nb_top] == color:
+            nb_top += 1
+        sources = [
+            (i_source, source)
+            for i_source, source in enumerate(bottles)
+            if i_source != i_destination
+        ]
+        if nb_empty_bottles:
+            sources.append((-1, ()))
+        for i_source, source in sources:
+            for nb in range(1, min(nb_top, capacity - len(source)) + 1):
+                if nb == nb_top and nb != len(destination):
+                    continue  # The destination had another color on top
+                new_bottles = [
+                    bottle
+                    for i, bottle in enumerate(bottles)
+                    if i not in (i_source, i_destination)
+                ]
+                new_bottles.append(source + (color,) * nb)
+                if nb != len(destination):
+                    new_bottles.append(destination[:-nb])
+                yield tuple(sorted(new_bottles))
+
+
+class PatternDatabase:
+    """Number of moves to solve the abstract puzzles of one shape (bottles, capacity, colors)."""
+
+    def __init__(
+        self, buffer: Any, nb_bottles: int, capacity: int, nb_colors: int, nb_slots: int
+    ) -> None:
+        self.buffer = buffer
+        self.nb_bottles = nb_bottles
+        self.capacity = capacity
+        self.nb_colors = nb_colors
+        self.nb_slots = nb_slots
+        # Not empty abstract bottles are at most the number of pattern doses
+        self.key_size = min(nb_bottles, nb_colors * capacity) * capacity
+        self.slot_size = self.key_size + 1
+
+    def key(self, abstract_puzzle: AbstractPuzzle) -> bytes:
+        """@return the key of an abstract puzzle."""
+        key = bytearray(self.key_size)
+        offset = 0
+        for bottle in abstract_puzzle:
+            key[offset : offset + len(bottle)] = bytes(bottle)
+            offset += self.capacity
+        return bytes(key)
+
+    def _slot_offset(self, key: bytes) -> Iterator[int]:
+        """Iterator on the offsets of the slots to probe for the key."""
+        i_slot = zlib.crc32(key) % self.nb_slots
+        for _ in range(self.nb_slots):
+            yield _HEADER.size + i_slot * self.slot_size
+            i_slot += 1
+            if i_slot == self.nb_slots:
+                i_slot = 0
+
+    def get_nb_moves(self, abstract_puzzle: AbstractPuzzle) -> Optional[int]:
+        """@return number of moves to solve the abstract puzzle (None if not solvable)."""
+        key = self.key(abstract_puzzle)
+        key_size = self.key_size
+        buffer = self.buffer
+        for offset in self._slot_offset(key):
+            nb_moves = buffer[offset + key_size]
+            if nb_moves == UNKNOWN:
+                return None
+            if buffer[offset : offset + key_size] == key:
+                return nb_moves
+        return None
+
+    def _set_nb_moves(self, abstract_puzzle: AbstractPuzzle, nb_moves: int) -> None:
+        """Store the number of moves of an abstract puzzle (not already stored)."""
+        key = self.key(abstract_puzzle)
+        for offset in self._slot_offset(key):
+            if self.buffer[offset + self.key_size] == UNKNOWN:
+                self.buffer[offset : offset + self.key_size] = key
+                self.buffer[offset + self.key_size] = nb_moves
+                return
+        raise ValueError("Pattern database is full")
+
+    @classmethod
+    def build(
+        cls, nb_bottles: int, capacity: int, nb_colors: int, load_factor: float = 0.5
+    ) -> PatternDatabase:
+        """Compute the database with a backward breadth-first search from the solved puzzle."""
+        if nb_colors >= nb_bottles:
+            raise ValueError("Pattern colors must be less than the number of bottles")
+        solved: AbstractPuzzle = tuple(
+            (color,) * capacity for color in range(1, nb_colors + 1)
+        )
+        nb_moves_of: dict[AbstractPuzzle, int] = {solved: 0}
+        todo: collections.deque[AbstractPuzzle] = collections.deque([solved])
+        while todo:
+            abstract_puzzle = todo.popleft()
+            nb_moves = nb_moves_of[abstract_puzzle] + 1
+            for previous in _iter_reverse_moves(abstract_puzzle, nb_bottles, capacity):
+                if previous not in nb_moves_of:
+                    nb_moves_of[previous] = min(nb_moves, UNKNOWN - 1)
+                    todo.append(previous)
+
+        nb_slots = max(1, int(len(nb_moves_of) / load_factor))
+        database = cls(bytearray(), nb_bottles, capacity, nb_colors, nb_slots)
+        buffer = bytearray(_HEADER.size + nb_slots * database.slot_size)
+        _HEADER.pack_into(
+            buffer,
+            0,
+            PDB_MAGIC,
+            PDB_VERSION,
+            nb_bottles,
+            capacity,
+            nb_colors,
+            nb_slots,
+            database.key_size,
+        )
+        for i_slot in range(nb_slots):
+            buffer[_HEADER.size + i_slot * database.slot_size + database.key_size] = UNKNOWN
+        database.buffer = buffer
+        for abstract_puzzle, nb_moves in nb_moves_of.items():
+            database._set_nb_moves(abstract_puzzle, nb_moves)
+        return database
+
+    def save(self, path: str) -> None:
+        """Save the database in a file."""
+        with open(path, "wb") as f:
+            f.write(self.buffer)
+
+    @classmethod
+    def open(cls, path: str) -> PatternDatabase:
+        """Memory-map a database file."""
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, nb_bottles, capacity, nb_colors, nb_slots, key_size = (
+                _HEADER.unpack_from(buffer, 0)
+            )
+        except struct.error as err:
+            buffer.close()
+            raise ValueError(f"Not a pattern database: {path}") from err
+        database = cls(buffer, nb_bottles, capacity, nb_colors, nb_slots)
+        if (
+            magic != PDB_MAGIC
+            or version != PDB_VERSION
+            or key_size != database.key_size
+            or len(buffer) != _HEADER.size + nb_slots * database.slot_size
+        ):
+            buffer.close()
+            raise ValueError(f"Not a pattern database (version {PDB_VERSION}): {path}")
+        return database
+
+    def __len__(self) -> int:
+        """@return number of abstract puzzles in the database."""
+        return sum(
+            1
+            for i_slot in range(self.nb_slots)
+            if self.buffer[_HEADER.size + i_slot * self.slot_size + self.key_size]
+            != UNKNOWN
+        )
+
+
+class PatternDatabaseLowerBound:
+    """
+    Lower bound of the number of moves to solve puzzles of one shape, to be used as the
+    lower_bound of PuzzleSolver.solve_weighted.
+
+    The colors of the puzzle are split in patterns of databases[0].nb_colors colors (the last
+    pattern may be smaller: a database is needed for every pattern size).
+    The lower bound is the sum of the pattern database numbers of moves (or
+    Puzzle.lower_bound_nb_moves when greater).
+    The databases are built with one bottle per color: puzzles where a color fills several
+    bottles are not supported (ValueError).
+    """
+
+    def __init__(self, puzzle: Puzzle, databases: Sequence[PatternDatabase]) -> None:
+        self.databases = {database.nb_colors: database for database in databases}
+        pattern_size = max(self.databases)
+        for database in databases:
+            if database.nb_bottles != len(puzzle) or database.capacity != puzzle.capacity:
+                raise ValueError("Pattern database shape does not match the puzzle")
+
+        # Patterns in the order of appearance of the colors
+        color_counters: collections.Counter = collections.Counter()
+        for bottle in puzzle.iter_bottles():
+            color_counters.update(bottle.iter_doses())
+        colors: list[Hashable] = list(color_counters)
+        for color, nb_color_doses in color_counters.items():
+            if nb_color_doses > puzzle.capacity:
+                raise ValueError(f"Color {color} fills more than one bottle")
+        self.patterns: list[dict[Hashable, int]] = []
+        for i in range(0, len(colors), pattern_size):
+            pattern_colors = colors[i : i + pattern_size]
+            if len(pattern_colors) not in self.databases:
+                raise ValueError(f"No pattern database for {len(pattern_colors)} colors")
+            self.patterns.append(
+                {color: number for number, color in enumerate(pattern_colors, 1)}
+            )
+
+    def __call__(self, puzzle: Puzzle) -> float:
+        nb_moves = 0
+        for pattern in self.patterns:
+            abstract_bottles = []
+            for bottle in puzzle.iter_bottles():
+                abstract_bottle = tuple(
+                    pattern[color] for color in bottle.iter_doses() if color in pattern
+                )
+                if abstract_bottle:
+                    abstract_bottles.append(abstract_bottle)
+            pattern_nb_moves = self.databases[len(pattern)].get_nb_moves(
+                tuple(sorted(abstract_bottles))
+            )
+            if pattern_nb_moves is None:
+                return float("inf")  # The pattern cannot be solved
+            nb_moves += pattern_nb_moves
+        return max(nb_moves, puzzle.lower_bound_nb_moves())
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Command line entry point: build and save the databases of 1 to 'colors' colors."""
+    parser = argparse.ArgumentParser(description="Build water sort pattern databases.")
+    parser.add_argument("--bottles", type=int, required=True, help="Number of bottles")
+    parser.add_argument("--capacity", type=int, default=4, help="Doses per bottle")
+    parser.add_argument("--colors", type=int, default=2, help="Colors per pattern")
+    parser.add_argument(
+        "--output",
+        required=True,
+        help="Database file for 'colors' (files for smaller patterns get a .<n> suffix)",
+    )
+    args = parser.parse_args(argv)
+
+    for nb_colors in range(1, args.colors + 1):
+        database = PatternDatabase.build(args.bottles, args.capacity, nb_colors)
+        path = args.output if nb_colors == args.colors else f"{args.output}.{nb_colors}"
+        database.save(path)
+        print(f"{path}: {len(database)} abstract puzzles ({nb_colors} colors)")
+    return 0
+
+
+if __name__ == "__main__":
+
+    sys.exit(main())
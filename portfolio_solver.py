@@ -0,0 +1,228 @@
+#! coding:utf-8
+
+"""
+The portfolio_solver module races several solving strategies on a same puzzle.
+
+No strategy of PuzzleSolver is the best one on every puzzle: on a same level, the DFS search
+with another move ordering, the weighted A* search or the beam search can be ten times faster
+(or slower). PortfolioSolver solves the puzzle with every configuration of a portfolio
+(@see DEFAULT_PORTFOLIO) at the same time, each in its own process, and:
+- returns the first answer (a solution or the proof that there is none) and terminates the
+  other processes: only a complete search proves that there is no solution, a search that
+  dropped puzzles (SolveStatus.PRUNED, SolveStatus.WIDTH_LIMITED) is not an answer,
+- or, with wait_best, returns the shortest solution found when the time limit is reached
+  (or when every search is over).
+
+Every process solves the level with level_solver.solve_level: a configuration is a change of the
+level_solver.BatchOptions. The processes share nothing (each has its own set of explored puzzles).
+With process_slots (a semaphore shared by the solvers of several processes, for example the
+workers of puzzle_cli or solve_api, @see level_solver.create_portfolio_slots), a configuration
+process is only started with a slot: the configurations without slot wait for the end of other
+ones and the total number of processes stays bounded.
+"""
+
+from __future__ import annotations
+
+from dataclasses import replace
+import math
+import multiprocessing
+from multiprocessing.context import BaseContext
+from multiprocessing.process import BaseProcess
+import queue
+import time
+from typing import Any, Optional
+
+from level_solver import (
+    STRATEGIES,
+    STRATEGY_AUTO,
+    STRATEGY_PORTFOLIO,
+    BatchOptions,
+    init_worker,
+    solve_level,
+)
+from puzzle import Puzzle
+from puzzle_decomposition import puzzle_chain_from_moves
+from puzzle_io import Level
+from puzzle_solver import PuzzleChain, SolveStatus
+
+# BatchOptions changes of each configuration of the default portfolio
+DEFAULT_PORTFOLIO: dict[str, dict[str, Any]] = {
+    "dfs": {"strategy": "dfs", "move_ordering": "none"},
+    "dfs_progress": {"strategy": "dfs", "move_ordering": "progress"},
+    "dfs_history": {"strategy": "dfs", "move_ordering": "history"},
+    "weighted": {"strategy": "weighted", "weight": 2.0},
+    "beam": {"strategy": "beam"},
+}
+
+# Extra time (in seconds) for the processes to report their timeout after the time limit
+DEADLINE_MARGIN = 1.0
+
+# Period (in seconds) of the checks of the cancel and of the end of the processes
+POLL_PERIOD = 0.1
+
+# Status of the searches that failed without proving that there is no solution
+INCOMPLETE_STATUS = (SolveStatus.PRUNED.value, SolveStatus.WIDTH_LIMITED.value)
+
+
+def _solve_configuration(
+    name: str, job: tuple[str, int, Level, BatchOptions], results: Any
+) -> None:
+    """Solving of one configuration in its process: (name, report) is put in results."""
+    init_worker(job[3].memory_limit)
+    try:
+        report = solve_level(job)
+    except Exception as err:  # pylint: disable=broad-except
+        report = {"status": "error", "error": str(err), "expansions": 0, "time": 0.0}
+    results.put((name, report))
+
+
+class PortfolioSolver:
+    """
+    PortfolioSolver is for one Puzzle solving by a race of configurations in separate processes.
+
+    time_limit: If not nul, maximum duration (in seconds) of the solving.
+    portfolio: BatchOptions changes of each configuration by name (default is DEFAULT_PORTFOLIO).
+    wait_best: wait for the shortest solution instead of returning the first answer.
+    options: options shared by the configurations (memory limit, ...).
+    mp_context: multiprocessing context of the processes (default is the default context).
+    process_slots: If not None, semaphore bounding the configuration processes of all the
+        solvers sharing it (one slot per running process).
+    """
+
+    def __init__(
+        self,
+        puzzle: Puzzle,
+        time_limit: float = 0.0,
+        portfolio: Optional[dict[str, dict[str, Any]]] = None,
+        wait_best: bool = False,
+        options: Optional[BatchOptions] = None,
+        mp_context: Optional[BaseContext] = None,
+        process_slots: Any = None,
+    ) -> None:
+        if not puzzle.is_consistent:
+            raise ValueError(f"Bad puzzle: {puzzle}")
+        self.puzzle: Puzzle = puzzle.clone()
+        self.level = Level.from_puzzle(puzzle)
+        self.time_limit: float = time_limit
+        self.wait_best: bool = wait_best
+        self.mp_context = multiprocessing.get_context() if mp_context is None else mp_context
+        self.process_slots = process_slots
+        if options is None:
+            options = BatchOptions()
+        options = replace(options, time_limit=time_limit)
+        self.configurations: dict[str, BatchOptions] = {}
+        for name, changes in (DEFAULT_PORTFOLIO if portfolio is None else portfolio).items():
+            configuration = replace(options, **changes)
+            if configuration.strategy not in STRATEGIES or configuration.strategy in (
+                STRATEGY_AUTO,
+                STRATEGY_PORTFOLIO,
+            ):
+                raise ValueError(f"Bad strategy of the configuration {name}")
+            self.configurations[name] = configuration
+        self._is_cancelled = False
+        # Statistics of the last solving
+        self.status: SolveStatus = SolveStatus.NOT_SOLVED
+        # Puzzles expanded by the configurations that reported
+        self.nb_expanded_puzzles: int = 0
+        self.winner: Optional[str] = None  # Configuration of the answer
+        self.reports: dict[str, dict[str, Any]] = {}  # Reports of the configurations
+
+    def cancel(self) -> None:
+        """
+        Cancel the current and next solvings (for example from another thread).
+        They end as when the time limit is reached (SolveStatus.TIMEOUT status).
+        """
+        self._is_cancelled = True
+
+    def _start_process(self, name: str, results: Any, deadline: float) -> BaseProcess:
+        """@return the started process of a configuration (with the time left by the deadline)."""
+        configuration = self.configurations[name]
+        if self.time_limit:
+            time_limit = max(deadline - DEADLINE_MARGIN - time.perf_counter(), POLL_PERIOD)
+            configuration = replace(configuration, time_limit=time_limit)
+        process = self.mp_context.Process(
+            target=_solve_configuration,
+            args=(name, ("portfolio", 0, self.level, configuration), results),
+            name=f"portfolio_{name}",
+            daemon=True,
+        )
+        process.start()
+        return process
+
+    def solve(self) -> Optional[PuzzleChain]:
+        """@return the first (or best) solution of the configurations (None if none)."""
+        self.status = SolveStatus.NOT_SOLVED
+        self.nb_expanded_puzzles = 0
+        self.winner = None
+        self.reports = {}
+        results = self.mp_context.Queue()
+        deadline = math.inf
+        if self.time_limit:
+            deadline = time.perf_counter() + self.time_limit + DEADLINE_MARGIN
+        waiting_names = list(self.configurations)  # Configurations waiting for a slot
+        processes: dict[str, BaseProcess] = {}  # Started processes by configuration
+        slot_names: set[str] = set()  # Configurations holding a slot
+
+        best_report: Optional[dict[str, Any]] = None
+        try:
+            while len(self.reports) < len(self.configurations) and not self._is_cancelled:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                while waiting_names and (
+                    self.process_slots is None or self.process_slots.acquire(False)
+                ):
+                    name = waiting_names.pop(0)
+                    if self.process_slots is not None:
+                        slot_names.add(name)
+                    processes[name] = self._start_process(name, results, deadline)
+                try:
+                    name, report = results.get(timeout=min(timeout, POLL_PERIOD))
+                except queue.Empty:
+                    if (
+                        results.empty()
+                        and not waiting_names
+                        and not any(process.is_alive() for process in processes.values())
+                    ):
+                        break  # Processes killed without report (memory, ...)
+                    continue
+                if name in slot_names:
+                    slot_names.remove(name)
+                    self.process_slots.release()
+                self.reports[name] = report
+                self.nb_expanded_puzzles += report["expansions"]
+                if report["status"] == SolveStatus.NO_SOLUTION.value:
+                    # Complete search (a search that dropped puzzles reports INCOMPLETE_STATUS)
+                    self.status = SolveStatus.NO_SOLUTION
+                    self.winner = name
+                    break
+                if report["status"] == SolveStatus.SOLVED.value and (
+                    best_report is None or report["length"] < best_report["length"]
+                ):
+                    best_report = report
+                    self.winner = name
+                    if not self.wait_best:
+                        break
+        finally:
+            for process in processes.values():
+                if process.is_alive():
+                    process.terminate()
+            for process in processes.values():
+                process.join()
+            for _ in slot_names:
+                self.process_slots.release()
+            results.close()
+
+        if best_report is not None:
+            self.status = SolveStatus.SOLVED
+            moves = [(i_source, i_destination) for i_source, i_destination in best_report["moves"]]
+            return puzzle_chain_from_moves(self.puzzle, moves)
+        if self.status != SolveStatus.NO_SOLUTION:
+            self.status = SolveStatus.TIMEOUT
+            if len(self.reports) == len(self.configurations):
+                # Every search is over without answer: failure of the searches that dropped puzzles
+                for report in self.reports.values():
+                    if report["status"] in INCOMPLETE_STATUS:
+                        self.status = SolveStatus(report["status"])
+                        break
+        return None
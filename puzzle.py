@@ -10,7 +10,7 @@ It relies on the bottle module for the content of each bottle in the puzzle.
 # Import to do typing :Puzzle inside class Puzzle
 from __future__ import annotations
 
-from typing import Any, Sequence, Tuple, Generator, Optional
+from typing import Any, Hashable, Sequence, Tuple, Generator, Optional
 from collections import Counter
 from itertools import permutations
 
@@ -26,20 +26,60 @@ class Puzzle:
 
     Property @see is_consistent verifies the puzzle is correctly defined with bottle contents and
     might have a possible solving solution.
+
+    The puzzle maintains a summary of its bottles (number of complete, empty and mixed bottles).
+    This summary is kept up-to-date by @see add_bottle and @see pour so that @see is_done
+    and @see contains_empty_bottle do not iterate over the bottles.
+    Bottles of the puzzle should therefore not be modified outside of these methods.
     """
 
     # Speedup properties for this class
-    __slots__ = ("_bottles",)
+    __slots__ = (
+        "_bottles",
+        "nb_complete_bottles",
+        "nb_empty_bottles",
+        "nb_mixed_bottles",
+    )
 
     def __init__(self, bottles: Optional[Sequence[Bottle]] = None) -> None:
         self._bottles: list[Bottle] = []
+        # Number of bottles full of only one color
+        self.nb_complete_bottles = 0
+        # Number of empty bottles
+        self.nb_empty_bottles = 0
+        # Number of bottles holding more than one color
+        self.nb_mixed_bottles = 0
         if bottles:
             for bottle in bottles:
                 self.add_bottle(bottle)
 
+    def _update_summary(self, bottle: Bottle, increment: int) -> None:
+        """Add (increment=1) or remove (increment=-1) the bottle from the puzzle summary."""
+        if bottle.nb_doses == 0:
+            self.nb_empty_bottles += increment
+        elif bottle.nb_top_doses != bottle.nb_doses:
+            self.nb_mixed_bottles += increment
+        elif bottle.nb_top_doses == bottle.max_doses:
+            self.nb_complete_bottles += increment
+
     def add_bottle(self, bottle: Bottle) -> None:
         """Add a bottle to the puzzle."""
         self._bottles.append(bottle)
+        self._update_summary(bottle, 1)
+
+    def pour(self, i_source: int, i_destination: int) -> int:
+        """
+        Pour the i_source bottle into the i_destination bottle and update the puzzle summary.
+        @return number of poured doses
+        """
+        source = self._bottles[i_source]
+        destination = self._bottles[i_destination]
+        self._update_summary(source, -1)
+        self._update_summary(destination, -1)
+        nb_doses = source.pour_into(destination)
+        self._update_summary(source, 1)
+        self._update_summary(destination, 1)
+        return nb_doses
 
     def __len__(self) -> int:
         """@return number of bottles in the puzzle."""
@@ -71,6 +111,20 @@ class Puzzle:
                 return False
         return True
 
+    def state_key(self) -> Hashable:
+        """
+        @return a hashable key of the puzzle content.
+        Keys are equal when the puzzles are the same (@see is_same_as).
+        Colors should be hashable (and comparable with each other for the fastest key).
+        """
+        contents = [tuple(bottle.doses[: bottle.nb_doses]) for bottle in self._bottles]
+        try:
+            contents.sort()
+            return tuple(contents)
+        except TypeError:
+            # Colors that cannot be sorted
+            return frozenset(Counter(contents).items())
+
     def iter_bottles(self):
         """Iterates on every bottle in the puzzle."""
         for bottle in self._bottles:
@@ -81,6 +135,13 @@ class Puzzle:
         for permutation in permutations(self.iter_bottles(), 2):
             yield permutation
 
+    @property
+    def capacity(self) -> int:
+        """Number of doses of each bottle of the puzzle (Bottle.MAX_DOSES when no bottle)."""
+        if not self._bottles:
+            return Bottle.MAX_DOSES
+        return self._bottles[0].max_doses
+
     @property
     def is_consistent(self) -> bool:
         """
@@ -88,8 +149,12 @@ class Puzzle:
         @return True if puzzle is likely to be solved, else False.
 
         A solution is possible when bottles can be fulled with only one color.
+        Every bottle must have the same capacity.
         Empty doses for the content of at least one empty bottle must exist in the puzzle.
         """
+        capacity = self.capacity
+        if any(bottle.max_doses != capacity for bottle in self.iter_bottles()):
+            return False
 
         # Sum colors in bottles
         color_counters: Counter = Counter()
@@ -99,16 +164,16 @@ class Puzzle:
 
         # Check color counters are correctly bottle sized
         for nb_color_doses in color_counters.values():
-            if nb_color_doses % Bottle.MAX_DOSES != 0:
+            if nb_color_doses % capacity != 0:
                 return False
 
         # Sum empty doses in bottles
         nb_empty_doses = 0
         for bottle in self.iter_bottles():
-            nb_empty_doses += Bottle.MAX_DOSES - bottle.nb_doses
+            nb_empty_doses += capacity - bottle.nb_doses
 
         # At least one bottle size should be empty
-        if nb_empty_doses < Bottle.MAX_DOSES:
+        if nb_empty_doses < capacity:
             return False
 
         # All correct
@@ -117,31 +182,41 @@ class Puzzle:
     @property
     def is_done(self) -> bool:
         """@return True when the puzzle is solved."""
-        bottle: Bottle
-        for bottle in self.iter_bottles():
-            if not (bottle.is_empty or (bottle.is_full and len(bottle.colors) == 1)):
-                return False
-        return True
+        return self.nb_complete_bottles + self.nb_empty_bottles == len(self._bottles)
+
+    def lower_bound_nb_moves(self) -> int:
+        """
+        @return a lower bound of the number of moves to solve the puzzle.
+        Each move merges at most one same color segment into another one and, in the solved
+        puzzle, a color of n doses fills ceil(n / capacity) bottles (one segment each).
+        """
+        capacity = self.capacity
+        nb_runs = 0
+        color_counters: Counter = Counter()
+        for bottle in self._bottles:
+            if bottle.nb_doses:
+                nb_runs += bottle.nb_runs
+                color_counters.update(bottle.doses[: bottle.nb_doses])
+        return nb_runs - sum(
+            -(-nb_color_doses // capacity) for nb_color_doses in color_counters.values()
+        )
 
     def clone(self) -> Puzzle:
         """@return Create a copy clone of the puzzle."""
-        copy_list_bottles: list[Bottle] = []
-        for bottle in self.iter_bottles():
-            copy_list_bottles.append(bottle.clone())
-
-        return Puzzle(copy_list_bottles)
+        # Bypass __init__ as the summary of the copy is the same
+        copy_puzzle = Puzzle.__new__(Puzzle)
+        copy_puzzle._bottles = [bottle.clone() for bottle in self._bottles]
+        copy_puzzle.nb_complete_bottles = self.nb_complete_bottles
+        copy_puzzle.nb_empty_bottles = self.nb_empty_bottles
+        copy_puzzle.nb_mixed_bottles = self.nb_mixed_bottles
+        return copy_puzzle
 
     def contains_empty_bottle(self) -> bool:
         """@return True if at least one bottle is empty in the puzzle."""
-        for bottle in self.iter_bottles():
-            if bottle.is_empty:
-                return True
-        return False
+        return self.nb_empty_bottles != 0
 
     def __repr__(self):
-        ret = ""
-        for i, bottle in enumerate(self.iter_bottles()):
-            if ret:
-                ret += ", "
-            ret += f"#{i + 1}{bottle}"
+        ret = ", ".join(
+            f"#{i + 1}{bottle}" for i, bottle in enumerate(self.iter_bottles())
+        )
         return f"Puzzle<{ret}>"
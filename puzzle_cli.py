@@ -0,0 +1,211 @@
+#! coding:utf-8
+
+"""
+puzzle_cli module is the command line batch runner for solving level packs (@see puzzle_io).
+
+Example:
+    python puzzle_cli.py levels.wsp more_levels/ --strategy beam --workers 4 \\
+        --time-limit 10 --memory-limit 512 --report report.json
+
+Every level of the pack files (directories are scanned for pack files) is solved and a JSON
+report is written with, for each level: status, moves, length, expansions and time
+(@see level_solver.solve_level, also for the 'auto' and 'portfolio' strategies).
+
+Solver modules are only imported when solving so that the command line starts fast
+(and never imports the JustPy web server).
+"""
+
+from __future__ import annotations
+
+import argparse
+from dataclasses import asdict
+import json
+import os
+import sys
+import time
+from typing import Any, Iterator, Optional, Sequence, Tuple
+
+from level_solver import (
+    DEFAULT_PORTFOLIO_PROCESSES,
+    MOVE_ORDERING_NAMES,
+    STRATEGIES,
+    STRATEGY_AUTO,
+    BatchOptions,
+    create_portfolio_slots,
+    init_worker,
+    solve_level,
+)
+
+# Extensions of the pack files when scanning directories
+PACK_FILE_EXTENSIONS = (".wsp", ".jsonl")
+
+
+def iter_pack_paths(paths: Sequence[str]) -> Iterator[str]:
+    """Iterator on the pack files given files or directories."""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, file_names in sorted(os.walk(path)):
+                for file_name in sorted(file_names):
+                    if file_name.endswith(PACK_FILE_EXTENSIONS):
+                        yield os.path.join(root, file_name)
+        else:
+            yield path
+
+
+def iter_jobs(paths: Sequence[str]) -> Iterator[Tuple[str, int, Any]]:
+    """Iterator on (pack path, index of the level in the pack, Level) to solve."""
+    from puzzle_io import iter_levels_from_file
+
+    for path in iter_pack_paths(paths):
+        for index, level in enumerate(iter_levels_from_file(path)):
+            yield path, index, level
+
+
+def run_batch(
+    paths: Sequence[str],
+    options: BatchOptions,
+    nb_workers: int = 1,
+    max_portfolio_processes: int = 0,
+) -> Iterator[dict[str, Any]]:
+    """
+    Iterator on the reports of all the levels in the pack files (in order).
+    max_portfolio_processes: budget of the processes of the portfolio strategy shared by the
+        workers (@see create_portfolio_slots).
+    """
+    jobs = ((path, index, level, options) for path, index, level in iter_jobs(paths))
+    if nb_workers <= 1 and not options.memory_limit:
+        # Inline solving
+        for job in jobs:
+            yield solve_level(job)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(
+        max_workers=max(1, nb_workers),
+        initializer=init_worker,
+        initargs=(
+            options.memory_limit,
+            create_portfolio_slots(nb_workers, max_portfolio_processes),
+        ),
+    ) as executor:
+        yield from executor.map(solve_level, jobs, chunksize=1)
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """Parse the command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Solve water sort puzzle level packs (.wsp binary or .jsonl JSON Lines)."
+    )
+    parser.add_argument("paths", nargs="+", help="Pack files or directories of pack files")
+    parser.add_argument("--strategy", choices=STRATEGIES, default="dfs")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes")
+    parser.add_argument(
+        "--time-limit", type=float, default=0.0, help="Seconds per level (0 for no limit)"
+    )
+    parser.add_argument(
+        "--memory-limit",
+        type=int,
+        default=0,
+        help="Megabytes per worker process (0 for no limit)",
+    )
+    parser.add_argument(
+        "--nb-chains-without-empty-bottle",
+        type=int,
+        default=0,
+        help="Max consecutive moves without an empty bottle (dfs and weighted strategies)",
+    )
+    parser.add_argument(
+        "--move-ordering",
+        choices=MOVE_ORDERING_NAMES,
+        default="none",
+        help="Move ordering of the dfs strategy",
+    )
+    parser.add_argument(
+        "--transposition-table",
+        type=int,
+        default=0,
+        help="Entries of the fixed size table of explored puzzles of the dfs strategy",
+    )
+    parser.add_argument("--beam-width", type=int, default=100)
+    parser.add_argument("--beam-max-width", type=int, default=10000)
+    parser.add_argument("--weight", type=float, default=1.0, help="Weighted A* weight")
+    parser.add_argument(
+        "--decompose",
+        action="store_true",
+        help="Solve the independent color clusters of the levels separately",
+    )
+    parser.add_argument(
+        "--wait-best",
+        action="store_true",
+        help="Shortest solution of the portfolio strategy by the time limit (not the first one)",
+    )
+    parser.add_argument(
+        "--max-portfolio-processes",
+        type=int,
+        default=0,
+        help="Processes of the portfolio strategy shared by the workers (0 for the default: "
+        f"{DEFAULT_PORTFOLIO_PROCESSES} or one per worker if more)",
+    )
+    parser.add_argument("--report", help="JSON report file (default is standard output)")
+    parser.add_argument(
+        "--dispatch-log",
+        help="JSON Lines file where the reports of the 'auto' strategy are appended",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Command line entry point. @return exit code."""
+    args = parse_args(argv)
+    options = BatchOptions(
+        strategy=args.strategy,
+        time_limit=args.time_limit,
+        memory_limit=args.memory_limit,
+        nb_chains_without_empty_bottle=args.nb_chains_without_empty_bottle,
+        move_ordering=args.move_ordering,
+        transposition_table_size=args.transposition_table,
+        beam_width=args.beam_width,
+        beam_max_width=args.beam_max_width,
+        weight=args.weight,
+        decompose=args.decompose,
+        wait_best=args.wait_best,
+    )
+
+    time_start = time.perf_counter()
+    try:
+        levels = list(
+            run_batch(args.paths, options, args.workers, args.max_portfolio_processes)
+        )
+    except (OSError, ValueError) as err:
+        print(f"Cannot read level packs: {err}", file=sys.stderr)
+        return 1
+    nb_solved = sum(1 for level in levels if level["status"] == "solved")
+    report: dict[str, Any] = {
+        "options": asdict(options),
+        "workers": args.workers,
+        "nb_levels": len(levels),
+        "nb_solved": nb_solved,
+        "time": round(time.perf_counter() - time_start, 6),
+        "levels": levels,
+    }
+    if options.strategy == STRATEGY_AUTO:
+        from difficulty_predictor import DispatchLog
+
+        dispatch_log = DispatchLog(args.dispatch_log)
+        for level in levels:
+            dispatch_log.record(level)
+        report["dispatch"] = dispatch_log.statistics()
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+
+    sys.exit(main())
@@ -0,0 +1,160 @@
+#! coding:utf-8
+
+"""
+The puzzle_decomposition module solves a puzzle as independent sub-puzzles.
+
+Complete bottles are never moved again: they are frozen out of the search.
+Colors mixed in a same bottle are linked: each group of linked colors (cluster) is
+independent of the others as a dose can only be poured on a dose of the same color.
+The clusters only share the empty bottles.
+
+The clusters are solved one after the other (smallest first), each with all the empty
+bottles available at that time. A solved cluster frees its other bottles for the next ones.
+When no remaining cluster can be solved alone, they are solved together: the status of a
+failure is the one of this last sub-puzzle solving (@see SolveStatus).
+The moves of the sub-puzzles are merged in one solution of the puzzle (not always the shortest
+one, even with a shortest solution of every sub-puzzle).
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from typing import Any, Callable, Optional, Sequence, Tuple
+
+from puzzle import Puzzle
+from puzzle_solver import PuzzleChain, PuzzleSolver, SolveStatus
+
+
+def find_color_clusters(puzzle: Puzzle) -> list[list[int]]:
+    """
+    @return indexes of the bottles of each independent color cluster, smallest cluster first
+    (complete and empty bottles are in no cluster).
+    """
+    # Union-find of the colors mixed in a same bottle
+    parents: dict[Any, Any] = {}
+
+    def find(color: Any) -> Any:
+        while parents[color] != color:
+            parents[color] = parents[parents[color]]
+            color = parents[color]
+        return color
+
+    for bottle in puzzle.iter_bottles():
+        previous_color = None
+        for color in bottle.iter_doses():
+            parents.setdefault(color, color)
+            if previous_color is not None and previous_color != color:
+                parents[find(color)] = find(previous_color)
+            previous_color = color
+
+    clusters: dict[Any, list[int]] = {}
+    for i_bottle, bottle in enumerate(puzzle.iter_bottles()):
+        if bottle.nb_doses and not bottle.is_complete:
+            clusters.setdefault(find(bottle.doses[0]), []).append(i_bottle)
+    return sorted(clusters.values(), key=len)
+
+
+def puzzle_chain_from_moves(
+    puzzle: Puzzle, moves: Sequence[Tuple[int, int]]
+) -> PuzzleChain:
+    """@return the PuzzleChain of the moves from the puzzle."""
+    puzzle_chain = PuzzleChain(
+        previous_puzzle_chain=None, puzzle=puzzle.clone(), message="Puzzle:"
+    )
+    for move in moves:
+        puzzle_chain = puzzle_chain.new_puzzle_chain(move)
+    return puzzle_chain
+
+
+class DecomposedPuzzleSolver:
+    """
+    DecomposedPuzzleSolver is for one Puzzle solving as independent sub-puzzles.
+
+    time_limit: If not nul, maximum duration (in seconds) of the solving of all the sub-puzzles.
+    """
+
+    def __init__(self, puzzle: Puzzle, time_limit: float = 0.0) -> None:
+        if not puzzle.is_consistent:
+            raise ValueError(f"Bad puzzle: {puzzle}")
+        self.puzzle: Puzzle = puzzle.clone()
+        self.time_limit: float = time_limit
+        # Statistics of the last solving
+        self.status: SolveStatus = SolveStatus.NOT_SOLVED
+        self.nb_loops: int = 0
+        self.nb_expanded_puzzles: int = 0  # Puzzles expanded by the solvings of the sub-puzzles
+        self.nb_clusters: int = 0
+        self.nb_sub_puzzles: int = 0  # Sub-puzzles solved (merged clusters count as one)
+
+    def solve(
+        self,
+        solve_sub_puzzle: Optional[Callable[[PuzzleSolver], Optional[PuzzleChain]]] = None,
+    ) -> Optional[PuzzleChain]:
+        """
+        Solve the puzzle.
+        solve_sub_puzzle: Solving of a sub-puzzle given its PuzzleSolver
+            (default is PuzzleSolver.solve, @see PuzzleSolver.solve_weighted for shorter
+            solutions of the sub-puzzles).
+        """
+        if solve_sub_puzzle is None:
+            solve_sub_puzzle = PuzzleSolver.solve
+        deadline = time.perf_counter() + self.time_limit if self.time_limit else math.inf
+        self.nb_loops = 0
+        self.nb_expanded_puzzles = 0
+        self.nb_sub_puzzles = 0
+
+        puzzle = self.puzzle.clone()
+        moves: list[Tuple[int, int]] = []
+        sub_status = SolveStatus.NO_SOLUTION  # Status of the last failed sub-puzzle solving
+        clusters = find_color_clusters(puzzle)
+        self.nb_clusters = len(clusters)
+        while clusters:
+            deferred_clusters: list[list[int]] = []
+            for cluster in clusters:
+                empty_indexes = [
+                    i_bottle
+                    for i_bottle, bottle in enumerate(puzzle.iter_bottles())
+                    if bottle.nb_doses == 0
+                ]
+                bottle_indexes = cluster + empty_indexes
+                sub_puzzle = Puzzle([puzzle[i_bottle].clone() for i_bottle in bottle_indexes])
+                if not sub_puzzle.is_consistent:
+                    deferred_clusters.append(cluster)  # Not enough empty space yet
+                    continue
+
+                time_limit = 0.0
+                if deadline != math.inf:
+                    time_limit = max(deadline - time.perf_counter(), 1e-9)
+                solver = PuzzleSolver(sub_puzzle, time_limit=time_limit)
+                solution = solve_sub_puzzle(solver)
+                self.nb_loops += solver.nb_loops
+                self.nb_expanded_puzzles += solver.nb_expanded_puzzles
+                if solver.status == SolveStatus.TIMEOUT:
+                    self.status = SolveStatus.TIMEOUT
+                    return None
+                if solution is None:
+                    sub_status = solver.status  # NO_SOLUTION, PRUNED or WIDTH_LIMITED
+                    deferred_clusters.append(cluster)
+                    continue
+
+                self.nb_sub_puzzles += 1
+                for puzzle_chain in solution.iter_puzzle_chains():
+                    if puzzle_chain.move is not None:
+                        i_source, i_destination = puzzle_chain.move
+                        move = bottle_indexes[i_source], bottle_indexes[i_destination]
+                        puzzle.pour(*move)
+                        moves.append(move)
+
+            if len(deferred_clusters) == len(clusters):
+                if len(clusters) == 1:
+                    # A solved cluster only leaves complete and empty bottles: the remaining
+                    # clusters are not harder than in the initial puzzle. The status is the one
+                    # of their solving (NO_SOLUTION only if this search is complete).
+                    self.status = sub_status
+                    return None
+                # Solve the remaining clusters together
+                deferred_clusters = [sorted(sum(deferred_clusters, []))]
+            clusters = deferred_clusters
+
+        self.status = SolveStatus.SOLVED
+        return puzzle_chain_from_moves(self.puzzle, moves)
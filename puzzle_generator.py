@@ -0,0 +1,195 @@
+#! coding:utf-8
+
+"""
+The puzzle_generator module generates random consistent puzzles (as puzzle_io levels) and
+estimates their difficulty by solving them.
+
+Example (100 levels with 9 colors and 2 empty bottles, with difficulty, 4 processes):
+    python puzzle_generator.py --colors 9 --empty 2 --count 100 --seed 1 \\
+        --difficulty --workers 4 --output corpus.wsp
+"""
+
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass, asdict
+import json
+import random
+import sys
+from typing import Iterator, Optional, Sequence
+
+from puzzle_io import Level, write_levels_to_file
+from puzzle_solver import PuzzleSolver, SolveStatus
+
+
+def generate_level(
+    rng: random.Random,
+    nb_colors: int,
+    nb_bottles: Optional[int] = None,
+    capacity: int = 4,
+    nb_empty_bottles: int = 2,
+) -> Level:
+    """
+    Generate a random consistent level.
+    nb_colors: number of colors (colors are integers 0 .. nb_colors - 1).
+    nb_bottles: total number of bottles (default is nb_colors + nb_empty_bottles).
+        When there are more bottles than colors plus empty bottles, the doses are spread
+        randomly among the not empty bottles.
+    capacity: number of doses per bottle.
+    nb_empty_bottles: number of empty bottles.
+    """
+    if nb_bottles is None:
+        nb_bottles = nb_colors + nb_empty_bottles
+    nb_filled_bottles = nb_bottles - nb_empty_bottles
+    if nb_colors < 1 or capacity < 1 or nb_empty_bottles < 0:
+        raise ValueError("At least one color and one dose per bottle are needed")
+    if nb_filled_bottles < nb_colors:
+        raise ValueError(f"{nb_bottles} bottles cannot hold {nb_colors} colors")
+    if nb_bottles - nb_colors < 1:
+        raise ValueError("At least one bottle of empty doses is needed")
+    if nb_filled_bottles > nb_colors * capacity:
+        raise ValueError(f"Not enough doses for {nb_filled_bottles} not empty bottles")
+    # Else every level would be already solved (@see the end of the loop below)
+    if nb_colors < 2 or capacity < 2:
+        raise ValueError("At least two colors and two doses per bottle are needed to mix colors")
+    if nb_filled_bottles == nb_colors * capacity:
+        raise ValueError(f"{nb_filled_bottles} not empty bottles of one dose cannot mix colors")
+
+    doses = [color for color in range(nb_colors) for _ in range(capacity)]
+    while True:
+        rng.shuffle(doses)
+        # Number of doses in each filled bottle
+        nb_doses = [capacity] * nb_colors + [0] * (nb_filled_bottles - nb_colors)
+        for i_to in range(nb_colors, nb_filled_bottles):
+            # At least one dose in every not empty bottle
+            i_from = rng.choice([i for i, nb in enumerate(nb_doses) if nb > 1])
+            nb_doses[i_from] -= 1
+            nb_doses[i_to] += 1
+        for _ in range(capacity * (nb_filled_bottles - nb_colors)):
+            # Move one dose from a random bottle to another one with free space
+            i_from = rng.randrange(nb_filled_bottles)
+            i_to = rng.randrange(nb_filled_bottles)
+            if nb_doses[i_from] > 1 and nb_doses[i_to] < capacity:
+                nb_doses[i_from] -= 1
+                nb_doses[i_to] += 1
+        bottles = []
+        i_dose = 0
+        for nb in nb_doses:
+            bottles.append(tuple(doses[i_dose : i_dose + nb]))
+            i_dose += nb
+        bottles += [()] * nb_empty_bottles
+        level = Level(capacity=capacity, bottles=tuple(bottles))
+        # Already solved puzzles are not interesting
+        if any(len(set(bottle)) > 1 for bottle in level.bottles):
+            return level
+
+
+def iter_generate_levels(
+    nb_levels: int,
+    nb_colors: int,
+    nb_bottles: Optional[int] = None,
+    capacity: int = 4,
+    nb_empty_bottles: int = 2,
+    seed: Optional[int] = None,
+) -> Iterator[Level]:
+    """Iterator on nb_levels random levels (the same seed gives the same levels)."""
+    rng = random.Random(seed)
+    for _ in range(nb_levels):
+        yield generate_level(rng, nb_colors, nb_bottles, capacity, nb_empty_bottles)
+
+
+@dataclass
+class Difficulty:
+    """Difficulty of a level estimated by solving it."""
+
+    status: str  # SolveStatus of the first solution search
+    nb_expanded: int  # Puzzles expanded to find a first solution (DFS)
+    solution_length: Optional[int]  # Length of the first solution
+    optimal_length: Optional[int]  # Length of the shortest solution (None if not computed)
+    nb_expanded_optimal: int  # Puzzles expanded to find the shortest solution (A*)
+
+
+def estimate_difficulty(level: Level, time_limit: float = 10.0) -> Difficulty:
+    """
+    Estimate the difficulty of a level:
+    the first solution is searched with the DFS solver and the shortest one with A*
+    (each with the time limit).
+    """
+    solver = PuzzleSolver(level.to_puzzle(), time_limit=time_limit)
+    solution = solver.solve()
+    difficulty = Difficulty(
+        status=solver.status.value,
+        nb_expanded=solver.nb_expanded_puzzles,
+        solution_length=None if solution is None else solution.depth,
+        optimal_length=None,
+        nb_expanded_optimal=0,
+    )
+    if solver.status == SolveStatus.SOLVED:
+        optimal_solution = solver.solve_weighted()
+        difficulty.nb_expanded_optimal = solver.nb_expanded_puzzles
+        if optimal_solution is not None:
+            difficulty.optimal_length = optimal_solution.depth
+    return difficulty
+
+
+def _estimate_difficulty_job(job: tuple[Level, float]) -> Difficulty:
+    """Process pool job for estimate_difficulty."""
+    return estimate_difficulty(*job)
+
+
+def iter_estimate_difficulties(
+    levels: Sequence[Level], time_limit: float = 10.0, nb_workers: int = 1
+) -> Iterator[Difficulty]:
+    """Iterator on the difficulties of the levels (in order), optionally in parallel."""
+    if nb_workers <= 1:
+        for level in levels:
+            yield estimate_difficulty(level, time_limit)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=nb_workers) as executor:
+        yield from executor.map(
+            _estimate_difficulty_job, ((level, time_limit) for level in levels)
+        )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Command line entry point. @return exit code."""
+    parser = argparse.ArgumentParser(description="Generate random water sort puzzles.")
+    parser.add_argument("--colors", type=int, required=True, help="Number of colors")
+    parser.add_argument("--bottles", type=int, help="Total number of bottles")
+    parser.add_argument("--capacity", type=int, default=4, help="Doses per bottle")
+    parser.add_argument("--empty", type=int, default=2, help="Number of empty bottles")
+    parser.add_argument("--count", type=int, default=1, help="Number of levels")
+    parser.add_argument("--seed", type=int, help="Random seed")
+    parser.add_argument(
+        "--difficulty", action="store_true", help="Print the difficulty of every level"
+    )
+    parser.add_argument("--time-limit", type=float, default=10.0, help="Seconds per solving")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes")
+    parser.add_argument("--output", required=True, help="Pack file (.wsp or .jsonl)")
+    args = parser.parse_args(argv)
+
+    try:
+        levels = list(
+            iter_generate_levels(
+                args.count, args.colors, args.bottles, args.capacity, args.empty, args.seed
+            )
+        )
+    except ValueError as err:
+        print(f"Cannot generate levels: {err}", file=sys.stderr)
+        return 1
+    write_levels_to_file(args.output, iter(levels))
+
+    if args.difficulty:
+        for index, difficulty in enumerate(
+            iter_estimate_difficulties(levels, args.time_limit, args.workers)
+        ):
+            print(json.dumps({"index": index, **asdict(difficulty)}))
+    return 0
+
+
+if __name__ == "__main__":
+
+    sys.exit(main())
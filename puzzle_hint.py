@@ -0,0 +1,151 @@
+#! coding:utf-8
+
+"""
+The puzzle_hint module gives the next move to do from a puzzle ("what do I pour next").
+
+A hint is the first move of a solution from the puzzle. When a solution is found, the next move
+of every puzzle along this solution is cached: a user following the hints gets the next ones
+from the cache, without any new search.
+A new search is only done when the user leaves the known solutions. It uses the settings
+finding a first solution the fastest (not the shortest one). A solution found by another
+solving of the puzzle can also fill the cache (@see HintSolver.add_solution).
+
+The moves are bottle indexes of the puzzle: the cache keys keep the order of the bottles
+(unlike Puzzle.state_key).
+
+The cache can be shared by several threads: the searches of an asyncio application are run in
+an executor (@see HintSolver.hint_async) so that they do not block its event loop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Hashable, Optional, Sequence, Tuple
+
+from puzzle import Puzzle
+from puzzle_solver import ProgressMoveOrdering, PuzzleSolver, SolveStatus
+
+# Result of a hint: (status of the search, next (i_source, i_destination) move or None)
+HintResult = Tuple[SolveStatus, Optional[Tuple[int, int]]]
+
+# Executor of the hint searches of all the HintSolver's (@see HintSolver.hint_async)
+HINT_EXECUTOR: Executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hint_solver")
+
+
+def puzzle_position_key(puzzle: Puzzle) -> Hashable:
+    """@return a hashable key of the puzzle content (and of the order of its bottles)."""
+    return puzzle.capacity, tuple(
+        tuple(bottle.doses[: bottle.nb_doses]) for bottle in puzzle.iter_bottles()
+    )
+
+
+class HintSolver:
+    """
+    Next move hints with a cache of the next moves of the puzzles along the found solutions.
+
+    cache_size: maximum number of puzzles in the cache (least recently used are forgotten).
+    time_limit: If not nul, maximum duration (in seconds) of a new search.
+    executor: executor of the searches of hint_async (default is HINT_EXECUTOR).
+    """
+
+    def __init__(
+        self,
+        cache_size: int = 100000,
+        time_limit: float = 0.0,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        self.cache_size = cache_size
+        self.time_limit = time_limit
+        self.executor = HINT_EXECUTOR if executor is None else executor
+        # Lock of the cache and of the statistics (searches are done without the lock)
+        self._lock = threading.Lock()
+        # Next move of the puzzles (None for a puzzle without solution)
+        self.next_moves: OrderedDict[Hashable, Optional[Tuple[int, int]]] = OrderedDict()
+        # Statistics
+        self.nb_hints = 0
+        self.nb_cache_hits = 0
+        self.nb_searches = 0
+
+    def _add_next_move(self, key: Hashable, move: Optional[Tuple[int, int]]) -> None:
+        """Cache the next move of a puzzle (the lock must be held)."""
+        self.next_moves[key] = move
+        self.next_moves.move_to_end(key)
+        while len(self.next_moves) > self.cache_size:
+            self.next_moves.popitem(last=False)
+
+    def add_solution(
+        self,
+        puzzle: Puzzle,
+        status: SolveStatus,
+        moves: Optional[Sequence[Tuple[int, int]]],
+    ) -> None:
+        """
+        Cache the next move of every puzzle along a solution of the puzzle.
+        status: status of the solving that gave the moves. Only a solution (SOLVED) or the
+            proof of no solution by a complete search (NO_SOLUTION) are cached: a pruned or
+            interrupted search tells nothing about the next move.
+        moves: (i_source, i_destination) moves of the solution (bottle indexes of this puzzle),
+            None when there is no solution.
+        """
+        if status == SolveStatus.NO_SOLUTION:
+            with self._lock:
+                self._add_next_move(puzzle_position_key(puzzle), None)
+            return
+        if status != SolveStatus.SOLVED or moves is None:
+            return
+        # Replayed from the puzzle as the moves are bottle indexes of this puzzle
+        next_moves: list[Tuple[Hashable, Tuple[int, int]]] = []
+        position = puzzle.clone()
+        for move in moves:
+            next_moves.append((puzzle_position_key(position), move))
+            position.pour(*move)
+        with self._lock:
+            for key, move in next_moves:
+                self._add_next_move(key, move)
+
+    def hint(self, puzzle: Puzzle) -> HintResult:
+        """
+        @return the status and the next (i_source, i_destination) move to solve the puzzle.
+        The move is None when the puzzle is done (SOLVED status), without solution
+        (NO_SOLUTION status) or when the time limit is reached (TIMEOUT status).
+        The status is returned with the move (not kept in the HintSolver) as the hints of
+        several sessions can be computed at the same time.
+        Raise ValueError if the puzzle is not consistent (@see PuzzleSolver).
+        """
+        key = puzzle_position_key(puzzle)
+        with self._lock:
+            self.nb_hints += 1
+            if puzzle.is_done:
+                return SolveStatus.SOLVED, None
+            if key in self.next_moves:
+                self.nb_cache_hits += 1
+                self.next_moves.move_to_end(key)
+                move = self.next_moves[key]
+                return (SolveStatus.NO_SOLUTION if move is None else SolveStatus.SOLVED), move
+
+        solver = PuzzleSolver(puzzle, time_limit=self.time_limit)
+        with self._lock:
+            self.nb_searches += 1
+        solution = solver.solve(move_ordering=ProgressMoveOrdering(), macro_moves=True)
+        if solution is None:
+            self.add_solution(puzzle, solver.status, None)
+            return solver.status, None
+
+        moves: list[Tuple[int, int]] = []
+        for step in solution.get_puzzle_chain_as_list()[1:]:  # Macro moves one by one
+            assert step.move is not None
+            moves.append(step.move)
+        self.add_solution(puzzle, SolveStatus.SOLVED, moves)
+        return SolveStatus.SOLVED, moves[0]
+
+    async def hint_async(self, puzzle: Puzzle) -> HintResult:
+        """
+        @return the status and the next move of the puzzle (@see hint), searched in the
+        executor so that the running asyncio event loop is not blocked.
+        """
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, self.hint, puzzle.clone()
+        )
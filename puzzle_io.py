@@ -0,0 +1,262 @@
+#! coding:utf-8
+
+"""
+The puzzle_io module reads and writes packs of levels (puzzle and optional solution moves).
+
+Two formats are supported:
+
+- JSON Lines ('.jsonl' files): one JSON object per level (@see LEVEL_JSON_SCHEMA):
+    {"capacity": 4, "bottles": [["A", "A", "B"], ["B"], []], "moves": [[0, 1]]}
+  Any JSON string, number or boolean can be used as a color (colors are compared and hashed).
+
+- Binary ('.wsp' files): compact pack where colors are integers in range 0..255:
+    4 bytes: PACK_MAGIC, 1 byte: PACK_VERSION,
+    then for each level:
+        1 byte: flags (bit 0 set when the level holds a solution),
+        1 byte: number of bottles, 1 byte: bottle capacity,
+        1 byte per bottle: number of doses in the bottle,
+        1 byte per dose: color of the dose (bottles from first to last, doses from bottom to top),
+        when the level holds a solution: 2 bytes (little endian) number of moves and
+        2 bytes per move: source and destination bottle indexes.
+  Binary packs are memory-mapped when read so that very large packs are not loaded in memory.
+
+Levels are read as Level objects holding plain tuples. Bottle and Puzzle objects are only
+created by Level.to_puzzle when the level is actually solved.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+import json
+import mmap
+import struct
+from typing import Any, BinaryIO, Iterator, Optional, Sequence, TextIO, Tuple
+
+from bottle import Bottle
+from puzzle import Puzzle
+from puzzle_solver import PuzzleChain
+
+PACK_MAGIC = b"WSPP"
+PACK_VERSION = 1
+_PACK_HEADER = struct.Struct("<4sB")
+_LEVEL_HEADER = struct.Struct("<BBB")
+_NB_MOVES = struct.Struct("<H")
+_FLAG_SOLUTION = 0x01
+
+# JSON types of the colors (scalars: a color is hashable)
+JSON_COLOR_TYPES = ["string", "number", "boolean"]
+
+# JSON schema of one level in a JSON Lines pack
+LEVEL_JSON_SCHEMA: dict[str, Any] = {
+    "$schema": "https://json-schema.org/draft/2020-12/schema",
+    "title": "Water sort puzzle level",
+    "type": "object",
+    "properties": {
+        "capacity": {"type": "integer", "minimum": 1},
+        "bottles": {
+            "description": "Content of each bottle from bottom to top",
+            "type": "array",
+            "items": {"type": "array", "items": {"type": JSON_COLOR_TYPES}},
+        },
+        "moves": {
+            "description": "Solution as [source, destination] 0 based bottle indexes",
+            "type": "array",
+            "items": {
+                "type": "array",
+                "items": {"type": "integer", "minimum": 0},
+                "minItems": 2,
+                "maxItems": 2,
+            },
+        },
+    },
+    "required": ["capacity", "bottles"],
+}
+
+
+@dataclass(frozen=True)
+class Level:
+    """One level of a pack: the bottles of a puzzle and optionally the moves of a solution."""
+
+    capacity: int
+    bottles: Tuple[Tuple[Any, ...], ...]
+    moves: Optional[Tuple[Tuple[int, int], ...]] = None
+
+    @classmethod
+    def from_puzzle(
+        cls, puzzle: Puzzle, solution: Optional[PuzzleChain] = None
+    ) -> Level:
+        """Create a level from a puzzle and optionally its solution."""
+        moves = None
+        if solution is not None:
+            moves = tuple(
+                puzzle_chain.move
+                for puzzle_chain in solution.iter_puzzle_chains()
+                if puzzle_chain.move is not None
+            )
+        return cls(
+            capacity=puzzle.capacity,
+            bottles=tuple(tuple(bottle.iter_doses()) for bottle in puzzle.iter_bottles()),
+            moves=moves,
+        )
+
+    def to_puzzle(self) -> Puzzle:
+        """Create the Puzzle of this level."""
+        return Puzzle([Bottle(doses, max_doses=self.capacity) for doses in self.bottles])
+
+    def to_json(self) -> dict[str, Any]:
+        """@return the level as a JSON object (@see LEVEL_JSON_SCHEMA)."""
+        json_level: dict[str, Any] = {
+            "capacity": self.capacity,
+            "bottles": [list(doses) for doses in self.bottles],
+        }
+        if self.moves is not None:
+            json_level["moves"] = [list(move) for move in self.moves]
+        return json_level
+
+    @classmethod
+    def from_json(cls, json_level: dict[str, Any]) -> Level:
+        """Create a level from a JSON object (@see LEVEL_JSON_SCHEMA)."""
+        try:
+            capacity = json_level["capacity"]
+            json_bottles = json_level["bottles"]
+            # Arrays only: a string would else be iterated as a bottle of one character colors
+            if not isinstance(json_bottles, list) or not all(
+                isinstance(doses, list) for doses in json_bottles
+            ):
+                raise ValueError(f"Bad JSON level bottles: {json_bottles}")
+            bottles = tuple(tuple(doses) for doses in json_bottles)
+            moves = json_level.get("moves")
+            if moves is not None:
+                moves = tuple((int(source), int(destination)) for source, destination in moves)
+        except (KeyError, TypeError, ValueError) as err:
+            raise ValueError(f"Bad JSON level: {json_level}") from err
+        if not isinstance(capacity, int) or capacity < 1:
+            raise ValueError(f"Bad JSON level capacity: {capacity}")
+        for doses in bottles:
+            if len(doses) > capacity or not all(
+                isinstance(dose, (str, int, float)) for dose in doses
+            ):
+                raise ValueError(f"Bad JSON level bottle: {list(doses)}")
+        return cls(capacity=capacity, bottles=bottles, moves=moves)
+
+
+class JsonLinesLevelWriter:
+    """Write levels to a text stream in the JSON Lines format."""
+
+    def __init__(self, stream: TextIO) -> None:
+        self.stream = stream
+
+    def write(self, level: Level) -> None:
+        """Write one level."""
+        self.stream.write(json.dumps(level.to_json()))
+        self.stream.write("\n")
+
+
+class BinaryLevelWriter:
+    """Write levels to a binary stream in the binary pack format."""
+
+    def __init__(self, stream: BinaryIO) -> None:
+        self.stream = stream
+        self.stream.write(_PACK_HEADER.pack(PACK_MAGIC, PACK_VERSION))
+
+    def write(self, level: Level) -> None:
+        """Write one level (colors must be integers in range 0..255)."""
+        flags = 0 if level.moves is None else _FLAG_SOLUTION
+        try:
+            record = bytearray(_LEVEL_HEADER.pack(flags, len(level.bottles), level.capacity))
+            record.extend(len(doses) for doses in level.bottles)
+            for doses in level.bottles:
+                record.extend(doses)
+            if level.moves is not None:
+                record.extend(_NB_MOVES.pack(len(level.moves)))
+                for move in level.moves:
+                    record.extend(move)
+        except (struct.error, TypeError, ValueError) as err:
+            raise ValueError(f"Level cannot be written in the binary format: {level}") from err
+        self.stream.write(record)
+
+
+def iter_binary_levels(buffer: Sequence[int]) -> Iterator[Level]:
+    """Iterator on the levels of a binary pack held in a bytes-like buffer."""
+    view = memoryview(buffer)  # type: ignore
+    try:
+        if len(view) < _PACK_HEADER.size:
+            raise ValueError("Truncated binary pack header")
+        magic, version = _PACK_HEADER.unpack_from(view, 0)
+        if magic != PACK_MAGIC or version != PACK_VERSION:
+            raise ValueError(f"Not a binary pack (version {PACK_VERSION})")
+        offset = _PACK_HEADER.size
+        size = len(view)
+        while offset < size:
+            flags, nb_bottles, capacity = _LEVEL_HEADER.unpack_from(view, offset)
+            offset += _LEVEL_HEADER.size
+            if capacity < 1:
+                raise ValueError(f"Bad binary pack level capacity: {capacity}")
+            # Copied: a view still exported on an error would prevent the memory map closing
+            nb_doses = bytes(view[offset : offset + nb_bottles])
+            offset += nb_bottles
+            bottles = []
+            for nb in nb_doses:
+                if nb > capacity:
+                    raise ValueError(f"Bad binary pack bottle: {nb} doses for {capacity}")
+                bottles.append(tuple(view[offset : offset + nb]))
+                offset += nb
+            moves = None
+            if flags & _FLAG_SOLUTION:
+                (nb_moves,) = _NB_MOVES.unpack_from(view, offset)
+                offset += _NB_MOVES.size
+                raw_moves = bytes(view[offset : offset + 2 * nb_moves])
+                offset += 2 * nb_moves
+                if len(raw_moves) != 2 * nb_moves:
+                    raise ValueError("Truncated binary pack moves")
+                moves = tuple(zip(raw_moves[0::2], raw_moves[1::2]))
+            if offset > size:
+                raise ValueError("Truncated binary pack level")
+            yield Level(capacity=capacity, bottles=tuple(bottles), moves=moves)
+    except struct.error as err:
+        raise ValueError("Truncated binary pack level") from err
+    finally:
+        view.release()
+
+
+def iter_json_lines_levels(stream: TextIO) -> Iterator[Level]:
+    """Iterator on the levels of a JSON Lines pack."""
+    for line in stream:
+        if line.strip():
+            yield Level.from_json(json.loads(line))
+
+
+def iter_levels_from_file(path: str) -> Iterator[Level]:
+    """
+    Iterator on the levels of a pack file.
+    '.jsonl' files are JSON Lines packs, other files are memory-mapped binary packs.
+    """
+    if path.endswith(".jsonl"):
+        with open(path, "r", encoding="utf-8") as f:
+            yield from iter_json_lines_levels(f)
+        return
+
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            yield from iter_binary_levels(buffer)  # type: ignore
+
+
+def write_levels_to_file(path: str, levels: Iterator[Level]) -> int:
+    """
+    Write the levels in a pack file ('.jsonl' for JSON Lines, else binary).
+    @return number of written levels
+    """
+    nb_levels = 0
+    if path.endswith(".jsonl"):
+        with open(path, "w", encoding="utf-8") as f:
+            json_writer = JsonLinesLevelWriter(f)
+            for level in levels:
+                json_writer.write(level)
+                nb_levels += 1
+    else:
+        with open(path, "wb") as f:
+            binary_writer = BinaryLevelWriter(f)
+            for level in levels:
+                binary_writer.write(level)
+                nb_levels += 1
+    return nb_levels
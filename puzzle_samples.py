@@ -0,0 +1,126 @@
+#! coding:utf-8
+
+"""
+The puzzle_samples module holds some known puzzles used for test, validation
+and benchmark purposes.
+"""
+
+from typing import Optional
+
+from bottle import Bottle
+from puzzle import Puzzle
+
+# Puzzle colors
+LIGHT_GREEN = 0
+GREEN = 1
+DARK_GREEN = 2
+PINK = 3
+YELLOW = 4
+BLUE = 6
+DARK_BLUE = 7
+GRAY = 8
+LIGHT_BLUE = 9
+RED = 10
+ORANGE = 11
+VIOLET = 12
+
+
+def puzzle_from_strings(str_puzzle: list[str], max_doses: Optional[int] = None) -> Puzzle:
+    """
+    Create a puzzle where bottles are defined using strings.
+    Every chars in the string is a color for one dose in a bottle (from bottom to top).
+    max_doses: capacity of the bottles (default is Bottle.MAX_DOSES).
+
+    Example:
+        {"AABB", "BBAA", ""} is for a puzzle hodling 3 bottles:
+        The first bottle "AABB" contains 2 doses of color 'A' and 2 doses of color 'B' on top.
+        The next bottle "BBAA" contains the revert.
+        The last bottle of the puzzle is empty.
+    """
+    puzzle: Puzzle = Puzzle()
+    for str_bottle in str_puzzle:
+        bottle: Bottle = Bottle(str_bottle, max_doses=max_doses)
+        puzzle.add_bottle(bottle)
+    return puzzle
+
+
+def puzzles0() -> list[Puzzle]:
+    """Simple puzzles defined using strings."""
+    return [
+        puzzle_from_strings(["AABB", "BBAA", ""]),
+        puzzle_from_strings(["AABC", "BCCA", "ABBC", ""]),
+    ]
+
+
+def puzzle29() -> Puzzle:
+    """
+    Puzzle #29 in 'Water Sort Puzzle' (Andoid OS)
+    """
+    return Puzzle(
+        [
+            Bottle([GREEN, PINK, YELLOW, DARK_BLUE]),
+            Bottle([GRAY, YELLOW, LIGHT_BLUE, LIGHT_BLUE]),
+            Bottle([GRAY, RED, GRAY, RED]),
+            Bottle([GREEN, DARK_BLUE, ORANGE, GREEN]),
+            Bottle([ORANGE, PINK, PINK, ORANGE]),
+            Bottle([YELLOW, VIOLET, GRAY, VIOLET]),
+            Bottle([LIGHT_BLUE, PINK, VIOLET, YELLOW]),
+            Bottle([LIGHT_BLUE, VIOLET, ORANGE, DARK_BLUE]),
+            Bottle([DARK_BLUE, RED, GREEN, RED]),
+            Bottle([]),
+            Bottle([]),
+        ]
+    )
+
+
+def puzzle37() -> Puzzle:
+    """
+    Puzzle #37 in 'Water Sort Puzzle' (Andoid OS)
+    """
+    return Puzzle(
+        [
+            Bottle([PINK, LIGHT_BLUE, RED, ORANGE]),
+            Bottle([VIOLET, GREEN, GRAY, DARK_BLUE]),
+            Bottle([ORANGE, GRAY, RED, VIOLET]),
+            Bottle([DARK_BLUE, LIGHT_BLUE, LIGHT_BLUE, RED]),
+            Bottle([PINK, LIGHT_BLUE, GREEN, PINK]),
+            Bottle([VIOLET, YELLOW, GREEN, GREEN]),
+            Bottle([DARK_BLUE, ORANGE, YELLOW, GRAY]),
+            Bottle([YELLOW, PINK, ORANGE, VIOLET]),
+            Bottle([GRAY, YELLOW, DARK_BLUE, RED]),
+            Bottle([]),
+            Bottle([]),
+        ]
+    )
+
+
+def puzzle112() -> Puzzle:
+    """
+    Puzzle #112 in 'Water Sort Puzzle' (Andoid OS)
+    """
+    return Puzzle(
+        [
+            Bottle([LIGHT_GREEN, DARK_BLUE, BLUE, GRAY]),
+            Bottle([DARK_GREEN, PINK, GRAY, DARK_BLUE]),
+            Bottle([DARK_GREEN, GREEN, LIGHT_BLUE, VIOLET]),
+            Bottle([GREEN, PINK, BLUE, ORANGE]),
+            Bottle([GREEN, YELLOW, DARK_BLUE, PINK]),
+            Bottle([ORANGE, GREEN, BLUE, RED]),
+            Bottle([VIOLET, DARK_GREEN, VIOLET, LIGHT_GREEN]),
+            Bottle([RED, DARK_GREEN, LIGHT_GREEN, VIOLET]),
+            Bottle([DARK_BLUE, LIGHT_BLUE, LIGHT_BLUE, ORANGE]),
+            Bottle([RED, BLUE, PINK, LIGHT_GREEN]),
+            Bottle([GRAY, ORANGE, LIGHT_BLUE, YELLOW]),
+            Bottle([YELLOW, GRAY, RED, YELLOW]),
+            Bottle([]),
+            Bottle([]),
+        ]
+    )
+
+
+# Named sample puzzles (used by benchmarks)
+SAMPLE_PUZZLES = {
+    "#29": puzzle29,
+    "#37": puzzle37,
+    "#112": puzzle112,
+}
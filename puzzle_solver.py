@@ -14,12 +14,20 @@ from dataclasses import dataclass, field
 
 from itertools import permutations
 import collections
+import contextlib
+import functools
+import heapq
+import sys
 import time
 import math
-from typing import Optional
+from enum import Enum
+from typing import Any, Callable, Hashable, Iterator, Optional, Tuple
 
 from bottle import Bottle
+from dominance import DominanceTable
 from puzzle import Puzzle
+from search_progress import ProgressEstimate, SearchProgress
+from transposition_table import TranspositionTable
 
 
 @dataclass
@@ -31,9 +39,24 @@ class PuzzleChain:
     previous_puzzle_chain: Optional[PuzzleChain]
     puzzle: Puzzle
     message: str
+    # (i_source, i_destination) bottle indexes of the move from the previous puzzle
+    move: Optional[Tuple[int, int]] = None
+    # Forced moves done after the move in the same search step (@see PuzzleSolver.solve)
+    macro_moves: Tuple[Tuple[int, int], ...] = ()
     nb_chains_without_empty_bottle: int = field(init=False)
+    depth: int = field(init=False)
+    # Puzzle.state_key of the puzzle (the puzzle of a PuzzleChain is never changed)
+    state_key: Hashable = field(init=False, repr=False, compare=False)
 
     def __post_init__(self):
+        self.state_key = self.puzzle.state_key()
+
+        # Number of moves from the initial puzzle
+        if self.previous_puzzle_chain is None:
+            self.depth = 0
+        else:
+            self.depth = self.previous_puzzle_chain.depth + 1 + len(self.macro_moves)
+
         # Update with the number of previous PuzzleChain having at least one empty bottle
         if self.previous_puzzle_chain is None:
             self.nb_chains_without_empty_bottle = 0
@@ -44,28 +67,28 @@ class PuzzleChain:
                 self.previous_puzzle_chain.nb_chains_without_empty_bottle + 1
             )
 
-    def show_puzzle_chains(self) -> str:
-        """Show the full PuzzleChain's from the start given one end PuzzleChain."""
+    def str_step(self, step: int) -> str:
+        """Show this PuzzleChain as the step number 'step' of a solution."""
+        return f"Step#{step}: {self.message}:\n  {self.puzzle}\n"
 
-        # Create list of puzzles in the chain
-        puzzle_chain_queue: collections.deque[PuzzleChain] = collections.deque()
-        puzzle_chain_queue.append(self)
-        previous: Optional[PuzzleChain] = self.previous_puzzle_chain
-        while previous is not None:
-            puzzle_chain_queue.append(previous)
-            previous = previous.previous_puzzle_chain
+    def iter_puzzle_chains(self) -> Iterator[PuzzleChain]:
+        """Iterator on the PuzzleChain's from the start to this one."""
+        return iter(self.get_puzzle_chain_as_list())
 
-        # Show all moves
-        ret = ""
-        step = 1
-        while len(puzzle_chain_queue):
-            puzzle_chain: PuzzleChain = puzzle_chain_queue.pop()
-            ret += f"Step#{step}: {puzzle_chain.message}:\n  {puzzle_chain.puzzle}\n"
-            step += 1
-        return ret
+    def iter_str_steps(self) -> Iterator[str]:
+        """Iterator on the shown steps from the start given one end PuzzleChain."""
+        for step, puzzle_chain in enumerate(self.iter_puzzle_chains(), 1):
+            yield puzzle_chain.str_step(step)
+
+    def show_puzzle_chains(self) -> str:
+        """Show the full PuzzleChain's from the start given one end PuzzleChain."""
+        return "".join(self.iter_str_steps())
 
     def get_puzzle_chain_as_list(self) -> list[PuzzleChain]:
-        """Return a list of PuzzleChain for the solving steps"""
+        """
+        Return a list of PuzzleChain for the solving steps
+        (PuzzleChain's with macro moves are expanded in one PuzzleChain per move).
+        """
         puzzle_chain_list: list[PuzzleChain] = [self]
         previous: Optional[PuzzleChain] = self.previous_puzzle_chain
         while previous is not None:
@@ -73,7 +96,237 @@ class PuzzleChain:
             previous = previous.previous_puzzle_chain
 
         puzzle_chain_list.reverse()
-        return puzzle_chain_list
+        if not any(puzzle_chain.macro_moves for puzzle_chain in puzzle_chain_list):
+            return puzzle_chain_list
+
+        expanded_list: list[PuzzleChain] = [puzzle_chain_list[0]]
+        for puzzle_chain in puzzle_chain_list[1:]:
+            if not puzzle_chain.macro_moves and (
+                puzzle_chain.previous_puzzle_chain is expanded_list[-1]
+            ):
+                expanded_list.append(puzzle_chain)
+                continue
+            # Replay the moves from the last expanded puzzle
+            assert puzzle_chain.move is not None
+            for move in (puzzle_chain.move,) + puzzle_chain.macro_moves:
+                expanded_list.append(expanded_list[-1].new_puzzle_chain(move))
+        return expanded_list
+
+    def new_puzzle_chain(self, move: Tuple[int, int]) -> PuzzleChain:
+        """@return the PuzzleChain of one move (i_source, i_destination) from this one."""
+        i_source, i_destination = move
+        new_puzzle = self.puzzle.clone()
+        new_puzzle.pour(i_source, i_destination)
+        return PuzzleChain(
+            previous_puzzle_chain=self,
+            puzzle=new_puzzle,
+            message=f"Pour #{i_source + 1} into #{i_destination + 1}",
+            move=move,
+        )
+
+
+class MoveOrdering:
+    """
+    MoveOrdering defines the order in which the possible moves from a puzzle are explored.
+
+    The possible moves with the highest score are explored first.
+    This base class gives the same score to every move so that moves are explored in the
+    reverse order of the bottle permutations (the historical order of the solver).
+    """
+
+    def start(self) -> None:
+        """Called when a new solving starts (reset of any learned data)."""
+
+    def on_expanded(self, puzzle_chain: PuzzleChain) -> None:
+        """Called when the moves from the puzzle of puzzle_chain are explored (learning)."""
+
+    def score(self, puzzle_chain: PuzzleChain, new_puzzle_chain: PuzzleChain) -> float:
+        """@return the score of the move from puzzle_chain to new_puzzle_chain."""
+        return 0.0
+
+
+class ProgressMoveOrdering(MoveOrdering):
+    """
+    Moves completing a bottle are explored first, then moves emptying the source bottle.
+    Moves into an empty bottle are explored last.
+    """
+
+    @staticmethod
+    def progress_score(puzzle_chain: PuzzleChain, new_puzzle_chain: PuzzleChain) -> float:
+        """@return score of the progress made by the move (using the puzzle summaries)."""
+        puzzle = puzzle_chain.puzzle
+        new_puzzle = new_puzzle_chain.puzzle
+        score = 0.0
+        if new_puzzle.nb_complete_bottles > puzzle.nb_complete_bottles:
+            score += 4.0  # The move completes a bottle
+        if new_puzzle.nb_empty_bottles > puzzle.nb_empty_bottles:
+            score += 2.0  # The move frees a bottle
+        elif new_puzzle.nb_empty_bottles < puzzle.nb_empty_bottles:
+            score -= 1.0  # The move pours into an empty bottle
+        return score
+
+    def score(self, puzzle_chain: PuzzleChain, new_puzzle_chain: PuzzleChain) -> float:
+        return self.progress_score(puzzle_chain, new_puzzle_chain)
+
+
+class HistoryMoveOrdering(ProgressMoveOrdering):
+    """
+    Same as ProgressMoveOrdering but also learning from the expanded puzzles of the solving:
+    - History table: number of times an expanded puzzle came from a (source, destination) move
+      making progress,
+    - Killer moves: last move making progress to an expanded puzzle at each depth.
+    These learned values break ties between moves having the same progress score: their
+    bonus (below KILLER_BONUS + HISTORY_BONUS) is lower than the smallest difference of
+    progress scores (1).
+    """
+
+    KILLER_BONUS = 0.25
+    HISTORY_BONUS = 0.25
+
+    def __init__(self) -> None:
+        self.history: collections.Counter[Tuple[int, int]] = collections.Counter()
+        self.killer_moves: dict[int, Tuple[int, int]] = {}
+
+    def start(self) -> None:
+        self.history.clear()
+        self.killer_moves.clear()
+
+    def on_expanded(self, puzzle_chain: PuzzleChain) -> None:
+        move = puzzle_chain.move
+        previous_puzzle_chain = puzzle_chain.previous_puzzle_chain
+        if move is None or previous_puzzle_chain is None:
+            return
+        if self.progress_score(previous_puzzle_chain, puzzle_chain) > 0.0:
+            # Learn this move making progress
+            self.history[move] += 1
+            self.killer_moves[puzzle_chain.depth] = move
+
+    def score(self, puzzle_chain: PuzzleChain, new_puzzle_chain: PuzzleChain) -> float:
+        move = new_puzzle_chain.move
+        score = self.progress_score(puzzle_chain, new_puzzle_chain)
+        if self.killer_moves.get(new_puzzle_chain.depth) == move:
+            score += self.KILLER_BONUS
+        nb_history = self.history[move]
+        return score + self.HISTORY_BONUS * nb_history / (nb_history + 1)
+
+
+# Move orderings that can be selected by name
+MOVE_ORDERINGS: dict[str, type[MoveOrdering]] = {
+    "none": MoveOrdering,
+    "progress": ProgressMoveOrdering,
+    "history": HistoryMoveOrdering,
+}
+
+
+class CostModel:
+    """
+    CostModel defines the cost of the moves for @see PuzzleSolver.solve_weighted.
+    This base class gives the same cost (1) to every move so that the cheapest solution
+    is the shortest one.
+    """
+
+    # Minimum cost of a move (used to scale the lower bound of the remaining cost)
+    min_move_cost: float = 1.0
+
+    def move_cost(self, puzzle_chain: PuzzleChain, new_puzzle_chain: PuzzleChain) -> float:
+        """@return the cost of the move from puzzle_chain to new_puzzle_chain."""
+        return 1.0
+
+    def search_key(self, puzzle_chain: PuzzleChain) -> Hashable:
+        """
+        @return the part of the PuzzleChain, other than its puzzle, that the next move
+        costs depend on (None when costs only depend on puzzles).
+        """
+        return None
+
+
+class EmptyBottleCostModel(CostModel):
+    """
+    More human likely solutions: each move costs 1 plus a penalty for each move done after
+    max_chains_without_empty_bottle consecutive moves without an empty bottle in the puzzle.
+    The penalty grows with the length of the stretch without an empty bottle.
+    """
+
+    def __init__(
+        self, max_chains_without_empty_bottle: int = 4, penalty: float = 1.0
+    ) -> None:
+        self.max_chains_without_empty_bottle = max_chains_without_empty_bottle
+        self.penalty = penalty
+
+    def move_cost(self, puzzle_chain: PuzzleChain, new_puzzle_chain: PuzzleChain) -> float:
+        nb_over = (
+            new_puzzle_chain.nb_chains_without_empty_bottle
+            - self.max_chains_without_empty_bottle
+            + 1
+        )
+        if nb_over > 0:
+            return 1.0 + self.penalty * nb_over
+        return 1.0
+
+    def search_key(self, puzzle_chain: PuzzleChain) -> Hashable:
+        # Capped so that the search is finite: the same puzzles reached by longer and longer
+        # stretches without an empty bottle are not all different search states
+        return min(
+            puzzle_chain.nb_chains_without_empty_bottle,
+            self.max_chains_without_empty_bottle,
+        )
+
+
+class SolveStatus(str, Enum):
+    """Status of the last solving of a PuzzleSolver."""
+
+    NOT_SOLVED = "not solved"  # Solving not done yet
+    SOLVED = "solved"  # A solution is found
+    NO_SOLUTION = "no solution"  # The complete search did not find a solution
+    PRUNED = "pruned"  # DFS failed because puzzles were dropped (nb_chains_without_empty_bottle)
+    WIDTH_LIMITED = "width limited"  # Beam search failed because states were discarded
+    TIMEOUT = "timeout"  # The time limit was reached before the end of the search
+
+
+class _TimeLimitReached(Exception):
+    """Internal exception to stop a solving when the time limit is reached."""
+
+
+def beam_score_default(puzzle: Puzzle) -> Tuple[int, int]:
+    """Default beam score of a puzzle (lower is better)."""
+    return puzzle.lower_bound_nb_moves(), -puzzle.nb_empty_bottles
+
+
+def _release_search_memory_after(solve_method: Callable) -> Callable:
+    """
+    Decorator of the solve methods of PuzzleSolver: the search structures are released
+    when the solving ends (@see PuzzleSolver.keep_search_memory).
+    """
+
+    @functools.wraps(solve_method)
+    def wrapper(self: PuzzleSolver, *args: Any, **kwargs: Any) -> Optional[PuzzleChain]:
+        try:
+            return solve_method(self, *args, **kwargs)
+        finally:
+            if not self.keep_search_memory:
+                self.release_search_memory()
+
+    return wrapper
+
+
+def _track_search_progress(is_depth_first: bool) -> Callable[[Callable], Callable]:
+    """
+    Decorator of the solve methods of PuzzleSolver collecting the statistics of the search
+    for its progress estimates (@see PuzzleSolver.progress_estimate).
+    """
+
+    def decorator(solve_method: Callable) -> Callable:
+        @functools.wraps(solve_method)
+        def wrapper(self: PuzzleSolver, *args: Any, **kwargs: Any) -> Optional[PuzzleChain]:
+            self.search_progress = SearchProgress(is_depth_first=is_depth_first)
+            try:
+                return solve_method(self, *args, **kwargs)
+            finally:
+                self.search_progress.stop()
+
+        return wrapper
+
+    return decorator
 
 
 class PuzzleSolver:
@@ -90,12 +343,61 @@ class PuzzleSolver:
 
     If computing takes long times, it is also possible to activate the verbose mode that prints
     regular data on actual computation.
+
+    The order in which the possible moves are explored can be changed with a MoveOrdering.
+    It does not change whether a solution is found but how fast the first solution is found.
+
+    For very large puzzles, @see solve_beam gives a fast bounded-memory (but not exhaustive)
+    search.
+
+    @see solve_weighted finds the cheapest solution for a CostModel (instead of dropping
+    puzzles with too many moves without an empty bottle).
+
+    solve and solve_weighted can also skip the puzzles dominated by an already expanded
+    puzzle (@see dominance module).
+
+    The progress of solve and solve_weighted (estimated remaining time, ...) is given by
+    @see progress_estimate, for example to show it or to cancel a solving too long.
+
+    time_limit: If not nul, maximum duration (in seconds) of a solving.
+        When reached, the solving returns None with the SolveStatus.TIMEOUT status.
+    keep_search_memory: If True, the search structures (explored puzzles, puzzles to
+        explore, ...) are kept after a solving (for example to inspect them).
+        By default, they are released when the solving ends and only the solution is kept.
     """
 
-    def __init__(self, puzzle: Puzzle) -> None:
+    def __init__(
+        self, puzzle: Puzzle, time_limit: float = 0.0, keep_search_memory: bool = False
+    ) -> None:
         if not puzzle.is_consistent:
             raise ValueError(f"Bad puzzle: {puzzle}")
         self.puzzle: Puzzle = puzzle.clone()
+        self.time_limit: float = time_limit
+        self.keep_search_memory: bool = keep_search_memory
+        self._is_cancelled: bool = False
+        self._deadline: float = math.inf
+        self.move_ordering: Optional[MoveOrdering] = None
+        self.puzzle_chains_todo: collections.deque[PuzzleChain] = collections.deque()
+        self.puzzle_chains_done: collections.deque[PuzzleChain] = collections.deque()
+        # Keys of the puzzles in the done list (@see Puzzle.state_key)
+        self.puzzle_keys_done: set[Hashable] = set()
+        # Memory bounded alternative to puzzle_keys_done and puzzle_chains_done (@see solve)
+        self.transposition_table: Optional[TranspositionTable] = None
+        # Expanded puzzles to skip the dominated ones (None if not used)
+        self.dominance_table: Optional[DominanceTable] = None
+        # Forced moves done in the same search step as the previous move (@see solve)
+        self.macro_moves: bool = False
+        # Statistics of the last solving
+        self.status: SolveStatus = SolveStatus.NOT_SOLVED
+        self.nb_loops: int = 0
+        # Number of puzzles whose moves have been computed
+        self.nb_expanded_puzzles: int = 0
+        self.nb_dropped_puzzles: int = 0
+        self.nb_dominated_puzzles: int = 0
+        self.nb_macro_moves: int = 0
+        self.solution_cost: Optional[float] = None
+        # Statistics of the current (or last) search for its progress estimates
+        self.search_progress: Optional[SearchProgress] = None
 
     @staticmethod
     def str_second(sec: float) -> str:
@@ -111,21 +413,58 @@ class PuzzleSolver:
             return f"{min_value} mn {sec_value:02d} s"
         return f"{sec_value} secs"
 
-    @staticmethod
-    def estimated_time(nb_todo: int, nb_done: int, time_done: float) -> float:
+    def progress_estimate(self) -> Optional[ProgressEstimate]:
         """
-        @return estimated duration to compute nb_todo given time_done for computing nb_done.
-        The 'exponential' model is used: time = math.exp(coefficient_a * nb)
+        @return the progress estimate of the current (or last) solving (@see search_progress)
+        or None if there is no estimate (no solving yet or solve_beam).
+        Can be called from another thread during the solving.
         """
-        try:
-            coefficient_a: float = math.log(time_done) / nb_done
-            total_time = math.exp(coefficient_a * (nb_done + nb_todo))
-            return total_time - time_done
-        except (ValueError, ZeroDivisionError, OverflowError):
-            return 0
+        if self.search_progress is None:
+            return None
+        return self.search_progress.estimate()
+
+    def cancel(self) -> None:
+        """
+        Cancel the current and next solvings (for example from another thread).
+        They end as when the time limit is reached (SolveStatus.TIMEOUT status).
+        """
+        self._is_cancelled = True
+        self._deadline = -math.inf
+
+    def _start_time_limit(self) -> None:
+        """Start the time limit of a new solving."""
+        if self._is_cancelled:
+            self._deadline = -math.inf
+        elif self.time_limit:
+            self._deadline = time.perf_counter() + self.time_limit
+        else:
+            self._deadline = math.inf
+
+    def _check_time_limit(self) -> None:
+        """Raise _TimeLimitReached when the time limit of the solving is reached."""
+        if time.perf_counter() > self._deadline:
+            raise _TimeLimitReached()
+
+    def release_search_memory(self) -> None:
+        """
+        Release the search structures of the last solving.
+        A transposition table given to solve is kept as it belongs to the caller.
+        """
+        self.puzzle_chains_todo = collections.deque()
+        self.puzzle_chains_done = collections.deque()
+        self.puzzle_keys_done = set()
+        self.dominance_table = None
 
+    @_release_search_memory_after
+    @_track_search_progress(is_depth_first=True)
     def solve(
-        self, nb_chains_without_empty_bottle: int = 0, verbose_cycle: float = 0.0
+        self,
+        nb_chains_without_empty_bottle: int = 0,
+        verbose_cycle: float = 0.0,
+        move_ordering: Optional[MoveOrdering] = None,
+        prune_dominated: bool = False,
+        macro_moves: bool = False,
+        transposition_table: Optional[TranspositionTable] = None,
     ) -> Optional[PuzzleChain]:
         """
         Solve the puzzle.
@@ -134,13 +473,28 @@ class PuzzleSolver:
             To be used for more human likely solution finding.
         verbose_cycle: If not nul, periodical trace (in seconds) of the current solving situation.
             To be used in case of long computations.
+        move_ordering: If not None, order in which the possible moves are explored.
+        prune_dominated: If True, puzzles dominated by a puzzle already expanded at a lower or
+            equal depth are not expanded (their number is in nb_dominated_puzzles).
+        macro_moves: If True, forced moves (@see find_forced_move) are done in the same search
+            step as the move before them (their number is in nb_macro_moves).
+            PuzzleChain.get_puzzle_chain_as_list gives back one step per move.
+        transposition_table: If not None, the explored puzzles are kept in this fixed size
+            table instead of puzzle_keys_done and puzzle_chains_done (@see transposition_table).
+            The puzzles are only known by a 64 bits hash there: a (very unlikely) collision can
+            prune a solution.
         """
         time_start = time.perf_counter()
         next_time_verbose: float = verbose_cycle
+        self._start_time_limit()
+
+        self.move_ordering = move_ordering
+        if move_ordering is not None:
+            move_ordering.start()
 
         # List of Puzzles to do
         # The first item in this list is the initial puzzle to solve which has no previous puzzle.
-        self.puzzle_chains_todo: collections.deque[PuzzleChain] = collections.deque()
+        self.puzzle_chains_todo = collections.deque()
         self.puzzle_chains_todo.append(
             PuzzleChain(
                 previous_puzzle_chain=None, puzzle=self.puzzle, message="Puzzle:"
@@ -148,35 +502,57 @@ class PuzzleSolver:
         )
 
         # List of puzzles that have been computed (empty at the beginning)
-        self.puzzle_chains_done: collections.deque[PuzzleChain] = collections.deque()
+        self.puzzle_chains_done = collections.deque()
+        self.puzzle_keys_done = set()
+        self.dominance_table = DominanceTable() if prune_dominated else None
+        self.macro_moves = macro_moves
+        self.transposition_table = transposition_table
+        if transposition_table is not None:
+            transposition_table.clear()
 
         # Examination loop
-        nb_loops: int = 0
-        nb_dropped_puzzles: int = 0
+        search_progress = self.search_progress
+        assert search_progress is not None
+        self.nb_loops = 0
+        self.nb_expanded_puzzles = 0
+        self.nb_dropped_puzzles = 0
+        self.nb_dominated_puzzles = 0
+        self.nb_macro_moves = 0
+
+        if self.puzzle.is_done:
+            # Solution without any move (the loop only checks the puzzles after a move)
+            self.status = SolveStatus.SOLVED
+            return self.puzzle_chains_todo.pop()
 
         while len(self.puzzle_chains_todo):
-            nb_loops += 1
+            self.nb_loops += 1
             current_time = time.perf_counter() - time_start
+            if current_time + time_start > self._deadline:
+                self.status = SolveStatus.TIMEOUT
+                return None
 
             # Verbosity ?
             if verbose_cycle and current_time > next_time_verbose:
                 next_time_verbose += verbose_cycle
-                nb_done = len(self.puzzle_chains_done)
+                nb_done = self.nb_expanded_puzzles
                 nb_todo = len(self.puzzle_chains_todo)
-                time_todo = self.estimated_time(nb_todo, nb_done, current_time)
+                estimate = search_progress.estimate()
+                time_low, time_high = estimate.time_remaining_range
                 if nb_done + nb_todo > 0:
                     print(
                         f"Computation after {self.str_second(current_time)}: "
-                        f"loops=#{nb_loops}, "
+                        f"loops=#{self.nb_loops}, "
                         f"todo={nb_todo}, "
                         f"done={nb_done}, "
-                        f"ratio done/todo={(100 *nb_done) / (nb_done + nb_todo):.1f}%, "
-                        f"dropped={nb_dropped_puzzles}, "
-                        f"solution in {self.str_second(time_todo)}..."
+                        f"search done={100 * estimate.fraction_done:.1f}%, "
+                        f"dropped={self.nb_dropped_puzzles}, "
+                        f"end of search in {self.str_second(estimate.time_remaining)} "
+                        f"({self.str_second(time_low)} to {self.str_second(time_high)})..."
                     )
 
             # Next puzzle in the todo list
             puzzle_chain = self.puzzle_chains_todo.pop()
+            search_progress.on_examined(puzzle_chain.depth)
 
             # Drop it if too many moves without an empty bottle
             if (
@@ -184,39 +560,83 @@ class PuzzleSolver:
                 and puzzle_chain.nb_chains_without_empty_bottle
                 >= nb_chains_without_empty_bottle
             ):
-                nb_dropped_puzzles += 1
+                self.nb_dropped_puzzles += 1
                 continue
 
             # Compute this puzzle
             if (ret := self._explore_a_puzzle_chain(puzzle_chain)) is not None:
+                self.status = SolveStatus.SOLVED
                 return ret  # Solution found
 
         # No more puzzle in the todo list
+        if self.nb_dropped_puzzles:
+            self.status = SolveStatus.PRUNED  # A dropped puzzle may lead to a solution
+        else:
+            self.status = SolveStatus.NO_SOLUTION
         return None  # No solution
 
     def _explore_a_puzzle_chain(
         self, puzzle_chain: PuzzleChain
     ) -> Optional[PuzzleChain]:
         """Considering all possible moves from puzzle in this PuzzleChain."""
-        if self.is_puzzle_already_done(puzzle_chain.puzzle):
+        puzzle_key = puzzle_chain.state_key
+        if self.transposition_table is not None:
+            packed_key = self.transposition_table.pack_key(puzzle_key)
+            if self.transposition_table.probe(packed_key, puzzle_chain.depth):
+                return None
+            if self._is_in_previous_puzzle_chains(puzzle_chain, puzzle_key):
+                return None  # Forgotten puzzle of a cycle
+            self.transposition_table.store(packed_key, puzzle_chain.depth)
+        else:
+            if puzzle_key in self.puzzle_keys_done:
+                return None
+            self.puzzle_keys_done.add(puzzle_key)
+        if self._is_dominated(puzzle_chain.puzzle, puzzle_chain.depth):
             return None
-        self.puzzle_chains_done.append(puzzle_chain)
+        if self.transposition_table is None:
+            self.puzzle_chains_done.append(puzzle_chain)
+        self.nb_expanded_puzzles += 1
+        if self.move_ordering is not None:
+            self.move_ordering.on_expanded(puzzle_chain)
         return self._generate_puzzle_chains_todo_from(puzzle_chain)
 
-    def is_puzzle_already_done(self, puzzle: Puzzle) -> bool:
-        """Return True if a similar puzzle is already in the done list"""
-        for puzzle_chain in self.puzzle_chains_done:
-            if puzzle.is_same_as(puzzle_chain.puzzle):
+    @staticmethod
+    def _is_in_previous_puzzle_chains(puzzle_chain: PuzzleChain, puzzle_key: Hashable) -> bool:
+        """
+        Return True if the puzzle is already in a previous PuzzleChain.
+        A puzzle forgotten by the transposition table could be explored again in a cycle
+        of moves without end.
+        """
+        previous_puzzle_chain = puzzle_chain.previous_puzzle_chain
+        while previous_puzzle_chain is not None:
+            if previous_puzzle_chain.state_key == puzzle_key:
                 return True
+            previous_puzzle_chain = previous_puzzle_chain.previous_puzzle_chain
         return False
 
-    def _generate_puzzle_chains_todo_from(
-        self, puzzle_chain: PuzzleChain
-    ) -> Optional[PuzzleChain]:
+    def _is_dominated(self, puzzle: Puzzle, depth: float) -> bool:
         """
-        Add all interesting possible moves from the puzzle in this PuzzleChain
-        in the todo queue.
+        @return True if the puzzle is dominated by an already expanded puzzle
+        (else it is added to the expanded puzzles of the dominance table, if any).
         """
+        if self.dominance_table is None:
+            return False
+        if self.dominance_table.is_dominated(puzzle, depth):
+            self.nb_dominated_puzzles += 1
+            return True
+        self.dominance_table.add(puzzle, depth)
+        return False
+
+    def is_puzzle_already_done(self, puzzle: Puzzle) -> bool:
+        """Return True if a similar puzzle is already in the done list"""
+        if self.transposition_table is not None:
+            packed_key = self.transposition_table.pack_key(puzzle.state_key())
+            return self.transposition_table.probe(packed_key, sys.maxsize)
+        return puzzle.state_key() in self.puzzle_keys_done
+
+    @staticmethod
+    def iter_new_puzzle_chains(puzzle_chain: PuzzleChain) -> Iterator[PuzzleChain]:
+        """Iterator on the PuzzleChain's of all interesting possible moves from puzzle_chain."""
         puzzle: Puzzle = puzzle_chain.puzzle
 
         # Consider every 2-bottles permutations in the puzzle
@@ -226,168 +646,355 @@ class PuzzleSolver:
 
             if bottle_source.is_interesting_to_pour_into(bottle_destination):
                 # Create a copy for this new possible interesting move
-                new_puzzle = puzzle.clone()
-                bottle_source = new_puzzle[i_source]
-                bottle_destination = new_puzzle[i_destination]
-                bottle_source.pour_into(bottle_destination)
-                new_puzzle_chain = PuzzleChain(
-                    previous_puzzle_chain=puzzle_chain,
-                    puzzle=new_puzzle,
-                    message=f"Pour #{i_source + 1} into #{i_destination + 1}",
+                yield puzzle_chain.new_puzzle_chain((i_source, i_destination))
+
+    @staticmethod
+    def find_forced_move(puzzle: Puzzle) -> Optional[Tuple[int, int]]:
+        """
+        @return a move that can be done without losing a solution or None:
+        a move completing a bottle with the whole top of the source, or the only
+        interesting move.
+        """
+        only_move: Optional[Tuple[int, int]] = None
+        nb_moves = 0
+        for (i_source, i_destination) in permutations(range(len(puzzle)), 2):
+            bottle_source: Bottle = puzzle[i_source]
+            bottle_destination: Bottle = puzzle[i_destination]
+            if not bottle_source.is_interesting_to_pour_into(bottle_destination):
+                continue
+            if (
+                bottle_destination.nb_doses
+                and bottle_destination.nb_top_doses == bottle_destination.nb_doses
+                and bottle_source.nb_top_doses + bottle_destination.nb_doses
+                == bottle_destination.max_doses
+            ):
+                return i_source, i_destination  # Completes the destination
+            nb_moves += 1
+            only_move = i_source, i_destination
+        return only_move if nb_moves == 1 else None
+
+    def _apply_forced_moves(self, puzzle_chain: PuzzleChain) -> PuzzleChain:
+        """
+        @return the PuzzleChain with the forced moves (@see find_forced_move) done after
+        its move, as one macro move.
+        """
+        puzzle = puzzle_chain.puzzle
+        puzzle_keys = {puzzle.state_key()}
+        macro_moves: list[Tuple[int, int]] = []
+        while not puzzle.is_done:
+            move = self.find_forced_move(puzzle)
+            if move is None:
+                break
+            new_puzzle = puzzle.clone()
+            new_puzzle.pour(*move)
+            puzzle_key = new_puzzle.state_key()
+            if puzzle_key in puzzle_keys:
+                break  # The only moves go round in circles
+            puzzle_keys.add(puzzle_key)
+            puzzle = new_puzzle
+            macro_moves.append(move)
+
+        if not macro_moves:
+            return puzzle_chain
+        self.nb_macro_moves += len(macro_moves)
+        messages = [puzzle_chain.message] + [
+            f"#{i_source + 1} into #{i_destination + 1}"
+            for i_source, i_destination in macro_moves
+        ]
+        return PuzzleChain(
+            previous_puzzle_chain=puzzle_chain.previous_puzzle_chain,
+            puzzle=puzzle,
+            message=", then ".join(messages),
+            move=puzzle_chain.move,
+            macro_moves=tuple(macro_moves),
+        )
+
+    def _generate_puzzle_chains_todo_from(
+        self, puzzle_chain: PuzzleChain
+    ) -> Optional[PuzzleChain]:
+        """
+        Add all interesting possible moves from the puzzle in this PuzzleChain
+        in the todo queue.
+        """
+        new_puzzle_chains: list[PuzzleChain] = []
+        for new_puzzle_chain in self.iter_new_puzzle_chains(puzzle_chain):
+            if self.macro_moves:
+                new_puzzle_chain = self._apply_forced_moves(new_puzzle_chain)
+            if new_puzzle_chain.puzzle.is_done:
+                return new_puzzle_chain
+            new_puzzle_chains.append(new_puzzle_chain)
+
+        # The last puzzle in the todo list is the next to be explored
+        if self.move_ordering is not None:
+            move_ordering = self.move_ordering
+            new_puzzle_chains.sort(
+                key=lambda new_puzzle_chain: move_ordering.score(
+                    puzzle_chain, new_puzzle_chain
                 )
-                self.puzzle_chains_todo.append(new_puzzle_chain)
-                if new_puzzle.is_done:
-                    return new_puzzle_chain
+            )
+        if self.search_progress is not None:
+            self.search_progress.on_expanded(
+                puzzle_chain.depth,
+                [new_puzzle_chain.depth for new_puzzle_chain in new_puzzle_chains],
+            )
+        self.puzzle_chains_todo.extend(new_puzzle_chains)
         return None
 
+    @_release_search_memory_after
+    @_track_search_progress(is_depth_first=False)
+    def solve_weighted(
+        self,
+        cost_model: Optional[CostModel] = None,
+        weight: float = 1.0,
+        lower_bound: Optional[Callable[[Puzzle], float]] = None,
+        prune_dominated: bool = False,
+    ) -> Optional[PuzzleChain]:
+        """
+        Solve the puzzle with a weighted A* search on the move costs of the cost model.
+        Puzzles are explored by increasing cost + weight * lower bound of the remaining cost.
+        cost_model: Cost of the moves (default is 1 per move).
+        weight: 1 gives the cheapest solution (A*), 0 is a uniform-cost search.
+            Greater than 1 finds a solution faster but that can cost up to weight times
+            the cheapest one.
+        lower_bound: Lower bound of the number of moves to solve a puzzle
+            (default is Puzzle.lower_bound_nb_moves, @see pattern_database for a stronger one).
+            It must never exceed the moves of a shortest solution (admissible) for the
+            cheapest solution guarantee of weight 1.
+        prune_dominated: If True, puzzles dominated by a puzzle already expanded at a lower or
+            equal cost are not expanded (only with the default cost model).
+        The cost of the solution is in solution_cost.
+        """
+        if cost_model is None:
+            cost_model = CostModel()
+        if prune_dominated and type(cost_model) is not CostModel:
+            # The dominance rules hold for numbers of moves only
+            raise ValueError("Dominated puzzles are only pruned with the default cost model")
+        if lower_bound is None:
+            lower_bound = Puzzle.lower_bound_nb_moves
+        self._start_time_limit()
+        self.nb_loops = 0
+        self.nb_dropped_puzzles = 0
+        self.nb_expanded_puzzles = 0
+        self.nb_dominated_puzzles = 0
+        self.solution_cost = None
+        self.puzzle_chains_done = collections.deque()
+        self.puzzle_keys_done = set()
+        self.dominance_table = DominanceTable() if prune_dominated else None
+        self.transposition_table = None
+
+        puzzle_chain = PuzzleChain(
+            previous_puzzle_chain=None, puzzle=self.puzzle, message="Puzzle:"
+        )
+        best_costs: dict[Hashable, float] = {}
+        search_progress = self.search_progress
+        assert search_progress is not None
+        # Heap of (cost + weight * remaining cost, remaining cost, order, cost, PuzzleChain)
+        heap: list[Tuple[float, float, int, float, PuzzleChain]] = []
+        nb_pushed = 0
+
+        def push(puzzle_chain: PuzzleChain, cost: float) -> bool:
+            """@return True if the puzzle is pushed in the heap"""
+            nonlocal nb_pushed
+            key = (puzzle_chain.state_key, cost_model.search_key(puzzle_chain))
+            if best_costs.get(key, math.inf) <= cost:
+                self.nb_dropped_puzzles += 1
+                return False
+            best_costs[key] = cost
+            remaining_cost = lower_bound(puzzle_chain.puzzle) * cost_model.min_move_cost
+            heapq.heappush(
+                heap,
+                (
+                    cost + weight * remaining_cost,
+                    remaining_cost,
+                    nb_pushed,
+                    cost,
+                    puzzle_chain,
+                ),
+            )
+            nb_pushed += 1
+            return True
+
+        push(puzzle_chain, 0.0)
+        while heap:
+            _, _, _, cost, puzzle_chain = heapq.heappop(heap)
+            search_progress.on_examined(puzzle_chain.depth)
+            key = (puzzle_chain.state_key, cost_model.search_key(puzzle_chain))
+            if best_costs[key] < cost:
+                continue  # A cheaper way to this puzzle was found after this one
+            self.nb_loops += 1
+            if time.perf_counter() > self._deadline:
+                self.status = SolveStatus.TIMEOUT
+                return None
+            if puzzle_chain.puzzle.is_done:
+                self.status = SolveStatus.SOLVED
+                self.solution_cost = cost
+                return puzzle_chain
+            if self._is_dominated(puzzle_chain.puzzle, cost):
+                continue
+            self.puzzle_chains_done.append(puzzle_chain)
+            self.nb_expanded_puzzles += 1
+            children_depths: list[int] = []
+            for new_puzzle_chain in self.iter_new_puzzle_chains(puzzle_chain):
+                if push(
+                    new_puzzle_chain,
+                    cost + cost_model.move_cost(puzzle_chain, new_puzzle_chain),
+                ):
+                    children_depths.append(new_puzzle_chain.depth)
+            search_progress.on_expanded(puzzle_chain.depth, children_depths)
+
+        self.status = SolveStatus.NO_SOLUTION
+        return None
+
+    @_release_search_memory_after
+    def solve_beam(
+        self,
+        width: int = 100,
+        max_width: int = 10000,
+        widening_factor: int = 4,
+        beam_score: Callable[[Puzzle], Any] = beam_score_default,
+    ) -> Optional[PuzzleChain]:
+        """
+        Solve the puzzle using a beam search.
+        At each depth, only the 'width' best puzzles (lowest beam_score) are kept for
+        the next depth. Puzzles already seen at a lower depth are ignored.
+        When no solution is found because puzzles were discarded, the search is restarted
+        with the width multiplied by widening_factor (up to max_width).
+        The status tells whether a failure comes from the width limit (SolveStatus.WIDTH_LIMITED)
+        or if the puzzle has no solution (SolveStatus.NO_SOLUTION).
+        width: initial number of puzzles kept at each depth.
+        max_width: maximum width for the automatic widening.
+        widening_factor: width multiplier between two beam searches (at least 2).
+        beam_score: score of a puzzle to select the puzzles to keep (lower is better).
+        """
+        if width < 1 or widening_factor < 2:
+            raise ValueError(f"Bad beam width {width} or widening factor {widening_factor}")
+        self._start_time_limit()
+        self.nb_loops = 0
+        self.nb_dropped_puzzles = 0
+        self.nb_expanded_puzzles = 0
+        self.nb_dominated_puzzles = 0
+        self.dominance_table = None
+        self.transposition_table = None
+        self.search_progress = None  # Not estimated for a beam search
+        while True:
+            try:
+                solution, is_width_limited = self._beam_search(width, beam_score)
+            except _TimeLimitReached:
+                self.status = SolveStatus.TIMEOUT
+                return None
+            if solution is not None:
+                self.status = SolveStatus.SOLVED
+                return solution
+            if not is_width_limited:
+                # Every reachable puzzle was explored
+                self.status = SolveStatus.NO_SOLUTION
+                return None
+            if width >= max_width:
+                self.status = SolveStatus.WIDTH_LIMITED
+                return None
+            width = min(max_width, width * widening_factor)
+
+    def _beam_search(
+        self, width: int, beam_score: Callable[[Puzzle], Any]
+    ) -> Tuple[Optional[PuzzleChain], bool]:
+        """
+        One beam search with a given width.
+        @return (solution, True if puzzles were discarded because of the width)
+        """
+        is_width_limited = False
+        beam: list[PuzzleChain] = [
+            PuzzleChain(previous_puzzle_chain=None, puzzle=self.puzzle, message="Puzzle:")
+        ]
+        if self.puzzle.is_done:
+            return beam[0], False
+        self.puzzle_chains_done = collections.deque()
+        self.puzzle_keys_done = {self.puzzle.state_key()}
+
+        while beam:
+            next_beam: list[PuzzleChain] = []
+            for puzzle_chain in beam:
+                self.nb_loops += 1
+                self._check_time_limit()
+                self.puzzle_chains_done.append(puzzle_chain)
+                self.nb_expanded_puzzles += 1
+                for new_puzzle_chain in self.iter_new_puzzle_chains(puzzle_chain):
+                    new_puzzle = new_puzzle_chain.puzzle
+                    puzzle_key = new_puzzle_chain.state_key
+                    if puzzle_key in self.puzzle_keys_done:
+                        continue
+                    self.puzzle_keys_done.add(puzzle_key)
+                    if new_puzzle.is_done:
+                        return new_puzzle_chain, is_width_limited
+                    next_beam.append(new_puzzle_chain)
+
+            # Keep the best puzzles for the next depth
+            if len(next_beam) > width:
+                next_beam.sort(
+                    key=lambda puzzle_chain: beam_score(puzzle_chain.puzzle)
+                )
+                self.nb_dropped_puzzles += len(next_beam) - width
+                del next_beam[width:]
+                is_width_limited = True
+            beam = next_beam
+
+        return None, is_width_limited
+
 
 def solve_generic(
-    puzzle: Puzzle, nb_chains_without_empty_bottle: int = 0, verbose_cycle: float = 0
+    puzzle: Puzzle,
+    nb_chains_without_empty_bottle: int = 0,
+    verbose_cycle: float = 0,
+    profile: bool = False,
 ) -> None:
-    """Generic function for a puzzle solving and result printing."""
+    """
+    Generic function for a puzzle solving and result printing.
+    profile: If True, the timings of the solver hot paths are also printed
+        (@see solver_profiling).
+    """
 
     solver: PuzzleSolver = PuzzleSolver(puzzle)
 
+    # Imported here as profiling is only needed on demand
+    from solver_profiling import SolverProfiler
+
+    profiler = SolverProfiler() if profile else None
     time_start = time.perf_counter()
-    solution: Optional[PuzzleChain] = solver.solve(
-        nb_chains_without_empty_bottle=nb_chains_without_empty_bottle,
-        verbose_cycle=verbose_cycle,
-    )
+    with profiler if profiler is not None else contextlib.nullcontext():
+        solution: Optional[PuzzleChain] = solver.solve(
+            nb_chains_without_empty_bottle=nb_chains_without_empty_bottle,
+            verbose_cycle=verbose_cycle,
+        )
     time_solving = time.perf_counter() - time_start
 
     if solution:
         print(f"Solution ({time_solving:.3f} secs):")
-        print(solution.show_puzzle_chains())
+        # Steps are streamed to the output
+        for str_step in solution.iter_str_steps():
+            sys.stdout.write(str_step)
+        print()
     else:
         print(f"No solution: {puzzle}\n")
+    if profiler is not None:
+        print(profiler.report())
+        print()
 
 
 def main():
     """Some puzzles solving for test/validation purpose."""
 
-    def solve_puzzle0() -> None:
-        """
-        Hereafter, bottles are defined using strings.
-        Every chars in the string is a color for one dose in a bottle (from bottom to top).
-
-        Example:
-            {"AABB", "BBAA", ""} is for a puzzle hodling 3 bottles:
-            The first bottle "AABB" contains 2 doses of color 'A' and 2 doses of color 'B' on top.
-            The next bottle "BBAA" contains the revert.
-            The last bottle of the puzzle is empty.
-        """
-
-        puzzles = [
-            ["AABB", "BBAA", ""],
-            ["AABC", "BCCA", "ABBC", ""],
-        ]
-
-        for str_puzzle in puzzles:
-            puzzle: Puzzle = Puzzle()
-            for str_bottle in str_puzzle:
-                bottle: Bottle = Bottle(str_bottle)
-                puzzle.add_bottle(bottle)
-            solve_generic(puzzle)
-
-    # Puzzle colors
-    LIGHT_GREEN = 0
-    GREEN = 1
-    DARK_GREEN = 2
-    PINK = 3
-    YELLOW = 4
-    LIGHT_BLUE = 5
-    BLUE = 6
-    DARK_BLUE = 7
-    GRAY = 8
-    LIGHT_BLUE = 9
-    RED = 10
-    ORANGE = 11
-    VIOLET = 12
-
-    def solve_puzzle29() -> None:
-        """
-        Puzzle #29 in 'Water Sort Puzzle' (Andoid OS)
-        """
-
-        solve_generic(
-            Puzzle(
-                [
-                    Bottle([GREEN, PINK, YELLOW, DARK_BLUE]),
-                    Bottle([GRAY, YELLOW, LIGHT_BLUE, LIGHT_BLUE]),
-                    Bottle([GRAY, RED, GRAY, RED]),
-                    Bottle([GREEN, DARK_BLUE, ORANGE, GREEN]),
-                    Bottle([ORANGE, PINK, PINK, ORANGE]),
-                    Bottle([YELLOW, VIOLET, GRAY, VIOLET]),
-                    Bottle([LIGHT_BLUE, PINK, VIOLET, YELLOW]),
-                    Bottle([LIGHT_BLUE, VIOLET, ORANGE, DARK_BLUE]),
-                    Bottle([DARK_BLUE, RED, GREEN, RED]),
-                    Bottle([]),
-                    Bottle([]),
-                ]
-            ),
-            nb_chains_without_empty_bottle=4,
-            verbose_cycle=10,
-        )
+    # Imported here as the samples are only needed for this validation
+    import puzzle_samples
 
-    def solve_puzzle37() -> None:
-        """
-        Puzzle #37 in 'Water Sort Puzzle' (Andoid OS)
-        """
+    for puzzle in puzzle_samples.puzzles0():
+        solve_generic(puzzle)
 
+    for puzzle_factory in puzzle_samples.SAMPLE_PUZZLES.values():
         solve_generic(
-            Puzzle(
-                [
-                    Bottle([PINK, LIGHT_BLUE, RED, ORANGE]),
-                    Bottle([VIOLET, GREEN, GRAY, DARK_BLUE]),
-                    Bottle([ORANGE, GRAY, RED, VIOLET]),
-                    Bottle([DARK_BLUE, LIGHT_BLUE, LIGHT_BLUE, RED]),
-                    Bottle([PINK, LIGHT_BLUE, GREEN, PINK]),
-                    Bottle([VIOLET, YELLOW, GREEN, GREEN]),
-                    Bottle([DARK_BLUE, ORANGE, YELLOW, GRAY]),
-                    Bottle([YELLOW, PINK, ORANGE, VIOLET]),
-                    Bottle([GRAY, YELLOW, DARK_BLUE, RED]),
-                    Bottle([]),
-                    Bottle([]),
-                ]
-            ),
+            puzzle_factory(),
             nb_chains_without_empty_bottle=4,
             verbose_cycle=10,
         )
 
-    def solve_puzzle112() -> None:
-        """
-        Puzzle #112 in 'Water Sort Puzzle' (Andoid OS)
-        """
-
-        solve_generic(
-            Puzzle(
-                [
-                    Bottle([LIGHT_GREEN, DARK_BLUE, BLUE, GRAY]),
-                    Bottle([DARK_GREEN, PINK, GRAY, DARK_BLUE]),
-                    Bottle([DARK_GREEN, GREEN, LIGHT_BLUE, VIOLET]),
-                    Bottle([GREEN, PINK, BLUE, ORANGE]),
-                    Bottle([GREEN, YELLOW, DARK_BLUE, PINK]),
-                    Bottle([ORANGE, GREEN, BLUE, RED]),
-                    Bottle([VIOLET, DARK_GREEN, VIOLET, LIGHT_GREEN]),
-                    Bottle([RED, DARK_GREEN, LIGHT_GREEN, VIOLET]),
-                    Bottle([DARK_BLUE, LIGHT_BLUE, LIGHT_BLUE, ORANGE]),
-                    Bottle([RED, BLUE, PINK, LIGHT_GREEN]),
-                    Bottle([GRAY, ORANGE, LIGHT_BLUE, YELLOW]),
-                    Bottle([YELLOW, GRAY, RED, YELLOW]),
-                    Bottle([]),
-                    Bottle([]),
-                ]
-            ),
-            nb_chains_without_empty_bottle=4,
-            verbose_cycle=10,
-        )
-
-    # Résolution des puzzles
-    solve_puzzle0()
-    solve_puzzle29()
-    solve_puzzle37()
-    solve_puzzle112()
-
 
 if __name__ == "__main__":
 
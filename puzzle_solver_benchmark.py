@@ -0,0 +1,74 @@
+#! coding:utf-8
+
+"""
+puzzle_solver_benchmark module compares the solver settings on the sample puzzles.
+
+Run it with: `python puzzle_solver_benchmark.py`
+"""
+
+import time
+from typing import Optional
+
+from puzzle_samples import SAMPLE_PUZZLES
+from puzzle_solver import MOVE_ORDERINGS, MoveOrdering, PuzzleChain, PuzzleSolver
+
+
+def benchmark_move_orderings(nb_chains_without_empty_bottle: int = 4) -> None:
+    """Print expansions and time to the first solution for every move ordering."""
+    print(
+        f"{'puzzle':<8}{'ordering':<12}{'expanded':>10}{'loops':>10}"
+        f"{'dropped':>10}{'length':>8}{'time':>10}"
+    )
+    for puzzle_name, puzzle_factory in SAMPLE_PUZZLES.items():
+        for ordering_name, ordering_class in MOVE_ORDERINGS.items():
+            move_ordering: MoveOrdering = ordering_class()
+            solver = PuzzleSolver(puzzle_factory())
+            time_start = time.perf_counter()
+            solution: Optional[PuzzleChain] = solver.solve(
+                nb_chains_without_empty_bottle=nb_chains_without_empty_bottle,
+                move_ordering=move_ordering,
+            )
+            time_solving = time.perf_counter() - time_start
+            length = "-" if solution is None else str(solution.depth)
+            print(
+                f"{puzzle_name:<8}{ordering_name:<12}{solver.nb_expanded_puzzles:>10}"
+                f"{solver.nb_loops:>10}{solver.nb_dropped_puzzles:>10}"
+                f"{length:>8}{time_solving:>9.3f}s"
+            )
+
+
+# Search options of PuzzleSolver.solve compared by benchmark_search_options
+SEARCH_OPTIONS: dict[str, dict[str, bool]] = {
+    "default": {},
+    "dominated": {"prune_dominated": True},
+    "macro": {"macro_moves": True},
+}
+
+
+def benchmark_search_options(nb_chains_without_empty_bottle: int = 4) -> None:
+    """Print expansions saved by the pruning of dominated puzzles and by macro moves."""
+    print(
+        f"{'puzzle':<8}{'options':<12}{'expanded':>10}{'loops':>10}"
+        f"{'dominated':>10}{'macro':>8}{'length':>8}{'time':>10}"
+    )
+    for puzzle_name, puzzle_factory in SAMPLE_PUZZLES.items():
+        for options_name, options in SEARCH_OPTIONS.items():
+            solver = PuzzleSolver(puzzle_factory())
+            time_start = time.perf_counter()
+            solution: Optional[PuzzleChain] = solver.solve(
+                nb_chains_without_empty_bottle=nb_chains_without_empty_bottle, **options
+            )
+            time_solving = time.perf_counter() - time_start
+            length = "-" if solution is None else str(solution.depth)
+            print(
+                f"{puzzle_name:<8}{options_name:<12}{solver.nb_expanded_puzzles:>10}"
+                f"{solver.nb_loops:>10}{solver.nb_dominated_puzzles:>10}"
+                f"{solver.nb_macro_moves:>8}{length:>8}{time_solving:>9.3f}s"
+            )
+
+
+if __name__ == "__main__":
+
+    benchmark_move_orderings()
+    print()
+    benchmark_search_options()
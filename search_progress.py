@@ -0,0 +1,346 @@
+#! coding:utf-8
+
+"""
+The search_progress module estimates the progress of a search from its live statistics.
+
+The search tree is described by statistics of each depth (number of moves):
+- the survival ratio: part of the puzzles taken from the todo list that are expanded
+  (the others are already explored, dropped, dominated, ...),
+- the branching: number of new puzzles (at each next depth) given by an expanded puzzle,
+- for a depth first search, the sizes of the subtrees already explored.
+
+The size of the subtree of a puzzle of a depth is the mean size of the explored subtrees of this
+depth (when there are enough of them) or else it is computed from the survival ratio and the
+branching of the depth with the subtree sizes of the next depths (as the tree size estimation
+of Knuth, with the average branching of each depth instead of random probes).
+The remaining puzzles of a depth first search are the subtrees of the puzzles in its todo list.
+The confidence range uses the lower and upper bounds of these statistics at each depth.
+
+The estimates are the ones of the whole search: a search stopping at its first solution ends
+sooner (the remaining time is an upper estimate of the time to the first solution).
+"""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+import math
+import time
+from typing import Any, Optional, Sequence, Tuple
+
+# Normal quantile of the confidence range (95%)
+CONFIDENCE_Z: float = 1.96
+
+# Minimum number of explored subtrees of a depth to estimate the subtree size of this depth
+# with their mean size
+MIN_NB_SUBTREES: int = 3
+
+
+@dataclass
+class ProgressEstimate:
+    """Estimate of the progress of a search."""
+
+    elapsed: float  # Duration of the search (seconds)
+    nb_expanded: int  # Puzzles expanded up to now
+    nb_puzzles: float  # Estimated number of puzzles expanded by the whole search
+    nb_puzzles_low: float  # Lower bound of the confidence range of nb_puzzles
+    nb_puzzles_high: float  # Upper bound of the confidence range of nb_puzzles
+    is_running: bool  # False once the search has ended
+
+    @property
+    def time_per_puzzle(self) -> float:
+        """Average duration (seconds) of a puzzle expansion."""
+        return self.elapsed / max(1, self.nb_expanded)
+
+    @property
+    def fraction_done(self) -> float:
+        """Part of the search done (1.0 when the search has ended)."""
+        if not self.is_running:
+            return 1.0
+        return self.nb_expanded / max(1.0, self.nb_puzzles)
+
+    def _time_remaining(self, nb_puzzles: float) -> float:
+        """@return the time to expand the remaining puzzles of a number of puzzles."""
+        if not self.is_running:
+            return 0.0
+        return max(0.0, nb_puzzles - self.nb_expanded) * self.time_per_puzzle
+
+    @property
+    def time_remaining(self) -> float:
+        """Estimated duration (seconds) to the end of the search."""
+        return self._time_remaining(self.nb_puzzles)
+
+    @property
+    def time_remaining_range(self) -> Tuple[float, float]:
+        """Confidence range of time_remaining."""
+        return (
+            self._time_remaining(self.nb_puzzles_low),
+            self._time_remaining(self.nb_puzzles_high),
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        """@return the estimate as a JSON compatible dict (with the computed values)."""
+        estimate = asdict(self)
+        estimate.update(
+            fraction_done=self.fraction_done,
+            time_remaining=self.time_remaining,
+            time_remaining_range=list(self.time_remaining_range),
+        )
+        return estimate
+
+    def __str__(self) -> str:
+        if not self.is_running:
+            return f"search ended after {self.elapsed:.1f}s"
+        time_low, time_high = self.time_remaining_range
+        return (
+            f"{100.0 * self.fraction_done:.1f}% done, "
+            f"end in ~{self.time_remaining:.1f}s ({time_low:.1f}s to {time_high:.1f}s)"
+        )
+
+
+def _grow(values: list, depth: int, value: Any) -> None:
+    """Extend the list of values by depth up to the depth."""
+    while len(values) <= depth:
+        values.append(value() if callable(value) else value)
+
+
+def _wilson_range(nb_successes: int, nb_trials: int, z: float) -> Tuple[float, float]:
+    """@return the (Wilson score) confidence range of a ratio."""
+    ratio = nb_successes / nb_trials
+    z2_n = z * z / nb_trials
+    center = (ratio + z2_n / 2) / (1 + z2_n)
+    half_width = (
+        z * math.sqrt(ratio * (1 - ratio) / nb_trials + z2_n / (4 * nb_trials)) / (1 + z2_n)
+    )
+    return max(0.0, center - half_width), min(1.0, center + half_width)
+
+
+class _SiblingGroup:
+    """New puzzles of one expanded puzzle in the todo list of a depth first search."""
+
+    __slots__ = ("pending_depths", "current_depth", "current_start", "nb_done", "size_done")
+
+    def __init__(self, pending_depths: list[int]) -> None:
+        # Depths of the puzzles still in the todo list (the last one is examined first)
+        self.pending_depths = pending_depths
+        # Depth of the puzzle examined (its subtree is in the groups above this one) and
+        # number of expanded puzzles when it was examined
+        self.current_depth: Optional[int] = None
+        self.current_start = 0
+        # Number of explored subtrees of the group and their total size
+        self.nb_done = 0
+        self.size_done = 0
+
+
+class SearchProgress:
+    """
+    Live statistics of a search by depth and progress estimates.
+    The search calls on_examined for every puzzle taken from its todo list and on_expanded
+    for every expanded puzzle. The estimates can be computed from another thread.
+
+    is_depth_first: True for a depth first search (the last new puzzle of the todo list is the
+        next examined one): the puzzles of the todo list and the sizes of the subtrees already
+        explored are then also used by the estimates.
+    z: normal quantile of the confidence range.
+    """
+
+    def __init__(self, is_depth_first: bool = True, z: float = CONFIDENCE_Z) -> None:
+        self.is_depth_first = is_depth_first
+        self.z = z
+        self.time_start = time.perf_counter()
+        self.time_end: float = math.nan
+        # Statistics by depth (lists are appended only: they can be read from another thread)
+        self.nb_examined: list[int] = []
+        self.nb_expanded: list[int] = []
+        self.nb_children: list[int] = []
+        self.nb_children_squares: list[int] = []
+        # Number of children by depth and by depth offset (child depth - depth - 1)
+        self.nb_children_by_offset: list[list[int]] = []
+        # Number of expanded puzzles of the explored subtrees of the examined puzzles by depth:
+        # number of subtrees, sum and sum of squares of their sizes
+        self.nb_subtrees: list[int] = []
+        self.subtree_sizes: list[int] = []
+        self.subtree_sizes_squares: list[int] = []
+        self.nb_expanded_total: int = 0
+        # Todo list of a depth first search by groups of new puzzles (the initial puzzle first)
+        self._groups: list[_SiblingGroup] = [_SiblingGroup([0])]
+
+    @property
+    def is_running(self) -> bool:
+        """True until the end of the search (@see stop)."""
+        return math.isnan(self.time_end)
+
+    def stop(self) -> None:
+        """End of the search."""
+        self.time_end = time.perf_counter()
+
+    def on_examined(self, depth: int) -> None:
+        """A puzzle at this depth is taken from the todo list."""
+        if depth >= len(self.nb_examined):
+            _grow(self.nb_examined, depth, 0)
+        self.nb_examined[depth] += 1
+        if not self.is_depth_first:
+            return
+        groups = self._groups
+        # The groups without puzzles in the todo list have their subtrees explored
+        while len(groups) > 1 and not groups[-1].pending_depths:
+            self._end_subtree(groups.pop())
+        group = groups[-1]
+        self._end_subtree(group)
+        if group.pending_depths:
+            group.pending_depths.pop()
+        group.current_depth = depth
+        group.current_start = self.nb_expanded_total
+
+    def _end_subtree(self, group: _SiblingGroup) -> None:
+        """The subtree of the examined puzzle of the group is explored."""
+        depth = group.current_depth
+        if depth is None:
+            return
+        group.current_depth = None
+        size = self.nb_expanded_total - group.current_start
+        group.nb_done += 1
+        group.size_done += size
+        if depth >= len(self.nb_subtrees):
+            _grow(self.subtree_sizes, depth, 0)
+            _grow(self.subtree_sizes_squares, depth, 0)
+            _grow(self.nb_subtrees, depth, 0)
+        self.subtree_sizes[depth] += size
+        self.subtree_sizes_squares[depth] += size * size
+        self.nb_subtrees[depth] += 1
+
+    def on_expanded(self, depth: int, children_depths: Sequence[int]) -> None:
+        """
+        A puzzle at this depth is expanded into new puzzles at these depths
+        (in the order they are added in the todo list).
+        """
+        if depth >= len(self.nb_expanded):
+            _grow(self.nb_children, depth, 0)
+            _grow(self.nb_children_squares, depth, 0)
+            _grow(self.nb_children_by_offset, depth, list)
+            _grow(self.nb_expanded, depth, 0)
+        nb_children = len(children_depths)
+        self.nb_expanded[depth] += 1
+        self.nb_children[depth] += nb_children
+        self.nb_children_squares[depth] += nb_children * nb_children
+        nb_children_by_offset = self.nb_children_by_offset[depth]
+        for child_depth in children_depths:
+            offset = child_depth - depth - 1
+            if offset >= len(nb_children_by_offset):
+                _grow(nb_children_by_offset, offset, 0)
+            nb_children_by_offset[offset] += 1
+        self.nb_expanded_total += 1
+        if self.is_depth_first and nb_children:
+            self._groups.append(_SiblingGroup(list(children_depths)))
+
+    def _subtree_sizes(self, bound: int) -> list[float]:
+        """
+        @return the estimated number of expanded puzzles of the subtree of a puzzle taken from
+        the todo list, by depth.
+        The mean size of the explored subtrees is used when there are enough of them, else the
+        size is computed from the survival ratio and the branching of the depth.
+        bound: -1 for the lower bound, 0 for the estimate and 1 for the upper bound.
+        """
+        # Snapshot of the statistics (the search may go on in another thread: the lists
+        # are grown before the list giving the number of values)
+        nb_examined = list(self.nb_examined)
+        nb_children = list(self.nb_children)
+        nb_children_squares = list(self.nb_children_squares)
+        nb_children_by_offset = [list(nbs) for nbs in list(self.nb_children_by_offset)]
+        nb_expanded = list(self.nb_expanded)[
+            : min(len(nb_children), len(nb_children_squares), len(nb_children_by_offset))
+        ]
+        subtree_sizes = list(self.subtree_sizes)
+        subtree_sizes_squares = list(self.subtree_sizes_squares)
+        nb_subtrees = list(self.nb_subtrees)[
+            : min(len(subtree_sizes), len(subtree_sizes_squares))
+        ]
+        max_depth = max(
+            [len(nb_examined)]
+            + [depth + 1 + len(nbs) for depth, nbs in enumerate(nb_children_by_offset)]
+        )
+
+        # Survival ratio by depth (the one of the previous depth when no puzzle examined)
+        survivals: list[float] = []
+        survival = 1.0
+        for depth in range(max_depth):
+            nb_examined_depth = nb_examined[depth] if depth < len(nb_examined) else 0
+            if nb_examined_depth:
+                nb_expanded_depth = nb_expanded[depth] if depth < len(nb_expanded) else 0
+                survival = nb_expanded_depth / nb_examined_depth
+                if bound:
+                    survival_range = _wilson_range(nb_expanded_depth, nb_examined_depth, self.z)
+                    survival = survival_range[0] if bound < 0 else survival_range[1]
+            survivals.append(survival)
+
+        sizes = [0.0] * (max_depth + 1)
+        for depth in reversed(range(max_depth)):
+            nb = nb_subtrees[depth] if depth < len(nb_subtrees) else 0
+            if nb >= MIN_NB_SUBTREES:
+                mean = subtree_sizes[depth] / nb
+                variance = max(0.0, (subtree_sizes_squares[depth] - nb * mean * mean) / (nb - 1))
+                sizes[depth] = max(0.0, mean + bound * self.z * math.sqrt(variance / nb))
+                continue
+            nb_expanded_depth = nb_expanded[depth] if depth < len(nb_expanded) else 0
+            nb_children_size = 0.0
+            if nb_expanded_depth:
+                branching_factor = 1.0
+                mean = nb_children[depth] / nb_expanded_depth
+                if bound and mean:
+                    if nb_expanded_depth > 1:
+                        variance = max(
+                            0.0,
+                            (nb_children_squares[depth] - nb_expanded_depth * mean * mean)
+                            / (nb_expanded_depth - 1),
+                        )
+                    else:
+                        variance = mean  # Unknown variance (Poisson)
+                    error = self.z * math.sqrt(variance / nb_expanded_depth)
+                    branching_factor = max(0.0, mean + bound * error) / mean
+                for offset, nb_children_offset in enumerate(nb_children_by_offset[depth]):
+                    nb_children_size += (
+                        nb_children_offset
+                        / nb_expanded_depth
+                        * branching_factor
+                        * sizes[depth + 1 + offset]
+                    )
+            sizes[depth] = survivals[depth] * (1.0 + nb_children_size)
+        return sizes
+
+    def _nb_remaining(self, bound: int) -> float:
+        """
+        @return the estimated number of puzzles still to be expanded by the search
+        bound: -1 for the lower bound, 0 for the estimate and 1 for the upper bound.
+        """
+        sizes = self._subtree_sizes(bound)
+        if not self.is_depth_first:
+            return max(0.0, sizes[0] - self.nb_expanded_total)
+        nb_remaining = 0.0
+        for group in list(self._groups):
+            nb_done, size_done = group.nb_done, group.size_done
+            for depth in list(group.pending_depths):
+                size = sizes[depth] if depth < len(sizes) else 1.0
+                if nb_done:
+                    # The next puzzles of a group have more already explored puzzles than
+                    # the previous ones: their subtrees are not greater
+                    size = min(size, size_done / nb_done)
+                nb_remaining += size
+        return nb_remaining
+
+    def estimate(self) -> ProgressEstimate:
+        """@return the estimate of the progress of the search."""
+        time_end = time.perf_counter() if self.is_running else self.time_end
+        nb_expanded = self.nb_expanded_total
+        if self.nb_examined and self.is_running:
+            nb_remaining = self._nb_remaining(0)
+            nb_remaining_low = min(nb_remaining, self._nb_remaining(-1))
+            nb_remaining_high = max(nb_remaining, self._nb_remaining(1))
+        else:
+            nb_remaining = nb_remaining_low = nb_remaining_high = 0.0
+        return ProgressEstimate(
+            elapsed=time_end - self.time_start,
+            nb_expanded=nb_expanded,
+            nb_puzzles=nb_expanded + nb_remaining,
+            nb_puzzles_low=nb_expanded + nb_remaining_low,
+            nb_puzzles_high=nb_expanded + nb_remaining_high,
+            is_running=self.is_running,
+        )
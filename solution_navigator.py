@@ -0,0 +1,126 @@
+#! coding:utf-8
+
+"""
+The solution_navigator module steps through the solution of a puzzle by dose changes.
+
+A move only changes the source and destination bottles of the puzzle: stepping from a solution
+step to the next (or previous) one changes a few doses only.
+SolutionNavigator gives these dose changes so that a user interface updates only the changed
+doses instead of showing the whole puzzle again at each step.
+
+The dose changes of the steps are computed by batches ahead of the current step (and kept):
+stepping through the solution costs the same whatever the size of the puzzle.
+"""
+
+from __future__ import annotations
+
+import sys
+from typing import Any, NamedTuple, Optional, Sequence, Tuple
+
+from puzzle import Puzzle
+
+
+class DoseChange(NamedTuple):
+    """Change of one dose of the puzzle."""
+
+    i_bottle: int
+    i_dose: int
+    color: Optional[Any]  # New color of the dose (None for an empty dose)
+
+
+def move_dose_changes(
+    puzzle: Puzzle, move: Tuple[int, int]
+) -> Tuple[list[DoseChange], list[DoseChange]]:
+    """
+    Do the move in the puzzle.
+    @return (forward changes of the move, backward changes to undo it)
+    """
+    before = {i_bottle: list(puzzle[i_bottle].doses) for i_bottle in move}
+    puzzle.pour(*move)
+    forward: list[DoseChange] = []
+    backward: list[DoseChange] = []
+    for i_bottle, doses in before.items():
+        for i_dose, (old_color, new_color) in enumerate(zip(doses, puzzle[i_bottle].doses)):
+            if old_color != new_color:
+                forward.append(DoseChange(i_bottle, i_dose, new_color))
+                backward.append(DoseChange(i_bottle, i_dose, old_color))
+    return forward, backward
+
+
+class SolutionNavigator:
+    """
+    Navigation through the steps of a solution (step 0 is the initial puzzle and step i is the
+    puzzle after the i first moves).
+
+    puzzle: initial puzzle.
+    moves: (i_source, i_destination) moves of the solution.
+    batch_size: number of steps whose dose changes are computed at once.
+    """
+
+    def __init__(
+        self, puzzle: Puzzle, moves: Sequence[Tuple[int, int]], batch_size: int = 16
+    ) -> None:
+        self.moves = moves
+        self.batch_size = max(1, batch_size)
+        self.i_step = 0
+        # Forward and backward dose changes of the moves already computed
+        self._forward_changes: list[list[DoseChange]] = []
+        self._backward_changes: list[list[DoseChange]] = []
+        # Puzzle of the last computed step
+        self._last_puzzle = puzzle.clone()  # Its bottles keep the capacity of the puzzle
+
+    @property
+    def nb_steps(self) -> int:
+        """Number of steps (including the initial puzzle)."""
+        return len(self.moves) + 1
+
+    def _prefetch(self, i_step: int) -> None:
+        """Compute the dose changes of the moves up to the i_step step (by batches)."""
+        if i_step <= len(self._forward_changes):
+            return
+        i_last = min(len(self.moves), i_step + self.batch_size - 1)
+        while len(self._forward_changes) < i_last:
+            move = self.moves[len(self._forward_changes)]
+            forward, backward = move_dose_changes(self._last_puzzle, move)
+            self._forward_changes.append(forward)
+            self._backward_changes.append(backward)
+
+    def go_to(self, i_step: int) -> list[DoseChange]:
+        """
+        Go to a step (bounded to the existing steps).
+        @return the dose changes from the current step to this step.
+        """
+        i_step = max(0, min(i_step, self.nb_steps - 1))
+        self._prefetch(i_step)
+        changes: dict[Tuple[int, int], Optional[Any]] = {}
+        while self.i_step < i_step:
+            for change in self._forward_changes[self.i_step]:
+                changes[change.i_bottle, change.i_dose] = change.color
+            self.i_step += 1
+        while self.i_step > i_step:
+            self.i_step -= 1
+            for change in self._backward_changes[self.i_step]:
+                changes[change.i_bottle, change.i_dose] = change.color
+        return [
+            DoseChange(i_bottle, i_dose, color)
+            for (i_bottle, i_dose), color in changes.items()
+        ]
+
+    def message(self, i_step: Optional[int] = None) -> str:
+        """@return the message of a step (default is the current step)."""
+        if i_step is None:
+            i_step = self.i_step
+        if i_step == 0:
+            return "Puzzle:"
+        i_source, i_destination = self.moves[i_step - 1]
+        return f"Pour #{i_source + 1} into #{i_destination + 1}"
+
+    def retained_size(self) -> int:
+        """@return approximate size (in bytes) of the data of the navigator."""
+        size = sys.getsizeof(self._forward_changes) + sys.getsizeof(self._backward_changes)
+        for changes in self._forward_changes + self._backward_changes:
+            size += sys.getsizeof(changes) + sum(sys.getsizeof(change) for change in changes)
+        size += sys.getsizeof(self._last_puzzle)
+        for bottle in self._last_puzzle.iter_bottles():
+            size += sys.getsizeof(bottle) + sys.getsizeof(bottle.doses)
+        return size
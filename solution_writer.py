@@ -0,0 +1,131 @@
+#! coding:utf-8
+
+"""
+The solution_writer module streams the steps of a solution (@see PuzzleChain) to a file.
+
+The steps are written one by one as they are iterated so that the whole solution is never
+held as one string in memory.
+Any object with a 'write' method can be used as output (opened file, sys.stdout,
+socket.makefile(), io.StringIO, ...).
+
+Supported formats:
+- text: Same output as PuzzleChain.show_puzzle_chains (text stream),
+- jsonl: One JSON object per line for every step (text stream),
+- binary: Compact list of moves (binary stream):
+    4 bytes: BINARY_MAGIC,
+    1 byte: BINARY_VERSION,
+    4 bytes: number of moves (unsigned, little endian),
+    2 bytes for each move: source and destination bottle indexes.
+"""
+
+from abc import ABC, abstractmethod
+import json
+import struct
+from typing import Any, BinaryIO, Iterator, TextIO, Tuple
+
+from puzzle_solver import PuzzleChain
+
+BINARY_MAGIC = b"WSPS"
+BINARY_VERSION = 1
+_BINARY_HEADER = struct.Struct("<4sBI")
+_BINARY_MOVE = struct.Struct("<BB")
+
+
+class SolutionWriter(ABC):
+    """Base class to write the steps of a solution to a stream."""
+
+    def __init__(self, stream: Any) -> None:
+        self.stream = stream
+
+    def write(self, solution: PuzzleChain) -> int:
+        """Write every step of the solution. @return number of written steps."""
+        nb_steps = 0
+        for step, puzzle_chain in enumerate(solution.iter_puzzle_chains(), 1):
+            self.write_step(step, puzzle_chain)
+            nb_steps += 1
+        return nb_steps
+
+    @abstractmethod
+    def write_step(self, step: int, puzzle_chain: PuzzleChain) -> None:
+        """Write one step of the solution."""
+
+
+class TextSolutionWriter(SolutionWriter):
+    """Write the steps as shown by PuzzleChain.show_puzzle_chains."""
+
+    stream: TextIO
+
+    def write_step(self, step: int, puzzle_chain: PuzzleChain) -> None:
+        self.stream.write(puzzle_chain.str_step(step))
+
+
+class JsonLinesSolutionWriter(SolutionWriter):
+    """
+    Write one JSON object per line for every step:
+    {"step": 1, "move": null, "message": "Puzzle:", "bottles": [["A", "B"], []]}
+    "move" is [source, destination] (0 based bottle indexes) or null for the initial puzzle.
+    "bottles" (content of the bottles from bottom to top) is only written when include_puzzle.
+    Colors that are not JSON serializable are written as strings.
+    """
+
+    stream: TextIO
+
+    def __init__(self, stream: TextIO, include_puzzle: bool = True) -> None:
+        super().__init__(stream)
+        self.include_puzzle = include_puzzle
+
+    def write_step(self, step: int, puzzle_chain: PuzzleChain) -> None:
+        json_step: dict[str, Any] = {
+            "step": step,
+            "move": None if puzzle_chain.move is None else list(puzzle_chain.move),
+            "message": puzzle_chain.message,
+        }
+        if self.include_puzzle:
+            json_step["bottles"] = [
+                list(bottle.iter_doses()) for bottle in puzzle_chain.puzzle.iter_bottles()
+            ]
+        self.stream.write(json.dumps(json_step, default=str))
+        self.stream.write("\n")
+
+
+class BinarySolutionWriter(SolutionWriter):
+    """Write the moves of the solution in the compact binary format."""
+
+    stream: BinaryIO
+
+    def write(self, solution: PuzzleChain) -> int:
+        self.stream.write(
+            _BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, solution.depth)
+        )
+        return super().write(solution)
+
+    def write_step(self, step: int, puzzle_chain: PuzzleChain) -> None:
+        if puzzle_chain.move is None:
+            return  # Initial puzzle
+        i_source, i_destination = puzzle_chain.move
+        if i_source > 255 or i_destination > 255:
+            raise ValueError(f"Too many bottles for the binary format: {puzzle_chain.move}")
+        self.stream.write(_BINARY_MOVE.pack(i_source, i_destination))
+
+
+def iter_binary_moves(stream: BinaryIO) -> Iterator[Tuple[int, int]]:
+    """Iterator on the (source, destination) moves of a solution in the binary format."""
+    header = stream.read(_BINARY_HEADER.size)
+    if len(header) != _BINARY_HEADER.size:
+        raise ValueError("Truncated binary solution header")
+    magic, version, nb_moves = _BINARY_HEADER.unpack(header)
+    if magic != BINARY_MAGIC or version != BINARY_VERSION:
+        raise ValueError(f"Not a binary solution (version {BINARY_VERSION})")
+    for _ in range(nb_moves):
+        move = stream.read(_BINARY_MOVE.size)
+        if len(move) != _BINARY_MOVE.size:
+            raise ValueError("Truncated binary solution moves")
+        yield _BINARY_MOVE.unpack(move)
+
+
+# Solution writers that can be selected by name
+SOLUTION_WRITERS: dict[str, type[SolutionWriter]] = {
+    "text": TextSolutionWriter,
+    "jsonl": JsonLinesSolutionWriter,
+    "binary": BinarySolutionWriter,
+}
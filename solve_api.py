@@ -0,0 +1,651 @@
+#! coding:utf-8
+
+"""
+solve_api module is a headless JSON/HTTP API to solve puzzles (without the JustPy web pages).
+
+Example:
+    python solve_api.py --port 8080 --workers 4 --max-queue 64 --max-jobs-per-client 4 \\
+        --time-limit 10
+
+Endpoints:
+- POST /jobs: submit a puzzle to solve. The body is a JSON level (@see puzzle_io.LEVEL_JSON_SCHEMA)
+  (at most MAX_NB_BOTTLES bottles of MAX_CAPACITY doses) with optional solving "options"
+  (@see API_OPTIONS), for example:
+    {"capacity": 4, "bottles": [["A", "B", "A", "B"], ["B", "A", "B", "A"], []],
+     "options": {"strategy": "weighted", "time_limit": 5}}
+  Responses:
+    202 {"job_id": "...", "status": "queued"}: the job is queued,
+    200 {"job_id": "...", "status": "done", "result": {...}}: the result was in the cache,
+    400 {"error": "..."}: bad puzzle or options,
+    429 {"error": "..."}: the queue is full or the client has too many jobs (Retry-After header),
+    503 {"error": "..."}: the workers are restarted after the death of one of them (Retry-After
+        header).
+- GET /jobs/<job_id>?wait=<seconds>: status of a job ("queued", "running" or "done") with its
+  result when done (@see level_solver.solve_level for the result). A running job has the last
+  "progress" estimate of its search when the solver gives one (@see
+  search_progress.ProgressEstimate.to_dict) so that a scheduler can prioritize or give up jobs.
+  With 'wait', the answer is delayed until the job is done or the wait is over (long polling).
+- GET /stats: queue depth, running jobs, cache hits, ...
+
+Clients are identified by their 'X-Client-Id' header (default is their IP address).
+Every job is solved in a worker process with a time limit (capped by the server) so that a hard
+puzzle never blocks the server. With the "auto" strategy, the engine of a job is chosen by its
+predicted difficulty (@see difficulty_predictor): trivial puzzles are solved at once in the
+request thread without the worker round trip (one at a time and within INLINE_TIME_LIMIT, else
+the job goes to a worker), huge puzzles are solved by the portfolio strategy whose processes are
+bounded by a budget shared by the workers (@see level_solver.create_portfolio_slots), and the
+accuracy of the predictions is in the statistics. Solved puzzles are cached: the same puzzle
+with the same options is answered without solving it again.
+"""
+
+from __future__ import annotations
+
+import argparse
+from collections import OrderedDict
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass, field, replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import multiprocessing
+import sys
+import threading
+import time
+from typing import Any, Callable, Optional, Sequence
+from urllib.parse import parse_qs, urlparse
+import uuid
+
+from difficulty_predictor import DIFFICULTY_PREDICTOR, ENGINE_INLINE, DispatchLog
+from level_solver import (
+    STATUS_MEMORY_LIMIT,
+    STRATEGIES,
+    STRATEGY_AUTO,
+    MOVE_ORDERING_NAMES,
+    BatchOptions,
+    create_portfolio_slots,
+    init_worker,
+    solve_level,
+)
+from puzzle_io import Level
+from puzzle_solver import SolveStatus
+
+# Solving options a client can set (@see level_solver.BatchOptions)
+API_OPTIONS = (
+    "strategy",
+    "time_limit",
+    "nb_chains_without_empty_bottle",
+    "move_ordering",
+    "beam_width",
+    "weight",
+    "decompose",
+    "wait_best",
+)
+
+# Job status
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+
+# Result status that are cached (a timeout may succeed with another time limit)
+CACHED_STATUS = ("solved", "no solution", "bad puzzle")
+
+# Maximum size of a request body (bytes)
+MAX_BODY_SIZE = 1 << 20
+
+# Maximum capacity and number of bottles of a puzzle (as in the binary packs of puzzle_io):
+# the bottles are allocated for their whole capacity
+MAX_CAPACITY = 255
+MAX_NB_BOTTLES = 255
+
+# Maximum wait of a long polling request (seconds)
+MAX_WAIT = 60.0
+
+# Period (seconds) of the progress reports of a running job
+PROGRESS_PERIOD = 0.5
+
+# Maximum duration (seconds) of the solving of a trivial puzzle in the request thread
+INLINE_TIME_LIMIT = 0.1
+
+
+class AdmissionError(Exception):
+    """Exception when a job is not admitted (the HTTP status is 429)."""
+
+
+class ServiceUnavailableError(Exception):
+    """Exception when a job cannot be given to the workers (the HTTP status is 503)."""
+
+
+@dataclass
+class SolveJob:
+    """One puzzle solving job."""
+
+    job_id: str
+    client_id: str
+    cache_key: str
+    future: Optional[Future] = None
+    result: Optional[dict[str, Any]] = None
+    progress: Optional[dict[str, Any]] = None  # Last progress estimate of a running job
+    time_submit: float = field(default_factory=time.perf_counter)
+
+    @property
+    def status(self) -> str:
+        """@return the status of the job."""
+        if self.result is not None:
+            return JOB_DONE
+        if self.future is not None and self.future.running():
+            return JOB_RUNNING
+        return JOB_QUEUED
+
+    def to_json(self) -> dict[str, Any]:
+        """@return the job as a JSON object."""
+        json_job: dict[str, Any] = {"job_id": self.job_id, "status": self.status}
+        if self.result is not None:
+            json_job["result"] = self.result
+        elif self.progress is not None:
+            json_job["progress"] = self.progress
+        return json_job
+
+
+def solve_job(
+    job_id: str, job: tuple[str, int, Level, BatchOptions], progress_queue: Any
+) -> dict[str, Any]:
+    """
+    Solving of a job in a worker (@see level_solver.solve_level): the progress estimates of the
+    solver are put in progress_queue as (job_id, estimate) every PROGRESS_PERIOD seconds.
+    """
+    solvers: list[Any] = []
+    is_done = threading.Event()
+
+    def report_progress() -> None:
+        while not is_done.wait(PROGRESS_PERIOD):
+            progress_estimate = getattr(solvers[0], "progress_estimate", None) if solvers else None
+            estimate = None if progress_estimate is None else progress_estimate()
+            if estimate is not None and estimate.is_running:
+                try:
+                    progress_queue.put((job_id, estimate.to_dict()))
+                except (EOFError, OSError):
+                    return  # Service stopped
+
+    thread = threading.Thread(target=report_progress, name=f"progress_{job_id}", daemon=True)
+    thread.start()
+    try:
+        return solve_level(job, on_solver=solvers.append)
+    finally:
+        is_done.set()
+        thread.join()
+
+
+def _is_option_value(value: Any, default_value: Any) -> bool:
+    """
+    @return True if the value of a request option has the type of its default value
+    (an integer is also a float) and is not a negative number.
+    """
+    if isinstance(default_value, bool) or isinstance(value, bool):
+        return isinstance(value, bool) and isinstance(default_value, bool)
+    if isinstance(default_value, int):
+        return isinstance(value, int) and value >= 0
+    if isinstance(default_value, float):
+        return isinstance(value, (int, float)) and value >= 0
+    return isinstance(value, type(default_value))
+
+
+class SolveService:
+    """
+    Bounded queue of solving jobs dispatched to a pool of workers.
+
+    nb_workers: number of worker processes (when executor is None).
+    max_queue: maximum number of jobs queued or running.
+    max_jobs_per_client: maximum number of jobs queued or running for one client.
+    time_limit: default time limit (in seconds) of a job.
+    max_time_limit: maximum time limit a client can ask for.
+    memory_limit: megabytes per worker process (0 for no limit).
+    cache_size: number of results kept in the cache.
+    max_done_jobs: number of done jobs kept to be polled.
+    executor: pool of workers (default is a ProcessPoolExecutor of nb_workers processes).
+    max_portfolio_processes: processes of the portfolio strategy shared by the workers of the
+        default executor (@see level_solver.create_portfolio_slots).
+    dispatch_log: log of the jobs of the "auto" strategy (default logs statistics only).
+    """
+
+    def __init__(
+        self,
+        nb_workers: int = 1,
+        max_queue: int = 64,
+        max_jobs_per_client: int = 4,
+        time_limit: float = 10.0,
+        max_time_limit: float = 60.0,
+        memory_limit: int = 0,
+        cache_size: int = 1024,
+        max_done_jobs: int = 1024,
+        executor: Optional[Executor] = None,
+        dispatch_log: Optional[DispatchLog] = None,
+        max_portfolio_processes: int = 0,
+    ) -> None:
+        self.max_queue = max_queue
+        self.max_jobs_per_client = max_jobs_per_client
+        self.time_limit = time_limit
+        self.max_time_limit = max_time_limit
+        self.cache_size = cache_size
+        self.max_done_jobs = max_done_jobs
+        # Default pool of workers, created again when a worker process dies
+        self._create_executor: Optional[Callable[[], Executor]] = None
+        if executor is None:
+            portfolio_slots = create_portfolio_slots(nb_workers, max_portfolio_processes)
+
+            def create_executor() -> Executor:
+                return ProcessPoolExecutor(
+                    max_workers=max(1, nb_workers),
+                    initializer=init_worker,
+                    initargs=(memory_limit, portfolio_slots),
+                )
+
+            self._create_executor = create_executor
+            executor = create_executor()
+        self.executor: Executor = executor
+        self.dispatch_log = DispatchLog() if dispatch_log is None else dispatch_log
+        self._lock = threading.Lock()
+        # Held by the solving in a request thread (only one at a time, @see _solve_inline)
+        self._inline_lock = threading.Lock()
+        # Progress estimates of the running jobs, from the workers (@see solve_job)
+        self._manager = multiprocessing.Manager()
+        self.progress_queue: Any = self._manager.Queue()
+        self._progress_thread = threading.Thread(
+            target=self._receive_progress, name="progress", daemon=True
+        )
+        self._progress_thread.start()
+        self.jobs: dict[str, SolveJob] = {}
+        # Done jobs (oldest first) to forget the oldest ones
+        self._done_job_ids: OrderedDict[str, None] = OrderedDict()
+        self.nb_client_jobs: dict[str, int] = {}  # Jobs queued or running per client
+        self.nb_active_jobs = 0  # Jobs queued or running
+        # Results per cache key (least recently used first)
+        self.cache: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        # Statistics
+        self.nb_submitted = 0
+        self.nb_rejected = 0
+        self.nb_cache_hits = 0
+        self.nb_inline_jobs = 0
+        self.nb_inline_fallbacks = 0  # Predicted trivial but solved by a worker
+
+    def parse_options(self, json_options: Any) -> BatchOptions:
+        """@return the BatchOptions of the options of a request (ValueError if bad)."""
+        if json_options is None:
+            json_options = {}
+        if not isinstance(json_options, dict):
+            raise ValueError("Options should be a JSON object")
+        for name in json_options:
+            if name not in API_OPTIONS:
+                raise ValueError(f"Unknown option: {name}")
+        options = BatchOptions(time_limit=self.time_limit)
+        for name, value in json_options.items():
+            if not _is_option_value(value, getattr(options, name)):
+                raise ValueError(f"Bad option {name}: {value!r}")
+        options = BatchOptions(**{**asdict(options), **json_options})
+        options.time_limit = float(options.time_limit)
+        if options.strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy: {options.strategy}")
+        if options.move_ordering not in MOVE_ORDERING_NAMES:
+            raise ValueError(f"Unknown move ordering: {options.move_ordering}")
+        # Ranges checked here as the solvers would only fail in the workers
+        if options.beam_width < 1:
+            raise ValueError(f"Bad option beam_width: {options.beam_width} (at least 1)")
+        if options.weight < 1:
+            raise ValueError(f"Bad option weight: {options.weight} (at least 1)")
+        # A job always has a time limit
+        if options.time_limit <= 0 or options.time_limit > self.max_time_limit:
+            options.time_limit = self.max_time_limit
+        return options
+
+    @staticmethod
+    def get_cache_key(level: Level, options: BatchOptions) -> str:
+        """
+        @return the cache key of a level solved with options.
+        The time limit is not in the key as only the results not depending on it are cached.
+        """
+        json_options = asdict(options)
+        del json_options["time_limit"]
+        return json.dumps(
+            [level.capacity, level.bottles, json_options], sort_keys=True, default=str
+        )
+
+    def submit(self, json_request: Any, client_id: str) -> SolveJob:
+        """
+        Submit a puzzle to solve.
+        @return the job (already done when the result is in the cache).
+        Raise ValueError for a bad request, AdmissionError when the job is not admitted and
+        ServiceUnavailableError when the pool of workers is broken (it is then created again).
+        """
+        if not isinstance(json_request, dict):
+            raise ValueError("The request should be a JSON object")
+        options = self.parse_options(json_request.get("options"))
+        level = Level.from_json(json_request)
+        if level.capacity > MAX_CAPACITY:
+            raise ValueError(f"Capacity above {MAX_CAPACITY}: {level.capacity}")
+        if len(level.bottles) > MAX_NB_BOTTLES:
+            raise ValueError(f"More than {MAX_NB_BOTTLES} bottles: {len(level.bottles)}")
+        cache_key = self.get_cache_key(level, options)
+        job = SolveJob(job_id=uuid.uuid4().hex, client_id=client_id, cache_key=cache_key)
+        is_inline = (
+            options.strategy == STRATEGY_AUTO
+            and DIFFICULTY_PREDICTOR.predict(level).engine == ENGINE_INLINE
+        )
+
+        with self._lock:
+            self.nb_submitted += 1
+            result = self.cache.get(cache_key)
+            if result is not None:
+                self.nb_cache_hits += 1
+                self.cache.move_to_end(cache_key)
+                job.result = result
+                self._add_done_job(job)
+                return job
+            if self.nb_active_jobs >= self.max_queue:
+                self.nb_rejected += 1
+                raise AdmissionError("Too many jobs in the queue")
+            nb_client_jobs = self.nb_client_jobs.get(client_id, 0)
+            if nb_client_jobs >= self.max_jobs_per_client:
+                self.nb_rejected += 1
+                raise AdmissionError("Too many jobs for this client")
+            self.nb_client_jobs[client_id] = nb_client_jobs + 1
+            self.nb_active_jobs += 1
+            self.jobs[job.job_id] = job
+
+        if is_inline:
+            result = self._solve_inline(level, options)
+            with self._lock:
+                if result is None:
+                    self.nb_inline_fallbacks += 1
+                else:
+                    self.nb_inline_jobs += 1
+            if result is not None:
+                job.future = Future()
+                job.future.set_running_or_notify_cancel()
+                job.future.set_result(result)
+                self._job_done(job, job.future)
+                return job
+        executor = self.executor
+        try:
+            job.future = executor.submit(
+                solve_job, job.job_id, ("api", 0, level, options), self.progress_queue
+            )
+        except BrokenProcessPool as err:
+            # A worker process died (for example killed for its memory): the pool refuses
+            # every new job until it is replaced
+            with self._lock:
+                self._release_job(job)
+                del self.jobs[job.job_id]
+                if self._create_executor is not None and self.executor is executor:
+                    self.executor = self._create_executor()
+                    executor.shutdown(wait=False, cancel_futures=True)
+            raise ServiceUnavailableError("The workers are restarted") from err
+        job.future.add_done_callback(lambda future: self._job_done(job, future))
+        return job
+
+    def _solve_inline(self, level: Level, options: BatchOptions) -> Optional[dict[str, Any]]:
+        """
+        Solve a trivial puzzle in the request thread (one at a time, within INLINE_TIME_LIMIT).
+        @return the result, None when the puzzle goes to a worker (another puzzle is solved in
+        a request thread, the prediction was wrong or the solving failed).
+        """
+        if not self._inline_lock.acquire(blocking=False):
+            return None
+        try:
+            time_limit = min(options.time_limit, INLINE_TIME_LIMIT)
+            result = solve_level(("api", 0, level, replace(options, time_limit=time_limit)))
+        except Exception:  # pylint: disable=broad-except
+            return None  # The worker gives the error
+        finally:
+            self._inline_lock.release()
+        if result["status"] in (SolveStatus.TIMEOUT.value, STATUS_MEMORY_LIMIT):
+            return None
+        return result
+
+    def _add_done_job(self, job: SolveJob) -> None:
+        """Keep a done job to be polled, forgetting the oldest ones (lock is held)."""
+        self.jobs[job.job_id] = job
+        self._done_job_ids[job.job_id] = None
+        while len(self._done_job_ids) > self.max_done_jobs:
+            job_id, _ = self._done_job_ids.popitem(last=False)
+            del self.jobs[job_id]
+
+    def _release_job(self, job: SolveJob) -> None:
+        """The job is no more queued or running (lock is held)."""
+        self.nb_active_jobs -= 1
+        self.nb_client_jobs[job.client_id] -= 1
+        if not self.nb_client_jobs[job.client_id]:
+            del self.nb_client_jobs[job.client_id]
+
+    def _job_done(self, job: SolveJob, future: Future) -> None:
+        """Callback when the worker is done with a job."""
+        try:
+            result = future.result()
+            del result["file"], result["index"]
+            self.dispatch_log.record(result)
+        except Exception as err:  # pylint: disable=broad-except
+            # Worker failure (for example a worker process killed for its memory)
+            result = {"status": "error", "error": str(err)}
+        with self._lock:
+            job.result = result
+            self._release_job(job)
+            if result["status"] in CACHED_STATUS:
+                self.cache[job.cache_key] = result
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+            self._add_done_job(job)
+
+    def _receive_progress(self) -> None:
+        """Keep the progress estimates of the running jobs (until None is received)."""
+        while True:
+            try:
+                item = self.progress_queue.get()
+            except (EOFError, OSError):
+                return  # Manager stopped
+            if item is None:
+                return
+            job_id, estimate = item
+            with self._lock:
+                job = self.jobs.get(job_id)
+                if job is not None and job.result is None:
+                    job.progress = estimate
+
+    def get(self, job_id: str, wait: float = 0.0) -> Optional[SolveJob]:
+        """
+        @return the job (None if unknown).
+        wait: maximum time (in seconds) to wait for the job to be done.
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        if wait > 0 and job.result is None and job.future is not None:
+            deadline = time.perf_counter() + min(wait, MAX_WAIT)
+            try:
+                job.future.result(timeout=min(wait, MAX_WAIT))
+            except Exception:  # pylint: disable=broad-except
+                pass  # Timeout of the wait or failure of the job
+            # The done callback may run just after the future result
+            while job.result is None and time.perf_counter() < deadline:
+                time.sleep(0.001)
+        return job
+
+    def stats(self) -> dict[str, Any]:
+        """@return statistics of the service."""
+        with self._lock:
+            nb_running = sum(
+                1 for job in self.jobs.values() if job.status == JOB_RUNNING
+            )
+            return {
+                "active_jobs": self.nb_active_jobs,
+                "running_jobs": nb_running,
+                "queued_jobs": self.nb_active_jobs - nb_running,
+                "max_queue": self.max_queue,
+                "clients": len(self.nb_client_jobs),
+                "submitted": self.nb_submitted,
+                "rejected": self.nb_rejected,
+                "cache_hits": self.nb_cache_hits,
+                "cache_size": len(self.cache),
+                "inline_jobs": self.nb_inline_jobs,
+                "inline_fallbacks": self.nb_inline_fallbacks,
+                "dispatch": self.dispatch_log.statistics(),
+            }
+
+    def shutdown(self) -> None:
+        """Stop the workers (queued jobs are cancelled)."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.progress_queue.put(None)
+        self._progress_thread.join()
+        self._manager.shutdown()
+
+
+class SolveApiHandler(BaseHTTPRequestHandler):
+    """HTTP handler of the API (the SolveService is the 'service' attribute of the server)."""
+
+    def send_json(self, http_status: int, body: dict[str, Any], **headers: str) -> None:
+        """Send a JSON response."""
+        content = json.dumps(body).encode("utf-8")
+        self.send_response(http_status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        for name, value in headers.items():
+            self.send_header(name.replace("_", "-"), value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def client_id(self) -> str:
+        """@return the identifier of the client."""
+        return self.headers.get("X-Client-Id") or self.client_address[0]
+
+    def do_POST(self) -> None:  # pylint: disable=invalid-name
+        """Submit a job."""
+        service: SolveService = self.server.service  # type: ignore
+        if urlparse(self.path).path != "/jobs":
+            self.send_json(404, {"error": "Unknown endpoint"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.send_json(400, {"error": "Bad Content-Length"})
+            return
+        if length > MAX_BODY_SIZE:
+            self.send_json(413, {"error": "Request too large"})
+            return
+        try:
+            job = service.submit(json.loads(self.rfile.read(length)), self.client_id())
+        except ValueError as err:  # Including JSON decoding errors
+            self.send_json(400, {"error": str(err)})
+            return
+        except AdmissionError as err:
+            self.send_json(429, {"error": str(err)}, Retry_After="1")
+            return
+        except ServiceUnavailableError as err:
+            self.send_json(503, {"error": str(err)}, Retry_After="1")
+            return
+        self.send_json(200 if job.status == JOB_DONE else 202, job.to_json())
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        """Job status or statistics."""
+        service: SolveService = self.server.service  # type: ignore
+        url = urlparse(self.path)
+        if url.path == "/stats":
+            self.send_json(200, service.stats())
+            return
+        if not url.path.startswith("/jobs/"):
+            self.send_json(404, {"error": "Unknown endpoint"})
+            return
+        try:
+            wait = float(parse_qs(url.query).get("wait", ["0"])[0])
+        except ValueError:
+            self.send_json(400, {"error": "Bad wait"})
+            return
+        job = service.get(url.path[len("/jobs/") :], wait)
+        if job is None:
+            self.send_json(404, {"error": "Unknown job"})
+            return
+        self.send_json(200, job.to_json())
+
+    def log_message(self, format: str, *args: Any) -> None:  # pylint: disable=redefined-builtin
+        """No log for every request."""
+
+
+def create_server(
+    service: SolveService, host: str = "127.0.0.1", port: int = 8080
+) -> ThreadingHTTPServer:
+    """@return the HTTP server of the API (port 0 for any free port)."""
+    server = ThreadingHTTPServer((host, port), SolveApiHandler)
+    server.daemon_threads = True
+    server.service = service  # type: ignore
+    return server
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """Parse the command line arguments."""
+    parser = argparse.ArgumentParser(description="JSON/HTTP water sort puzzle solving API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes")
+    parser.add_argument(
+        "--max-queue", type=int, default=64, help="Maximum number of queued or running jobs"
+    )
+    parser.add_argument(
+        "--max-jobs-per-client",
+        type=int,
+        default=4,
+        help="Maximum number of queued or running jobs of a client",
+    )
+    parser.add_argument(
+        "--time-limit", type=float, default=10.0, help="Default seconds per job"
+    )
+    parser.add_argument(
+        "--max-time-limit", type=float, default=60.0, help="Maximum seconds per job"
+    )
+    parser.add_argument(
+        "--memory-limit",
+        type=int,
+        default=0,
+        help="Megabytes per worker process (0 for no limit)",
+    )
+    parser.add_argument(
+        "--max-portfolio-processes",
+        type=int,
+        default=0,
+        help="Processes of the portfolio strategy (\"auto\" strategy of huge puzzles) shared by "
+        "the workers (0 for the default)",
+    )
+    parser.add_argument("--cache-size", type=int, default=1024)
+    parser.add_argument(
+        "--dispatch-log",
+        help="JSON Lines file where the results of the \"auto\" strategy jobs are appended",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Command line entry point. @return exit code."""
+    args = parse_args(argv)
+    service = SolveService(
+        nb_workers=args.workers,
+        max_queue=args.max_queue,
+        max_jobs_per_client=args.max_jobs_per_client,
+        time_limit=args.time_limit,
+        max_time_limit=args.max_time_limit,
+        memory_limit=args.memory_limit,
+        cache_size=args.cache_size,
+        dispatch_log=DispatchLog(args.dispatch_log),
+        max_portfolio_processes=args.max_portfolio_processes,
+    )
+    server = create_server(service, args.host, args.port)
+    print(f"Solve API on http://{args.host}:{server.server_address[1]}/jobs")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+
+    sys.exit(main())
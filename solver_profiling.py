@@ -0,0 +1,240 @@
+#! coding:utf-8
+
+"""
+The solver_profiling module measures where the time of a solving goes.
+
+A SolverProfiler records the number of calls and the cumulative time of the hot paths of the
+solver (@see HOT_PATHS): Puzzle.clone, Puzzle.is_same_as, Bottle.is_interesting_to_pour_into,
+PuzzleChain.__post_init__, Puzzle.is_done, ...
+The hot paths are only wrapped while the profiler is active (in a 'with' block), so there is
+no overhead at all when profiling is not used. As the hot paths are class attributes, only one
+profiler of the process can be active at a time (RuntimeError otherwise).
+
+    profiler = SolverProfiler(use_cprofile=True)
+    with profiler:
+        solver.solve()
+    print(profiler.report())
+    profiler.write_folded_stacks("solve.folded")  # For flamegraph.pl or speedscope
+    profiler.pstats().sort_stats("cumulative").print_stats(20)
+
+Timings of nested hot paths are recorded per call stack (for the folded stacks) so that
+the self time of each hot path (its time without the nested hot paths) is also known.
+The wrappers add their own overhead to the measured times: compare the timings with each
+other rather than with a solving without profiling.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import functools
+import pstats
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator, Optional, TextIO, Tuple
+
+from bottle import Bottle
+from puzzle import Puzzle
+from puzzle_solver import PuzzleChain, PuzzleSolver
+
+# Hot paths of the solver: name -> (class, attribute name)
+# (generators are not hot paths: only the creation of the generator would be timed)
+HOT_PATHS: dict[str, Tuple[type, str]] = {
+    "PuzzleSolver.solve": (PuzzleSolver, "solve"),
+    "PuzzleSolver.solve_weighted": (PuzzleSolver, "solve_weighted"),
+    "PuzzleSolver.solve_beam": (PuzzleSolver, "solve_beam"),
+    "PuzzleSolver._explore_a_puzzle_chain": (PuzzleSolver, "_explore_a_puzzle_chain"),
+    "PuzzleChain.new_puzzle_chain": (PuzzleChain, "new_puzzle_chain"),
+    "PuzzleChain.__post_init__": (PuzzleChain, "__post_init__"),
+    "Puzzle.clone": (Puzzle, "clone"),
+    "Puzzle.pour": (Puzzle, "pour"),
+    "Puzzle.is_same_as": (Puzzle, "is_same_as"),
+    "Puzzle.state_key": (Puzzle, "state_key"),
+    "Puzzle.is_done": (Puzzle, "is_done"),
+    "Bottle.is_interesting_to_pour_into": (Bottle, "is_interesting_to_pour_into"),
+}
+
+# Name of the root of the call stacks (the whole 'with' block)
+ROOT_PHASE = "total"
+
+# Active profiler of the process: the hot paths are class attributes shared by every solving
+_active_profiler: Optional[SolverProfiler] = None
+_active_profiler_lock = threading.Lock()
+
+
+@dataclass
+class PhaseTiming:
+    """Timing of a hot path for one call stack."""
+
+    nb_calls: int = 0
+    total_time: float = 0.0  # Including the nested hot paths
+    children_time: float = 0.0  # Time of the nested hot paths
+
+    @property
+    def self_time(self) -> float:
+        """@return time spent in the hot path itself."""
+        return self.total_time - self.children_time
+
+
+class SolverProfiler:
+    """
+    Timings of the hot paths of the solver while the profiler is active.
+
+    use_cprofile: If True, a cProfile.Profile also runs while the profiler is active
+        (@see pstats).
+    hot_paths: Names of the hot paths to time (default is all HOT_PATHS).
+    """
+
+    def __init__(
+        self, use_cprofile: bool = False, hot_paths: Optional[list[str]] = None
+    ) -> None:
+        self.hot_paths: list[str] = list(HOT_PATHS) if hot_paths is None else hot_paths
+        for name in self.hot_paths:
+            if name not in HOT_PATHS:
+                raise ValueError(f"Unknown hot path: {name}")
+        self.cprofile: Optional[cProfile.Profile] = (
+            cProfile.Profile() if use_cprofile else None
+        )
+        # Timings per call stack (tuple of hot path names from the root)
+        self.timings: dict[Tuple[str, ...], PhaseTiming] = {}
+        self._stack: list[str] = []
+        # Thread of the profiled solving (the hot paths called by other threads are not timed)
+        self._thread_id: Optional[int] = None
+        # Original class attributes replaced by the wrappers
+        self._originals: list[Tuple[type, str, Any]] = []
+
+    def _record(self, name: str, func: Callable, args: Any, kwargs: Any) -> Any:
+        """Call func and record its timing for the current call stack."""
+        self._stack.append(name)
+        time_start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            duration = time.perf_counter() - time_start
+            stack = tuple(self._stack)
+            self._stack.pop()
+            timing = self.timings.get(stack)
+            if timing is None:
+                timing = self.timings[stack] = PhaseTiming()
+            timing.nb_calls += 1
+            timing.total_time += duration
+            parent = self.timings.get(stack[:-1])
+            if parent is None:
+                parent = self.timings[stack[:-1]] = PhaseTiming()
+            parent.children_time += duration
+
+    def _wrap(self, name: str, func: Callable) -> Callable:
+        """@return func recording its timings."""
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if threading.get_ident() != self._thread_id:
+                return func(*args, **kwargs)
+            return self._record(name, func, args, kwargs)
+
+        return wrapper
+
+    def _install(self) -> None:
+        """Replace the hot paths by their timing wrappers."""
+        for name in self.hot_paths:
+            cls, attribute_name = HOT_PATHS[name]
+            original = cls.__dict__[attribute_name]
+            if isinstance(original, property):
+                assert original.fget is not None
+                wrapper: Any = property(self._wrap(name, original.fget), doc=original.__doc__)
+            elif isinstance(original, staticmethod):
+                wrapper = staticmethod(self._wrap(name, original.__func__))
+            else:
+                wrapper = self._wrap(name, original)
+            self._originals.append((cls, attribute_name, original))
+            setattr(cls, attribute_name, wrapper)
+
+    def _uninstall(self) -> None:
+        """Restore the original hot paths."""
+        while self._originals:
+            cls, attribute_name, original = self._originals.pop()
+            setattr(cls, attribute_name, original)
+
+    def __enter__(self) -> SolverProfiler:
+        global _active_profiler  # pylint: disable=global-statement
+        with _active_profiler_lock:
+            if _active_profiler is not None:
+                raise RuntimeError("A profiler is already active")
+            _active_profiler = self
+        self._stack = [ROOT_PHASE]
+        self._thread_id = threading.get_ident()
+        self._install()
+        self._time_start = time.perf_counter()
+        if self.cprofile is not None:
+            self.cprofile.enable()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        global _active_profiler  # pylint: disable=global-statement
+        if self.cprofile is not None:
+            self.cprofile.disable()
+        self._uninstall()
+        root = self.timings.setdefault((ROOT_PHASE,), PhaseTiming())
+        root.nb_calls += 1
+        root.total_time += time.perf_counter() - self._time_start
+        self._stack = []
+        self._thread_id = None
+        with _active_profiler_lock:
+            _active_profiler = None
+
+    def clear(self) -> None:
+        """Forget the recorded timings."""
+        self.timings.clear()
+        if self.cprofile is not None:
+            self.cprofile = cProfile.Profile()
+
+    def statistics(self) -> dict[str, PhaseTiming]:
+        """@return timings of each hot path (summed over the call stacks)."""
+        statistics: dict[str, PhaseTiming] = {}
+        for stack, timing in self.timings.items():
+            phase = statistics.setdefault(stack[-1], PhaseTiming())
+            phase.nb_calls += timing.nb_calls
+            phase.total_time += timing.total_time
+            phase.children_time += timing.children_time
+        return statistics
+
+    def report(self) -> str:
+        """@return the timings of the hot paths as a table (highest self time first)."""
+        statistics = self.statistics()
+        root = statistics.get(ROOT_PHASE, PhaseTiming())
+        lines = [
+            f"{'phase':<40}{'calls':>10}{'cumulative':>12}{'self':>12}{'self %':>8}"
+        ]
+        for name, timing in sorted(
+            statistics.items(), key=lambda item: item[1].self_time, reverse=True
+        ):
+            ratio = 100 * timing.self_time / root.total_time if root.total_time else 0.0
+            lines.append(
+                f"{name:<40}{timing.nb_calls:>10}{timing.total_time:>11.3f}s"
+                f"{timing.self_time:>11.3f}s{ratio:>7.1f}%"
+            )
+        return "\n".join(lines)
+
+    def iter_folded_stacks(self) -> Iterator[str]:
+        """
+        Iterator on the 'folded stacks' lines of the timings: 'root;phase;...;phase value'
+        where value is the self time in microseconds (input of flamegraph.pl, speedscope, ...).
+        """
+        for stack, timing in self.timings.items():
+            microseconds = round(timing.self_time * 1e6)
+            if microseconds > 0:
+                yield f"{';'.join(stack)} {microseconds}\n"
+
+    def write_folded_stacks(self, output: Any) -> None:
+        """Write the folded stacks to a file name or a text stream."""
+        if isinstance(output, str):
+            with open(output, "w", encoding="utf-8") as stream:
+                stream.writelines(self.iter_folded_stacks())
+        else:
+            output.writelines(self.iter_folded_stacks())
+
+    def pstats(self, stream: Optional[TextIO] = None) -> pstats.Stats:
+        """@return the pstats.Stats of the cProfile (the profiler needs use_cprofile)."""
+        if self.cprofile is None:
+            raise ValueError("The profiler was created without cProfile")
+        return pstats.Stats(self.cprofile, stream=stream)
@@ -0,0 +1,173 @@
+#! coding:utf-8
+
+"""
+The speculative_solver module solves a puzzle in the background while it may still change.
+
+An asyncio application (like the JustPy web server) calls SpeculativeSolver.update each time
+the puzzle changes: as soon as the puzzle is consistent, a background solving starts after a
+short delay (debounce of quick edits). A change of the puzzle cancels the solving of the
+previous one.
+When the user asks for the solution, SpeculativeSolver.result gives the result of the background
+solving (waiting for its end if needed) so that the answer is usually immediate.
+
+Background solvings run in a shared executor of one thread (@see SPECULATIVE_EXECUTOR) so that
+they never take more than one thread of the process, whatever the number of sessions.
+A background solving can wait there for the ones of other sessions: a user asking for the
+solution should not wait for a solving that is not started yet (@see is_started).
+"""
+
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable, Hashable, Optional, Tuple
+
+from puzzle import Puzzle
+from puzzle_hint import puzzle_position_key
+from puzzle_solver import PuzzleChain, PuzzleSolver, SolveStatus
+from search_progress import ProgressEstimate
+
+# Executor of the background solvings of all the SpeculativeSolver's
+SPECULATIVE_EXECUTOR: Executor = ThreadPoolExecutor(
+    max_workers=1, thread_name_prefix="speculative_solver"
+)
+
+# Result of a solving: (status, moves of the solution or None)
+SolveResult = Tuple[SolveStatus, Optional[list[Tuple[int, int]]]]
+
+
+def solution_moves(solution: Optional[PuzzleChain]) -> Optional[list[Tuple[int, int]]]:
+    """@return the (i_source, i_destination) moves of a solution (None if no solution)."""
+    if solution is None:
+        return None
+    return [
+        puzzle_chain.move
+        for puzzle_chain in solution.iter_puzzle_chains()
+        if puzzle_chain.move is not None
+    ]
+
+
+class SpeculativeSolver:
+    """
+    Background solving of the last consistent puzzle.
+
+    solve: Solving of a puzzle given its PuzzleSolver (default is PuzzleSolver.solve).
+    delay: time (in seconds) without any change of the puzzle before the solving starts.
+    time_limit: If not nul, maximum duration (in seconds) of a background solving.
+    executor: executor of the solvings (default is SPECULATIVE_EXECUTOR).
+    """
+
+    def __init__(
+        self,
+        solve: Optional[Callable[[PuzzleSolver], Optional[PuzzleChain]]] = None,
+        delay: float = 0.5,
+        time_limit: float = 30.0,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        self.solve = PuzzleSolver.solve if solve is None else solve
+        self.delay = delay
+        self.time_limit = time_limit
+        self.executor = SPECULATIVE_EXECUTOR if executor is None else executor
+        # Current speculative solving
+        self._key: Optional[Hashable] = None
+        self._task: Optional[asyncio.Task] = None
+        self._solver: Optional[PuzzleSolver] = None
+        # Solver whose solving has started in the executor (set from the executor thread)
+        self._started_solver: Optional[PuzzleSolver] = None
+        # Statistics
+        self.nb_started = 0
+        self.nb_cancelled = 0
+        self.nb_used = 0
+
+    def update(self, puzzle: Optional[Puzzle]) -> None:
+        """
+        The puzzle has changed (None when the puzzle is not consistent).
+        Must be called from the running asyncio event loop.
+        """
+        key = None if puzzle is None else puzzle_position_key(puzzle)
+        if key is not None and key == self._key:
+            return  # Same puzzle: the solving goes on
+        self.cancel()
+        if puzzle is None or not puzzle.is_consistent:
+            return
+        self._key = key
+        self._task = asyncio.get_running_loop().create_task(self._run(puzzle.clone()))
+
+    async def _run(self, puzzle: Puzzle) -> SolveResult:
+        """Background solving of the puzzle after the debounce delay."""
+        await asyncio.sleep(self.delay)
+        solver = PuzzleSolver(puzzle, time_limit=self.time_limit)
+        self._solver = solver
+        self.nb_started += 1
+        solution = await asyncio.get_running_loop().run_in_executor(
+            self.executor, self._solve, solver
+        )
+        return solver.status, solution_moves(solution)
+
+    def _solve(self, solver: PuzzleSolver) -> Optional[PuzzleChain]:
+        """Solving in the executor (the job may first wait for the jobs of other solvers)."""
+        self._started_solver = solver
+        return self.solve(solver)
+
+    def cancel(self) -> None:
+        """Cancel the current speculative solving (if any)."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            self.nb_cancelled += 1
+        if self._solver is not None:
+            self._solver.cancel()  # The executor thread is not stopped by the task cancel
+        self._key = None
+        self._task = None
+        self._solver = None
+
+    def is_started(self, puzzle: Puzzle) -> bool:
+        """
+        @return True if the speculative solving of the puzzle is running or over, False if
+        there is none or if it still waits for its delay or for a thread of the executor.
+        """
+        if self._task is None or self._key != puzzle_position_key(puzzle):
+            return False
+        return self._task.done() or (
+            self._solver is not None and self._started_solver is self._solver
+        )
+
+    def progress_estimate(self) -> Optional[ProgressEstimate]:
+        """@return the progress estimate of the current speculative solving (None if none)."""
+        if self._solver is None:
+            return None
+        return self._solver.progress_estimate()
+
+    def done_result(self, puzzle: Puzzle) -> Optional[SolveResult]:
+        """
+        @return the result of the speculative solving of the puzzle if it is already over
+        (without waiting), else None (@see result).
+        """
+        task = self._task
+        if task is None or self._key != puzzle_position_key(puzzle) or not task.done():
+            return None
+        if task.cancelled() or task.exception() is not None:
+            return None
+        status, moves = task.result()
+        if status == SolveStatus.TIMEOUT:
+            return None
+        self.nb_used += 1
+        return status, moves
+
+    async def result(self, puzzle: Puzzle) -> Optional[SolveResult]:
+        """
+        @return the result of the speculative solving of the puzzle (waiting for its end)
+        or None when there is no (complete) speculative solving of this puzzle.
+        """
+        task = self._task
+        if task is None or self._key != puzzle_position_key(puzzle):
+            return None
+        try:
+            status, moves = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                raise  # The caller is cancelled
+            return None  # The puzzle changed while waiting
+        if status == SolveStatus.TIMEOUT:
+            return None
+        self.nb_used += 1
+        return status, moves
@@ -217,6 +217,70 @@ def test_bottle_clone():
         assert list_colors[i] == dose
 
 
+def test_bottle_max_doses():
+    # Bottles of another capacity than Bottle.MAX_DOSES
+    small, large = Bottle("AB", max_doses=2), Bottle("BBBBB", max_doses=6)
+    assert small.is_full and not small.can_push_dose("B")
+    assert not large.is_full and not large.is_complete
+    assert small.pour_into(large) == 1
+    assert large.is_complete and large.nb_top_doses == 6
+    clone = large.clone()
+    assert clone.max_doses == 6 and clone.is_complete
+    assert Bottle("A").max_doses == Bottle.MAX_DOSES
+
+
+@pytest.mark.parametrize(
+    "content, nb_top_doses, single_color, complete",
+    [
+        ("", 0, False, False),
+        ("A", 1, True, False),
+        ("AB", 1, False, False),
+        ("ABB", 2, False, False),
+        ("AAA", 3, True, False),
+        ("BAAA", 3, False, False),
+        ("AAAA", 4, True, True),
+    ],
+)
+def test_bottle_top_doses(content, nb_top_doses, single_color, complete):
+
+    # This test is valid only with 4 doses bottles
+    assert Bottle.MAX_DOSES == 4
+
+    e = Bottle(content)
+    assert e.nb_top_doses == nb_top_doses
+    assert e.is_single_color == single_color
+    assert e.is_complete == complete
+    assert e.clone().nb_top_doses == nb_top_doses
+
+
+@pytest.mark.parametrize(
+    "source, destination, new_source, new_destination",
+    [
+        ("AB", "", "A", "B"),
+        ("ABB", "B", "A", "BBB"),
+        ("BAA", "BBA", "BA", "BBAA"),
+        ("AABB", "B", "AA", "BBB"),
+        ("ABBB", "BB", "AB", "BBBB"),
+        ("AAAA", "", "", "AAAA"),
+    ],
+)
+def test_bottle_pour_into_top_doses(source, destination, new_source, new_destination):
+
+    # This test is valid only with 4 doses bottles
+    assert Bottle.MAX_DOSES == 4
+
+    e_source = Bottle(source)
+    e_destination = Bottle(destination)
+    e_source.pour_into(e_destination)
+    assert e_source.is_same_as(Bottle(new_source))
+    assert e_destination.is_same_as(Bottle(new_destination))
+    assert e_source.nb_top_doses == Bottle(new_source).nb_top_doses
+    assert e_destination.nb_top_doses == Bottle(new_destination).nb_top_doses
+    assert e_source.doses[e_source.nb_doses :] == [None] * (
+        Bottle.MAX_DOSES - e_source.nb_doses
+    )
+
+
 def test_bottle_repr():
     e = Bottle(["A", "B", "C"])
     e_repr = f"{e}"
@@ -0,0 +1,150 @@
+#: coding:utf-8
+
+import json
+import random
+
+import pytest
+
+from difficulty_predictor import (
+    DEFAULT_COEFFICIENTS,
+    ENGINE_HEAVY,
+    ENGINE_INLINE,
+    ENGINE_WORKER,
+    DifficultyPredictor,
+    DispatchLog,
+    LevelFeatures,
+    iter_dispatch_samples,
+    main,
+)
+from level_solver import BatchOptions
+from puzzle_generator import generate_level
+from puzzle_io import Level
+
+
+def test_level_features():
+    level = Level(capacity=4, bottles=(("A", "B", "B"), ("B", "A", "A", "B"), ("A",), ()))
+    features = LevelFeatures.from_level(level)
+    assert features == LevelFeatures(
+        nb_bottles=4,
+        nb_colors=2,
+        capacity=4,
+        nb_empty_bottles=1,
+        spare_space=8,
+        fragmentation=4,
+        buried_doses=4,
+    )
+    assert features.values() == (4.0, 2.0, 4.0, 1.0, 8.0, 4.0, 4.0)
+
+
+def test_predictor_engines():
+    predictor = DifficultyPredictor()
+    small_level = generate_level(random.Random(1), 3, capacity=4, nb_empty_bottles=2)
+    prediction = predictor.predict(small_level)
+    assert prediction.engine == ENGINE_INLINE
+    assert prediction.expansions == pytest.approx(10**prediction.log_expansions)
+
+    large_level = generate_level(random.Random(1), 40, capacity=8, nb_empty_bottles=1)
+    prediction = predictor.predict(large_level)
+    assert prediction.engine == ENGINE_HEAVY
+    options = prediction.options(BatchOptions(strategy="auto", time_limit=5.0))
+    assert options.strategy == "portfolio" and options.time_limit == 5.0
+
+    features = LevelFeatures.from_level(large_level)
+    middle = (predictor.inline_max + predictor.worker_max) / 2
+    predictor = DifficultyPredictor([middle] + [0.0] * (len(DEFAULT_COEFFICIENTS) - 1))
+    assert predictor.predict_log_expansions(features) == pytest.approx(middle)
+    assert predictor.predict(large_level).engine == ENGINE_WORKER
+    json.dumps(predictor.predict(large_level).to_json())
+
+    with pytest.raises(ValueError):
+        DifficultyPredictor([1.0])
+
+
+@pytest.mark.parametrize("nb_colors", [15, 20])
+def test_predictor_large_level_not_inline(nb_colors):
+    # Levels underpredicted by the linear model
+    level = generate_level(random.Random(1), nb_colors, capacity=4)
+    predictor = DifficultyPredictor()
+    features = LevelFeatures.from_level(level)
+    assert predictor.predict_log_expansions(features) <= predictor.inline_max
+    assert predictor.predict(level).engine == ENGINE_WORKER
+
+
+def test_predictor_fit():
+    rng = random.Random(1)
+    coefficients = [2.0, 0.0, 0.1, 0.0, 0.05, 0.02, 0.01, 0.03]
+    true_predictor = DifficultyPredictor(coefficients)
+    samples = []
+    for _ in range(50):
+        nb_colors = rng.randint(2, 12)
+        nb_empty_bottles = rng.randint(1, 3)
+        nb_bottles = nb_colors + nb_empty_bottles + rng.randint(0, 2)
+        level = generate_level(rng, nb_colors, nb_bottles, rng.randint(3, 6), nb_empty_bottles)
+        features = LevelFeatures.from_level(level)
+        samples.append((features, round(10 ** true_predictor.predict_log_expansions(features))))
+    predictor = DifficultyPredictor.fit(samples, ridge=0.0)
+    for features, expansions in samples:
+        assert 10 ** predictor.predict_log_expansions(features) == pytest.approx(
+            expansions, rel=0.01
+        )
+    with pytest.raises(ValueError):
+        DifficultyPredictor.fit([])
+
+
+def test_dispatch_log(tmp_path):
+    path = tmp_path / "dispatch.jsonl"
+    dispatch_log = DispatchLog(str(path))
+    level = Level(capacity=2, bottles=(("A", "B"), ("B", "A"), ()))
+    prediction = DifficultyPredictor().predict(level)
+    for expansions in (10, 1000):
+        report = {
+            "status": "solved",
+            "expansions": expansions,
+            "prediction": {**prediction.to_json(), "log_expansions": 1.0},
+        }
+        dispatch_log.record(report)
+    dispatch_log.record({"status": "solved", "expansions": 3})  # No prediction
+    dispatch_log.record({**report, "status": "timeout"})
+    # The expansions of the weighted A* search are not compared with the predicted ones
+    worker_report = {**report, "prediction": {**report["prediction"], "engine": ENGINE_WORKER}}
+    dispatch_log.record({**worker_report, "expansions": 100})
+    assert dispatch_log.statistics() == {
+        ENGINE_INLINE: {
+            "count": 3,
+            "completed": 2,
+            "mean_log_expansions": 2.0,
+            "mean_error": -1.0,
+            "mean_absolute_error": 1.0,
+            "accurate": 0.5,
+        },
+        ENGINE_WORKER: {"count": 1, "completed": 1, "mean_log_expansions": 2.0},
+    }
+    samples = list(iter_dispatch_samples(str(path)))
+    assert samples == [(prediction.features, 10), (prediction.features, 1000)]
+
+
+def test_main(tmp_path, capsys):
+    rng = random.Random(2)
+    predictor = DifficultyPredictor()
+    path = tmp_path / "dispatch.jsonl"
+    dispatch_log = DispatchLog(str(path))
+    for _ in range(20):
+        level = generate_level(rng, rng.randint(2, 12), capacity=rng.randint(3, 6))
+        for engine in (ENGINE_INLINE, ENGINE_WORKER):
+            dispatch_log.record(
+                {
+                    "status": "solved",
+                    "expansions": rng.randint(1, 100),
+                    "prediction": {**predictor.predict(level).to_json(), "engine": engine},
+                }
+            )
+    assert main([str(path)]) == 0
+    fitted = json.loads(capsys.readouterr().out)
+    assert fitted["nb_samples"] == 20  # Samples of the DFS search only
+    assert len(fitted["coefficients"]) == len(DEFAULT_COEFFICIENTS)
+    assert main([str(tmp_path / "unknown.jsonl")]) == 1
+
+
+if __name__ == "__main__":
+
+    pytest.main()
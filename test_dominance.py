@@ -0,0 +1,66 @@
+#: coding:utf-8
+
+import random
+
+import pytest
+
+from dominance import DominanceTable
+from puzzle_generator import generate_level
+from puzzle_samples import puzzle_from_strings
+from puzzle_solver import CostModel, EmptyBottleCostModel, PuzzleSolver
+
+
+@pytest.mark.parametrize(
+    "expanded, puzzle, is_dominated",
+    [
+        # Two single color bottles of A are merged in the expanded puzzle
+        (["ABAB", "BA", "AA", ""], ["ABAB", "BA", "A", "A"], True),
+        # Same puzzle (up to bottle order) is not dominated
+        (["ABAB", "BA", "A", "A"], ["A", "ABAB", "A", "BA"], False),
+        # The expanded puzzle is not further along
+        (["ABAB", "BA", "A", "A"], ["ABAB", "BA", "AA", ""], False),
+        # Different mixed bottles
+        (["ABAB", "AB", "AA", ""], ["ABAB", "BA", "A", "A"], False),
+    ],
+)
+def test_dominance_table(expanded, puzzle, is_dominated):
+    table = DominanceTable()
+    table.add(puzzle_from_strings(expanded), 3)
+    assert len(table) == 1
+    assert table.is_dominated(puzzle_from_strings(puzzle), 3) == is_dominated
+    assert table.nb_checks == 1
+    assert table.nb_dominated == int(is_dominated)
+
+
+def test_dominance_table_depth():
+    table = DominanceTable()
+    table.add(puzzle_from_strings(["ABAB", "BA", "AA", ""]), 3)
+    # Expanded at a greater depth: not dominated
+    assert not table.is_dominated(puzzle_from_strings(["ABAB", "BA", "A", "A"]), 2)
+
+
+def test_solver_prune_dominated():
+    rng = random.Random(2)
+    for _ in range(10):
+        level = generate_level(rng, 3, nb_bottles=6, nb_empty_bottles=1)
+        solver = PuzzleSolver(level.to_puzzle(), keep_search_memory=True)
+        solution = solver.solve_weighted()
+        solution_pruned = solver.solve_weighted(prune_dominated=True)
+        # Pruning never loses the shortest solution
+        assert (solution is None) == (solution_pruned is None)
+        if solution is not None:
+            assert solution_pruned.depth == solution.depth
+            assert solver.solve(prune_dominated=True) is not None
+        assert solver.nb_dominated_puzzles == solver.dominance_table.nb_dominated
+
+
+def test_solver_prune_dominated_cost_model():
+    solver = PuzzleSolver(puzzle_from_strings(["AABB", "BBAA", ""]))
+    solver.solve_weighted(CostModel(), prune_dominated=True)
+    with pytest.raises(ValueError):
+        solver.solve_weighted(EmptyBottleCostModel(), prune_dominated=True)
+
+
+if __name__ == "__main__":
+
+    pytest.main()
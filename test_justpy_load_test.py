@@ -0,0 +1,142 @@
+#: coding:utf-8
+
+import json
+import random
+
+import pytest
+
+from justpy_load_test import (
+    DIFFICULTIES,
+    JustPyPage,
+    LoadTestError,
+    LoadTestReport,
+    iter_load_test_levels,
+    level_doses_by_color,
+    parse_page,
+    parse_server_report,
+    percentile,
+)
+from puzzle_io import Level
+
+
+def button(id, text, show=True):
+    return {"id": id, "html_tag": "button", "text": text, "show": show, "object_props": []}
+
+
+def div(text, children, show=True, id=None):
+    return {"id": id, "html_tag": "div", "text": text, "show": show, "object_props": children}
+
+
+def page_html(page_id, components):
+    return (
+        "<html><script>\n"
+        f"var page_id = {page_id};\n"
+        f"var justpyComponents = {json.dumps(components)};\n"
+        "</script></html>"
+    )
+
+
+PAGE_COMPONENTS = [
+    div(
+        "",
+        [
+            {"id": 1, "html_tag": "input", "attrs": {"placeholder": "Nb bottles"}},
+            {"id": 2, "html_tag": "input", "attrs": {"placeholder": "Nb doses per bottle"}},
+        ],
+    ),
+    div("", [button(3, "Yellow"), button(4, "Orange")]),
+    div(
+        "",
+        [
+            div("", [div("Bottle #1", [button(5, "1"), button(6, "2")])]),
+            div("", [button(7, "Solve it !", show=False)]),
+            div("", [button(8, "Next step")], show=False, id=9),
+        ],
+    ),
+]
+
+
+def test_parse_page():
+    page_id, components = parse_page(page_html(12, PAGE_COMPONENTS))
+    assert page_id == 12
+    assert components == PAGE_COMPONENTS
+    with pytest.raises(LoadTestError):
+        parse_page("<html></html>")
+
+
+def test_justpy_page():
+    page = JustPyPage(12, json.loads(json.dumps(PAGE_COMPONENTS)))
+    assert page.find_input("Nb bottles")["id"] == 1
+    assert [b["id"] for b in page.color_buttons()] == [3, 4]
+    assert [[b["id"] for b in doses] for doses in page.dose_buttons()] == [[5, 6]]
+    # Hidden components (or in hidden components) are not found
+    assert page.find_text("Solve it !") is None
+    assert page.find_text("Next step") is None
+
+    page.update({"type": "component_update", "data": div("", [button(8, "Next step")], id=9)})
+    assert page.find_text("Next step")["id"] == 8
+
+    page.update({"type": "page_update", "data": [button(10, "Solve it !")]})
+    assert page.find_text("Solve it !")["id"] == 10
+    assert page.dose_buttons() == []
+
+
+def test_level_doses_by_color():
+    level = Level(capacity=2, bottles=(("B", "A"), ("A", "B"), ()))
+    assert level_doses_by_color(level) == [(0, [(0, 1), (1, 0)]), (1, [(0, 0), (1, 1)])]
+
+
+def test_iter_load_test_levels():
+    levels = list(iter_load_test_levels(10, ["easy", "medium"], seed=1))
+    assert levels == list(iter_load_test_levels(10, ["easy", "medium"], seed=1))
+    assert len(levels) == 10
+    for difficulty, level in levels:
+        nb_colors = len({color for bottle in level.bottles for color in bottle})
+        assert nb_colors == (3 if difficulty == "easy" else 7)
+        assert level.capacity in DIFFICULTIES[difficulty][2]
+        assert level.to_puzzle().is_consistent
+    # Sessions of different capacities at the same time
+    assert len({level.capacity for _, level in levels}) > 1
+
+
+def test_percentile():
+    values = list(range(1, 101))
+    random.Random(1).shuffle(values)
+    assert percentile(values, 0.5) == 50
+    assert percentile(values, 0.99) == 99
+    assert percentile(values, 1.0) == 100
+    assert percentile([3.0], 0.9) == 3.0
+    with pytest.raises(ValueError):
+        percentile([], 0.5)
+
+
+def test_load_test_report():
+    report = LoadTestReport(nb_sessions=2, duration=2.0)
+    report.latencies["step"] += [0.010, 0.020, 0.030]
+    report.latencies["page_load"].append(0.100)
+    report.server_rss_kb += [1000, 3000, 2000]
+    statistics = report.statistics()
+    assert list(statistics) == ["page_load", "step"]
+    assert statistics["step"]["count"] == 3
+    assert statistics["step"]["p50"] == pytest.approx(20.0)
+    assert statistics["step"]["max"] == pytest.approx(30.0)
+    report_dict = report.to_dict()
+    assert report_dict["events_per_second"] == pytest.approx(2.0)
+    assert report_dict["server_max_rss_kb"] == 3000
+    json.dumps(report_dict)
+    assert "step" in report.format()
+
+
+def test_parse_server_report():
+    html = page_html(
+        1, [div("nb_sessions: 3", []), div("event_loop_lag: 1.0ms mean, 2.0ms max", [])]
+    )
+    assert parse_server_report(html) == {
+        "nb_sessions": "3",
+        "event_loop_lag": "1.0ms mean, 2.0ms max",
+    }
+
+
+if __name__ == "__main__":
+
+    pytest.main()
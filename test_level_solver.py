@@ -0,0 +1,89 @@
+#: coding:utf-8
+
+import random
+
+import pytest
+
+from bottle import Bottle
+from level_solver import (
+    STATUS_BAD_PUZZLE,
+    BatchOptions,
+    create_portfolio_slots,
+    init_worker,
+    solve_level,
+)
+from portfolio_solver import DEFAULT_PORTFOLIO
+from puzzle_generator import generate_level
+from puzzle_io import Level
+from puzzle_samples import puzzle29
+
+
+@pytest.mark.parametrize("strategy", ["dfs", "beam", "weighted", "auto"])
+def test_solve_level(strategy):
+    report = solve_level(
+        ("levels.jsonl", 3, Level.from_puzzle(puzzle29()), BatchOptions(strategy=strategy))
+    )
+    assert report["file"] == "levels.jsonl" and report["index"] == 3
+    assert report["status"] == "solved"
+    assert report["length"] == len(report["moves"])
+    assert report["expansions"] > 0
+    assert ("prediction" in report) == (strategy == "auto")
+
+
+@pytest.mark.parametrize("strategy", ["dfs", "weighted", "portfolio"])
+@pytest.mark.parametrize("decompose", [False, True])
+def test_solve_level_expansions(strategy, decompose):
+    # The expansions are the expanded puzzles (not the chains popped by the search loop)
+    level = generate_level(random.Random(1), 12)
+    solvers = []
+    report = solve_level(
+        ("levels.jsonl", 0, level, BatchOptions(strategy=strategy, decompose=decompose)),
+        solvers.append,
+    )
+    assert report["status"] == "solved"
+    assert report["expansions"] == solvers[0].nb_expanded_puzzles > 0
+    if strategy == "portfolio":
+        assert report["expansions"] == sum(
+            configuration["expansions"]
+            for configuration in report["portfolio"]["configurations"].values()
+        )
+    else:
+        assert solvers[0].nb_expanded_puzzles < solvers[0].nb_loops
+
+
+def test_solve_level_bad_puzzle():
+    level = Level(capacity=4, bottles=(("A", "B"),))
+    report = solve_level(("levels.jsonl", 0, level, BatchOptions()))
+    assert report["status"] == STATUS_BAD_PUZZLE
+    assert report["moves"] is None
+
+
+@pytest.mark.parametrize("strategy", ["dfs", "portfolio"])
+def test_solve_level_capacity(strategy):
+    level = Level(capacity=6, bottles=((1, 1, 1, 2, 2, 2), (2, 2, 2, 1, 1, 1), ()))
+    report = solve_level(("levels.jsonl", 0, level, BatchOptions(strategy=strategy)))
+    assert report["status"] == "solved"
+    # The capacity of the level is not the one of the process
+    assert Bottle.MAX_DOSES == 4
+
+
+def test_solve_level_portfolio_slots():
+    portfolio_slots = create_portfolio_slots(2, 1)
+    init_worker(0, portfolio_slots)
+    try:
+        options = BatchOptions(strategy="portfolio", wait_best=True)
+        report = solve_level(("levels.jsonl", 0, Level.from_puzzle(puzzle29()), options))
+    finally:
+        init_worker(0)
+    assert report["status"] == "solved"
+    assert len(report["portfolio"]["configurations"]) == len(DEFAULT_PORTFOLIO)
+    # The slot is released
+    assert portfolio_slots.acquire(False)
+    assert not portfolio_slots.acquire(False)
+    assert create_portfolio_slots(2).get_value() == len(DEFAULT_PORTFOLIO)
+    assert create_portfolio_slots(8).get_value() == 8
+
+
+if __name__ == "__main__":
+
+    pytest.main()
@@ -0,0 +1,69 @@
+#: coding:utf-8
+
+import random
+
+import pytest
+
+from pattern_database import PatternDatabase, PatternDatabaseLowerBound
+from puzzle_generator import generate_level
+from puzzle_samples import puzzle_from_strings
+from puzzle_solver import PuzzleSolver
+
+
+@pytest.fixture(scope="module")
+def databases():
+    return [PatternDatabase.build(5, 3, nb_colors) for nb_colors in (1, 2)]
+
+
+def test_pattern_database_build(databases):
+    database1, database2 = databases
+    # Partitions of the 3 doses of one color
+    assert len(database1) == 3
+    assert database1.get_nb_moves(((1, 1, 1),)) == 0
+    assert database1.get_nb_moves(((1,), (1, 1))) == 1
+    assert database1.get_nb_moves(((1,), (1,), (1,))) == 2
+    assert database2.get_nb_moves(((1, 1, 1), (2, 2, 2))) == 0
+    assert database2.get_nb_moves(((1, 2), (1, 2), (2, 1))) is not None
+
+
+def test_pattern_database_file(tmp_path, databases):
+    path = str(tmp_path / "pdb.wpd")
+    databases[1].save(path)
+    database = PatternDatabase.open(path)
+    assert (database.nb_bottles, database.capacity, database.nb_colors) == (5, 3, 2)
+    assert len(database) == len(databases[1])
+    assert database.get_nb_moves(((1, 2), (1, 2), (2, 1))) == databases[1].get_nb_moves(
+        ((1, 2), (1, 2), (2, 1))
+    )
+
+    path_bad = tmp_path / "bad.wpd"
+    path_bad.write_bytes(b"bad content")
+    with pytest.raises(ValueError):
+        PatternDatabase.open(str(path_bad))
+
+
+def test_pattern_database_lower_bound(databases):
+    rng = random.Random(0)
+    for _ in range(10):
+        puzzle = generate_level(rng, 3, capacity=3, nb_empty_bottles=2).to_puzzle()
+        lower_bound = PatternDatabaseLowerBound(puzzle, databases)
+        solver = PuzzleSolver(puzzle)
+        solution = solver.solve_weighted()
+        # Admissible lower bound
+        assert puzzle.lower_bound_nb_moves() <= lower_bound(puzzle) <= solution.depth
+        solution_pdb = solver.solve_weighted(lower_bound=lower_bound)
+        assert solution_pdb.depth == solution.depth
+
+
+def test_pattern_database_lower_bound_bad_shape(databases):
+    with pytest.raises(ValueError):
+        PatternDatabaseLowerBound(puzzle_from_strings(["AABB", "BBAA", ""]), databases)
+    with pytest.raises(ValueError):  # A color in two bottles
+        PatternDatabaseLowerBound(
+            puzzle_from_strings(["AAB", "ABA", "BAA", "", ""], max_doses=3), databases
+        )
+
+
+if __name__ == "__main__":
+
+    pytest.main()
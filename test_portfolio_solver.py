@@ -0,0 +1,138 @@
+#: coding:utf-8
+
+import multiprocessing
+import random
+
+import pytest
+
+from bottle import Bottle
+from portfolio_solver import DEFAULT_PORTFOLIO, PortfolioSolver
+from puzzle_generator import generate_level
+from puzzle_samples import puzzle29, puzzle_from_strings
+from puzzle_solver import PuzzleSolver, SolveStatus
+
+
+def test_portfolio_solver_first_answer():
+    assert Bottle.MAX_DOSES == 4
+    solver = PortfolioSolver(puzzle29(), time_limit=30.0)
+    solution = solver.solve()
+    assert solver.status == SolveStatus.SOLVED
+    assert solution.puzzle.is_done
+    assert solver.winner in DEFAULT_PORTFOLIO
+    assert solver.reports[solver.winner]["status"] == "solved"
+    assert solver.nb_expanded_puzzles >= solver.reports[solver.winner]["expansions"]
+    # The other processes are terminated
+    assert not multiprocessing.active_children()
+
+
+def test_portfolio_solver_already_solved():
+    solver = PortfolioSolver(puzzle_from_strings(["AAAA", "BBBB", ""]), time_limit=30.0)
+    solution = solver.solve()
+    assert solver.status == SolveStatus.SOLVED
+    assert solution.puzzle.is_done
+    assert not multiprocessing.active_children()
+
+
+def test_portfolio_solver_wait_best():
+    portfolio = {"dfs": {"strategy": "dfs"}, "astar": {"strategy": "weighted", "weight": 1.0}}
+    solver = PortfolioSolver(puzzle29(), portfolio=portfolio, wait_best=True)
+    solution = solver.solve()
+    assert solver.status == SolveStatus.SOLVED
+    assert set(solver.reports) == {"dfs", "astar"}
+    assert solution.depth == PuzzleSolver(puzzle29()).solve_weighted().depth
+    assert solution.depth == min(report["length"] for report in solver.reports.values())
+
+
+def test_portfolio_solver_no_solution():
+    solver = PortfolioSolver(puzzle_from_strings(["CBBA", "ABCC", "ACBA", ""]))
+    assert solver.solve() is None
+    assert solver.status == SolveStatus.NO_SOLUTION
+    assert solver.winner is not None
+
+
+def test_portfolio_solver_pruned():
+    # The pruned DFS search fails fast: it is not the proof that there is no solution
+    level = generate_level(random.Random(0), 6)
+    portfolio = {
+        "pruned": {"strategy": "dfs", "nb_chains_without_empty_bottle": 1},
+        "weighted": {"strategy": "weighted", "weight": 2.0},
+    }
+    solver = PortfolioSolver(level.to_puzzle(), portfolio=portfolio)
+    assert solver.solve() is not None
+    assert solver.status == SolveStatus.SOLVED
+    assert solver.winner == "weighted"
+
+    solver = PortfolioSolver(level.to_puzzle(), portfolio={"pruned": portfolio["pruned"]})
+    assert solver.solve() is None
+    assert solver.status == SolveStatus.PRUNED
+    assert solver.winner is None
+
+
+class ProcessSlots:
+    """Semaphore of the processes of the portfolio solvers counting the running processes."""
+
+    def __init__(self, nb_slots):
+        self.nb_slots = nb_slots
+        self.nb_used = 0
+        self.max_used = 0
+        self.nb_acquired = 0
+
+    def acquire(self, block=True):
+        assert not block
+        if self.nb_used == self.nb_slots:
+            return False
+        self.nb_used += 1
+        self.nb_acquired += 1
+        self.max_used = max(self.max_used, self.nb_used)
+        return True
+
+    def release(self):
+        assert self.nb_used > 0
+        self.nb_used -= 1
+
+
+def test_portfolio_solver_process_slots():
+    # One slot: the configurations are solved one after the other
+    portfolio = {"dfs": {"strategy": "dfs"}, "astar": {"strategy": "weighted", "weight": 1.0}}
+    process_slots = ProcessSlots(1)
+    solver = PortfolioSolver(
+        puzzle29(), portfolio=portfolio, wait_best=True, process_slots=process_slots
+    )
+    assert solver.solve() is not None
+    assert solver.status == SolveStatus.SOLVED
+    assert set(solver.reports) == {"dfs", "astar"}
+    assert process_slots.max_used == 1 and process_slots.nb_acquired == 2
+    assert process_slots.nb_used == 0
+
+    # No free slot (used by the solvers of other workers): wait for a slot by the time limit
+    process_slots = ProcessSlots(0)
+    solver = PortfolioSolver(puzzle29(), time_limit=0.2, process_slots=process_slots)
+    assert solver.solve() is None
+    assert solver.status == SolveStatus.TIMEOUT
+    assert not solver.reports and process_slots.nb_acquired == 0
+    assert not multiprocessing.active_children()
+
+
+def test_portfolio_solver_timeout():
+    level = generate_level(random.Random(1), 40, capacity=8, nb_empty_bottles=1)
+    solver = PortfolioSolver(level.to_puzzle(), time_limit=0.2)
+    assert solver.solve() is None
+    assert solver.status == SolveStatus.TIMEOUT
+    assert not multiprocessing.active_children()
+
+    solver = PortfolioSolver(puzzle29())
+    solver.cancel()
+    assert solver.solve() is None
+    assert solver.status == SolveStatus.TIMEOUT
+
+
+def test_portfolio_solver_bad_configuration():
+    with pytest.raises(ValueError):
+        PortfolioSolver(puzzle29(), portfolio={"loop": {"strategy": "portfolio"}})
+    with pytest.raises(ValueError):
+        PortfolioSolver(puzzle_from_strings(["AB", ""]))
+
+
+if __name__ == "__main__":
+
+    pytest.main()
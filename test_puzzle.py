@@ -111,6 +111,20 @@ def test_puzzle_is_consistent_empty_dose():
     assert not p.is_consistent
 
 
+def test_puzzle_capacity():
+    assert Puzzle().capacity == Bottle.MAX_DOSES
+    puzzle = Puzzle([Bottle(doses, max_doses=2) for doses in ("AB", "BA", "")])
+    assert puzzle.capacity == 2
+    assert puzzle.is_consistent
+    assert puzzle.lower_bound_nb_moves() == 2
+    puzzle.pour(0, 2)
+    puzzle.pour(1, 0)
+    puzzle.pour(2, 1)
+    assert puzzle.is_done and puzzle.nb_complete_bottles == 2
+    # Bottles of different capacities
+    assert not Puzzle([Bottle("AA", max_doses=2), Bottle("AA", max_doses=4)]).is_consistent
+
+
 @pytest.mark.parametrize(
     "content, done",
     [
@@ -154,6 +168,92 @@ def test_puzzle_contains_empty_bottle():
     assert p.contains_empty_bottle()
 
 
+@pytest.mark.parametrize(
+    "content, nb_complete, nb_empty, nb_mixed",
+    [
+        ([], 0, 0, 0),
+        ([""], 0, 1, 0),
+        (["AAAA", "", "AB", "BB"], 1, 1, 1),
+        (["AABB", "BBAA", ""], 0, 1, 2),
+    ],
+)
+def test_puzzle_summary(content, nb_complete, nb_empty, nb_mixed):
+
+    # This test is valid only with 4 doses bottles
+    assert Bottle.MAX_DOSES == 4
+
+    p = Puzzle([Bottle(list_colors) for list_colors in content])
+    assert p.nb_complete_bottles == nb_complete
+    assert p.nb_empty_bottles == nb_empty
+    assert p.nb_mixed_bottles == nb_mixed
+    p2 = p.clone()
+    assert p2.nb_complete_bottles == nb_complete
+    assert p2.nb_empty_bottles == nb_empty
+    assert p2.nb_mixed_bottles == nb_mixed
+
+
+def test_puzzle_pour_updates_summary():
+
+    # This test is valid only with 4 doses bottles
+    assert Bottle.MAX_DOSES == 4
+
+    p = Puzzle([Bottle("AABB"), Bottle("BB"), Bottle("AA")])
+    assert (p.nb_complete_bottles, p.nb_empty_bottles, p.nb_mixed_bottles) == (0, 0, 1)
+    assert not p.is_done
+
+    assert p.pour(0, 1) == 2
+    assert (p.nb_complete_bottles, p.nb_empty_bottles, p.nb_mixed_bottles) == (1, 0, 0)
+    assert not p.contains_empty_bottle()
+
+    assert p.pour(2, 0) == 2
+    assert (p.nb_complete_bottles, p.nb_empty_bottles, p.nb_mixed_bottles) == (2, 1, 0)
+    assert p.contains_empty_bottle()
+    assert p.is_done
+
+
+@pytest.mark.parametrize(
+    "content0, content1, same",
+    [
+        (["AB", ""], ["", "AB"], True),
+        (["AB", "B"], ["B", "AB"], True),
+        (["AB", "B"], ["BA", "B"], False),
+        (["A", "A"], ["A", ""], False),
+    ],
+)
+def test_puzzle_state_key(content0, content1, same):
+    p0 = Puzzle([Bottle(list_colors) for list_colors in content0])
+    p1 = Puzzle([Bottle(list_colors) for list_colors in content1])
+    assert (p0.state_key() == p1.state_key()) == same
+    assert p0.is_same_as(p1) == same
+
+
+def test_puzzle_state_key_not_sortable_colors():
+    class Color:
+        pass
+
+    a, b = Color(), Color()
+    p0 = Puzzle([Bottle([a, b]), Bottle([b])])
+    p1 = Puzzle([Bottle([b]), Bottle([a, b])])
+    assert p0.state_key() == p1.state_key()
+
+
+@pytest.mark.parametrize(
+    "content, lower_bound",
+    [
+        ([""], 0),
+        (["AAAA", ""], 0),
+        (["AABB", "BBAA", ""], 2),
+        (["ABAB", "BABA", ""], 6),
+        # Colors filling several bottles
+        (["AAA", "AAA", "A", "A", "BBBB", ""], 2),
+        (["AAA", "AAA", "AB", "AB", "BB", ""], 4),
+    ],
+)
+def test_puzzle_lower_bound_nb_moves(content, lower_bound):
+    p = Puzzle([Bottle(list_colors) for list_colors in content])
+    assert p.lower_bound_nb_moves() == lower_bound
+
+
 if __name__ == "__main__":
 
     pytest.main()
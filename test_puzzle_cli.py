@@ -0,0 +1,101 @@
+#: coding:utf-8
+
+import json
+
+import pytest
+
+from puzzle_cli import main
+from puzzle_io import Level, write_levels_to_file
+from puzzle_samples import puzzle29, puzzles0
+
+
+@pytest.fixture
+def pack_directory(tmp_path):
+    levels = [Level.from_puzzle(puzzle) for puzzle in puzzles0()]
+    write_levels_to_file(str(tmp_path / "levels0.jsonl"), iter(levels))
+    levels = [Level.from_puzzle(puzzle29()), Level(capacity=4, bottles=(("A", "B"),))]
+    write_levels_to_file(str(tmp_path / "levels1.jsonl"), iter(levels))
+    return tmp_path
+
+
+@pytest.mark.parametrize("decompose", [False, True])
+@pytest.mark.parametrize("strategy", ["dfs", "beam", "weighted"])
+def test_cli_report(pack_directory, strategy, decompose):
+    report_path = pack_directory / "report.json"
+    argv = [str(pack_directory), "--strategy", strategy, "--report", str(report_path)]
+    if strategy == "weighted":
+        argv += ["--weight", "2"]
+    if decompose:
+        argv += ["--decompose"]
+    assert main(argv) == 0
+    report = json.loads(report_path.read_text())
+    assert report["nb_levels"] == 4
+    assert report["nb_solved"] == 3
+    statuses = [level["status"] for level in report["levels"]]
+    assert statuses == ["solved", "solved", "solved", "bad puzzle"]
+    for level in report["levels"][:3]:
+        assert level["length"] == len(level["moves"])
+        assert level["expansions"] > 0
+
+
+def test_cli_timeout(pack_directory, capsys):
+    assert main([str(pack_directory / "levels1.jsonl"), "--time-limit", "0.000001"]) == 0
+    report = json.loads(capsys.readouterr().out)
+    assert report["levels"][0]["status"] == "timeout"
+
+
+def test_cli_transposition_table(pack_directory, capsys):
+    assert main([str(pack_directory / "levels1.jsonl"), "--transposition-table", "4096"]) == 0
+    report = json.loads(capsys.readouterr().out)
+    assert report["levels"][0]["status"] == "solved"
+    assert report["levels"][0]["transposition_table"]["stores"] > 0
+
+
+def test_cli_auto_strategy(pack_directory, capsys):
+    dispatch_log_path = pack_directory / "dispatch.jsonl"
+    argv = [str(pack_directory), "--strategy", "auto", "--dispatch-log", str(dispatch_log_path)]
+    assert main(argv) == 0
+    report = json.loads(capsys.readouterr().out)
+    assert report["nb_solved"] == 3
+    for level in report["levels"][:3]:
+        assert level["prediction"]["engine"] == "inline"
+    # The bad puzzle is dispatched but its prediction is not measured
+    assert report["dispatch"]["inline"]["count"] == 4
+    assert report["dispatch"]["inline"]["completed"] == 3
+    assert len(dispatch_log_path.read_text().splitlines()) == 4
+
+
+def test_cli_portfolio_strategy(pack_directory, capsys):
+    assert main([str(pack_directory / "levels1.jsonl"), "--strategy", "portfolio"]) == 0
+    report = json.loads(capsys.readouterr().out)
+    level = report["levels"][0]
+    assert level["status"] == "solved"
+    assert level["length"] == len(level["moves"])
+    assert level["portfolio"]["configurations"][level["portfolio"]["winner"]]["status"] == "solved"
+
+
+def test_cli_portfolio_processes(pack_directory, capsys):
+    # Two workers share one process for their portfolio solvers
+    argv = [str(pack_directory), "--strategy", "portfolio", "--workers", "2"]
+    assert main(argv + ["--max-portfolio-processes", "1"]) == 0
+    report = json.loads(capsys.readouterr().out)
+    assert report["nb_solved"] == 3
+
+
+def test_cli_bad_file(tmp_path):
+    path = tmp_path / "bad.wsp"
+    path.write_bytes(b"bad content")
+    assert main([str(path)]) == 1
+    # Colors must be hashable
+    path = tmp_path / "bad.jsonl"
+    path.write_text('{"capacity": 2, "bottles": [[[1], [2]], [[2], [1]], []]}\n')
+    assert main([str(path)]) == 1
+    # More doses than the capacity in a bottle
+    path = tmp_path / "bad_level.wsp"
+    path.write_bytes(b"WSPP\x01" + bytes([0, 2, 2, 3, 1, 1, 1, 1, 1]))
+    assert main([str(path)]) == 1
+
+
+if __name__ == "__main__":
+
+    pytest.main()
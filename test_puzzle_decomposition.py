@@ -0,0 +1,99 @@
+#: coding:utf-8
+
+import random
+
+import pytest
+
+from puzzle_decomposition import (
+    DecomposedPuzzleSolver,
+    find_color_clusters,
+    puzzle_chain_from_moves,
+)
+from puzzle_generator import generate_level
+from puzzle_samples import puzzle_from_strings, puzzle29
+from puzzle_solver import PuzzleSolver, SolveStatus
+
+
+def check_solution(puzzle, solution):
+    """Replay the moves of the solution from the puzzle and check it is done."""
+    puzzle = puzzle.clone()
+    for puzzle_chain in solution.iter_puzzle_chains():
+        if puzzle_chain.move is not None:
+            puzzle.pour(*puzzle_chain.move)
+            assert puzzle.is_same_as(puzzle_chain.puzzle)
+    assert puzzle.is_done
+
+
+@pytest.mark.parametrize(
+    "strings, clusters",
+    [
+        (["ABAB", "BABA", "CDCD", "DCDC", "", ""], [[0, 1], [2, 3]]),
+        (["ABAB", "BACA", "CDCD", "DBDC", "", ""], [[0, 1, 2, 3]]),
+        (["AAAA", "BCBC", "CB", "CB", ""], [[1, 2, 3]]),
+        (["AAAA", "BBBB", ""], []),
+    ],
+)
+def test_find_color_clusters(strings, clusters):
+    assert find_color_clusters(puzzle_from_strings(strings)) == clusters
+
+
+def test_puzzle_chain_from_moves():
+    puzzle = puzzle_from_strings(["AABB", "BBAA", ""])
+    solution = puzzle_chain_from_moves(puzzle, [(0, 2), (1, 0), (2, 1)])
+    check_solution(puzzle, solution)
+
+
+@pytest.mark.parametrize(
+    "puzzle",
+    [
+        puzzle_from_strings(["ABAB", "BABA", "CDCD", "DCDC", "", ""]),
+        puzzle_from_strings(["AAAA", "BCBC", "CB", "CB", ""]),
+        puzzle_from_strings(["AAAA", "BBBB", ""]),
+        puzzle29(),
+    ],
+)
+def test_decomposed_solver(puzzle):
+    solver = DecomposedPuzzleSolver(puzzle)
+    solution = solver.solve()
+    check_solution(puzzle, solution)
+    assert solver.status == SolveStatus.SOLVED
+    assert solver.nb_sub_puzzles <= solver.nb_clusters
+
+
+def test_decomposed_solver_weighted():
+    puzzle = puzzle_from_strings(["ABAB", "BABA", "CDCD", "DCDC", "", ""])
+    solver = DecomposedPuzzleSolver(puzzle)
+    solution = solver.solve(PuzzleSolver.solve_weighted)
+    check_solution(puzzle, solution)
+    assert solver.nb_clusters == 2
+    assert solver.nb_sub_puzzles == 2
+    # The clusters do not interact: the merged solution is the shortest one
+    assert solution.depth == PuzzleSolver(puzzle).solve_weighted().depth
+
+
+def test_decomposed_solver_no_solution():
+    solver = DecomposedPuzzleSolver(puzzle_from_strings(["CBBA", "ABCC", "ACBA", ""]))
+    assert solver.solve() is None
+    assert solver.status == SolveStatus.NO_SOLUTION
+
+
+@pytest.mark.parametrize(
+    "seed, solve_sub_puzzle, status",
+    [
+        (0, lambda sub_solver: sub_solver.solve(1), SolveStatus.PRUNED),
+        (1, lambda sub_solver: sub_solver.solve_beam(1, 1), SolveStatus.WIDTH_LIMITED),
+    ],
+)
+def test_decomposed_solver_sub_status(seed, solve_sub_puzzle, status):
+    # Solvable level but not with the sub-puzzle solvings: their status is kept
+    level = generate_level(random.Random(seed), 6)
+    solver = DecomposedPuzzleSolver(level.to_puzzle())
+    assert solver.solve(solve_sub_puzzle) is None
+    assert solver.status == status
+    assert solver.solve() is not None
+    assert solver.status == SolveStatus.SOLVED
+
+
+if __name__ == "__main__":
+
+    pytest.main()
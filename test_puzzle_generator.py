@@ -0,0 +1,74 @@
+#: coding:utf-8
+
+from collections import Counter
+import random
+
+import pytest
+
+from puzzle_generator import (
+    estimate_difficulty,
+    generate_level,
+    iter_estimate_difficulties,
+    iter_generate_levels,
+)
+
+
+@pytest.mark.parametrize(
+    "nb_colors, nb_bottles, capacity, nb_empty_bottles",
+    [
+        (2, None, 4, 1),
+        (9, None, 4, 2),
+        (5, 9, 3, 1),
+        (4, 6, 6, 0),
+    ],
+)
+def test_generate_level(nb_colors, nb_bottles, capacity, nb_empty_bottles):
+    level = generate_level(
+        random.Random(0), nb_colors, nb_bottles, capacity, nb_empty_bottles
+    )
+    if nb_bottles is None:
+        nb_bottles = nb_colors + nb_empty_bottles
+    assert level.capacity == capacity
+    assert len(level.bottles) == nb_bottles
+    assert sum(1 for doses in level.bottles if not doses) == nb_empty_bottles
+    assert all(len(doses) <= capacity for doses in level.bottles)
+    color_counter = Counter(dose for doses in level.bottles for dose in doses)
+    assert color_counter == {color: capacity for color in range(nb_colors)}
+    assert level.to_puzzle().is_consistent
+
+
+@pytest.mark.parametrize(
+    "nb_colors, nb_bottles, capacity, nb_empty_bottles",
+    [
+        (0, None, 4, 1),
+        (3, None, 4, 0),
+        (3, 4, 4, 2),
+        (2, 10, 2, 1),
+        (1, None, 4, 2),  # Always solved
+        (3, None, 1, 2),  # Always solved
+        (2, 5, 2, 1),  # Always solved (one dose per bottle)
+    ],
+)
+def test_generate_bad_level(nb_colors, nb_bottles, capacity, nb_empty_bottles):
+    with pytest.raises(ValueError):
+        generate_level(random.Random(0), nb_colors, nb_bottles, capacity, nb_empty_bottles)
+
+
+def test_generate_levels_seed():
+    levels = list(iter_generate_levels(5, 6, seed=42))
+    assert levels == list(iter_generate_levels(5, 6, seed=42))
+    assert levels != list(iter_generate_levels(5, 6, seed=43))
+
+
+def test_estimate_difficulty():
+    level = generate_level(random.Random(1), 4, capacity=3, nb_empty_bottles=2)
+    difficulty = estimate_difficulty(level)
+    assert difficulty.status == "solved"
+    assert difficulty.nb_expanded > 0
+    assert difficulty.optimal_length <= difficulty.solution_length
+    assert list(iter_estimate_difficulties([level])) == [difficulty]
+
+
+if __name__ == "__main__":
+
+    pytest.main()
@@ -0,0 +1,130 @@
+#: coding:utf-8
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from bottle import Bottle
+from puzzle_hint import HintSolver, puzzle_position_key
+from puzzle_samples import puzzle29, puzzle_from_strings
+from puzzle_solver import PuzzleSolver, SolveStatus
+from speculative_solver import solution_moves
+
+
+def test_hint_follow():
+    assert Bottle.MAX_DOSES == 4
+    puzzle = puzzle29()
+    hint_solver = HintSolver()
+    nb_moves = 0
+    while True:
+        status, move = hint_solver.hint(puzzle)
+        assert status == SolveStatus.SOLVED
+        if move is None:
+            break
+        assert puzzle[move[0]].is_possible_to_pour_one_dose_into(puzzle[move[1]])
+        puzzle.pour(*move)
+        nb_moves += 1
+    assert puzzle.is_done
+    # Only the first hint needs a search
+    assert hint_solver.nb_searches == 1
+    assert hint_solver.nb_cache_hits == nb_moves - 1
+
+
+def test_hint_leave_solution():
+    puzzle = puzzle_from_strings(["AABC", "BCCA", "ABBC", "", ""])
+    hint_solver = HintSolver()
+    _, move = hint_solver.hint(puzzle)
+    assert move is not None
+    # Another move than the hint: a new search is needed
+    other_move = next(
+        (i_source, i_destination)
+        for i_source in range(len(puzzle))
+        for i_destination in range(len(puzzle))
+        if i_source != i_destination
+        and (i_source, i_destination) != move
+        and puzzle[i_source].is_interesting_to_pour_into(puzzle[i_destination])
+    )
+    puzzle.pour(*other_move)
+    assert puzzle_position_key(puzzle) not in hint_solver.next_moves
+    assert hint_solver.hint(puzzle)[1] is not None
+    assert hint_solver.nb_searches == 2
+
+
+def test_hint_no_solution():
+    puzzle = puzzle_from_strings(["CBBA", "ABCC", "ACBA", ""])
+    hint_solver = HintSolver()
+    assert hint_solver.hint(puzzle) == (SolveStatus.NO_SOLUTION, None)
+    assert hint_solver.hint(puzzle) == (SolveStatus.NO_SOLUTION, None)
+    assert hint_solver.nb_cache_hits == 1
+
+
+def test_hint_cache_size():
+    hint_solver = HintSolver(cache_size=3)
+    hint_solver.hint(puzzle29())
+    assert len(hint_solver.next_moves) == 3
+
+
+def test_hint_add_solution():
+    puzzle = puzzle_from_strings(["AABC", "BCCA", "ABBC", "", ""])
+    moves = solution_moves(PuzzleSolver(puzzle).solve())
+    hint_solver = HintSolver()
+    hint_solver.add_solution(puzzle, SolveStatus.SOLVED, moves)
+    while (move := hint_solver.hint(puzzle)[1]) is not None:
+        puzzle.pour(*move)
+    assert puzzle.is_done
+    assert hint_solver.nb_searches == 0
+    # Solution proved impossible by another solving
+    puzzle = puzzle_from_strings(["CBBA", "ABCC", "ACBA", ""])
+    hint_solver.add_solution(puzzle, SolveStatus.NO_SOLUTION, None)
+    assert hint_solver.hint(puzzle) == (SolveStatus.NO_SOLUTION, None)
+    assert hint_solver.nb_searches == 0
+
+
+def test_hint_add_pruned_solution():
+    # A human like solving can be pruned on a puzzle with a solution
+    puzzle = puzzle29()
+    speculative_solver = PuzzleSolver(puzzle)
+    assert speculative_solver.solve(nb_chains_without_empty_bottle=1) is None
+    assert speculative_solver.status == SolveStatus.PRUNED
+    hint_solver = HintSolver()
+    hint_solver.add_solution(puzzle, speculative_solver.status, None)
+    assert puzzle_position_key(puzzle) not in hint_solver.next_moves
+    assert hint_solver.hint(puzzle)[1] is not None
+    assert hint_solver.nb_searches == 1
+
+
+def test_hint_async():
+    async def scenario(hint_solver):
+        puzzle = puzzle29()
+        # The event loop goes on while the hints are searched
+        ticks = asyncio.create_task(asyncio.sleep(0))
+        results = await asyncio.gather(*(hint_solver.hint_async(puzzle) for _ in range(4)))
+        assert ticks.done()
+        assert all(status == SolveStatus.SOLVED for status, _ in results)
+        return puzzle, [move for _, move in results]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        hint_solver = HintSolver(executor=executor)
+        puzzle, moves = asyncio.run(scenario(hint_solver))
+    assert moves[0] is not None
+    assert puzzle[moves[0][0]].is_possible_to_pour_one_dose_into(puzzle[moves[0][1]])
+    assert hint_solver.nb_hints == 4
+    assert hint_solver.nb_searches + hint_solver.nb_cache_hits == 4
+
+
+def test_hint_timeout():
+    hint_solver = HintSolver(time_limit=1e-9)
+    puzzle = puzzle29()
+    assert hint_solver.hint(puzzle) == (SolveStatus.TIMEOUT, None)
+    assert puzzle_position_key(puzzle) not in hint_solver.next_moves
+
+
+def test_hint_bad_puzzle():
+    with pytest.raises(ValueError):
+        HintSolver().hint(puzzle_from_strings(["AAB", ""]))
+
+
+if __name__ == "__main__":
+
+    pytest.main()
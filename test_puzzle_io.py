@@ -0,0 +1,129 @@
+#: coding:utf-8
+
+import io
+
+import pytest
+
+from puzzle_io import (
+    PACK_MAGIC,
+    PACK_VERSION,
+    BinaryLevelWriter,
+    JsonLinesLevelWriter,
+    Level,
+    iter_binary_levels,
+    iter_json_lines_levels,
+    iter_levels_from_file,
+    write_levels_to_file,
+)
+from puzzle_samples import puzzle_from_strings, puzzle29
+from puzzle_solver import PuzzleSolver
+
+
+def levels():
+    puzzle = puzzle29()
+    solution = PuzzleSolver(puzzle).solve()
+    return [
+        Level.from_puzzle(puzzle),
+        Level.from_puzzle(puzzle, solution),
+        Level(capacity=4, bottles=((1, 1), (), (1, 1))),
+    ]
+
+
+def test_level_puzzle():
+    puzzle = puzzle29()
+    level = Level.from_puzzle(puzzle)
+    assert level.capacity == 4
+    assert level.moves is None
+    assert level.to_puzzle().is_same_as(puzzle)
+
+    # The capacity is kept by the bottles of the puzzle
+    level = Level(capacity=6, bottles=((1, 1, 1, 1, 1, 1), (2, 2), (2, 2, 2, 2), ()))
+    puzzle = level.to_puzzle()
+    assert puzzle.capacity == 6 and puzzle.is_consistent
+    assert Level.from_puzzle(puzzle) == level
+
+
+def test_level_solution():
+    puzzle = puzzle_from_strings(["AABB", "BBAA", ""])
+    solution = PuzzleSolver(puzzle).solve()
+    level = Level.from_puzzle(puzzle, solution)
+    assert len(level.moves) == solution.depth
+    puzzle = level.to_puzzle()
+    for i_source, i_destination in level.moves:
+        puzzle.pour(i_source, i_destination)
+    assert puzzle.is_done
+
+
+def test_json_lines_levels():
+    stream = io.StringIO()
+    writer = JsonLinesLevelWriter(stream)
+    for level in levels():
+        writer.write(level)
+    stream.seek(0)
+    assert list(iter_json_lines_levels(stream)) == levels()
+
+
+@pytest.mark.parametrize(
+    "json_level",
+    [
+        {"bottles": [[1]]},
+        {"capacity": 0, "bottles": [[1]]},
+        {"capacity": 2, "bottles": [[1, 1, 1]]},
+        {"capacity": 2, "bottles": [[1, None]]},
+        {"capacity": 2, "bottles": [[[1], [2]], [[2], [1]], []]},
+        {"capacity": 2, "bottles": [[{"color": 1}]]},
+        {"capacity": 2, "bottles": ["AB", "BA", []]},
+        {"capacity": 2, "bottles": "ABBA"},
+        {"capacity": 2, "bottles": [{"A": 1}]},
+        {"capacity": 2, "bottles": [[1]], "moves": [[0]]},
+    ],
+)
+def test_json_bad_level(json_level):
+    with pytest.raises(ValueError):
+        Level.from_json(json_level)
+
+
+def test_binary_levels():
+    stream = io.BytesIO()
+    writer = BinaryLevelWriter(stream)
+    for level in levels():
+        writer.write(level)
+    assert list(iter_binary_levels(stream.getvalue())) == levels()
+
+
+def test_binary_bad_levels():
+    with pytest.raises(ValueError):
+        BinaryLevelWriter(io.BytesIO()).write(Level(capacity=4, bottles=(("A",),)))
+
+    with pytest.raises(ValueError):
+        list(iter_binary_levels(b"XXXXX"))
+
+    stream = io.BytesIO()
+    BinaryLevelWriter(stream).write(levels()[1])
+    with pytest.raises(ValueError):
+        list(iter_binary_levels(stream.getvalue()[:-1]))
+
+
+@pytest.mark.parametrize(
+    "level_bytes",
+    [
+        bytes([0, 2, 0, 0, 0]),  # Capacity 0
+        bytes([0, 2, 2, 3, 1, 1, 1, 1, 1]),  # 3 doses in a bottle of 2 doses
+    ],
+)
+def test_binary_malformed_levels(level_bytes):
+    pack = PACK_MAGIC + bytes([PACK_VERSION]) + level_bytes
+    with pytest.raises(ValueError):
+        list(iter_binary_levels(pack))
+
+
+@pytest.mark.parametrize("file_name", ["levels.wsp", "levels.jsonl"])
+def test_levels_file(tmp_path, file_name):
+    path = str(tmp_path / file_name)
+    assert write_levels_to_file(path, iter(levels())) == len(levels())
+    assert list(iter_levels_from_file(path)) == levels()
+
+
+if __name__ == "__main__":
+
+    pytest.main()
@@ -0,0 +1,292 @@
+#: coding:utf-8
+
+import collections
+import random
+
+import pytest
+
+from puzzle_generator import generate_level
+from puzzle_io import Level
+from puzzle_samples import puzzle_from_strings, puzzle29
+from puzzle_solver import (
+    MOVE_ORDERINGS,
+    EmptyBottleCostModel,
+    HistoryMoveOrdering,
+    PuzzleChain,
+    PuzzleSolver,
+    SolveStatus,
+)
+
+
+def check_solution(puzzle, solution):
+    """Replay the moves of the solution from the puzzle and check it is done."""
+    assert solution is not None
+    puzzle = puzzle.clone()
+    steps = solution.get_puzzle_chain_as_list()
+    assert steps[0].move is None
+    for step in steps[1:]:
+        i_source, i_destination = step.move
+        assert puzzle[i_source].is_possible_to_pour_one_dose_into(puzzle[i_destination])
+        puzzle.pour(i_source, i_destination)
+        assert puzzle.is_same_as(step.puzzle)
+    assert puzzle.is_done
+    assert solution.depth == len(steps) - 1
+
+
+def test_solver_bad_puzzle():
+    with pytest.raises(ValueError):
+        PuzzleSolver(puzzle_from_strings(["AAB", ""]))
+
+
+@pytest.mark.parametrize("ordering_name", list(MOVE_ORDERINGS))
+def test_solver_move_orderings(ordering_name):
+    puzzle = puzzle_from_strings(["AABC", "BCCA", "ABBC", ""])
+    solver = PuzzleSolver(puzzle)
+    solution = solver.solve(move_ordering=MOVE_ORDERINGS[ordering_name]())
+    check_solution(puzzle, solution)
+    assert solver.nb_expanded_puzzles > 0
+
+
+@pytest.mark.parametrize("ordering_name", list(MOVE_ORDERINGS))
+def test_solver_move_orderings_puzzle29(ordering_name):
+    puzzle = puzzle29()
+    solver = PuzzleSolver(puzzle)
+    solution = solver.solve(
+        nb_chains_without_empty_bottle=4,
+        move_ordering=MOVE_ORDERINGS[ordering_name](),
+    )
+    check_solution(puzzle, solution)
+
+
+def test_history_move_ordering():
+    move_ordering = HistoryMoveOrdering()
+    puzzle_chain = PuzzleChain(None, puzzle_from_strings(["CA", "BB", "CCB", "A", ""], 3), "")
+    # "#3 into #2" completes a bottle, "#4 into #1" frees a bottle, "#2 into #5" only moves
+    completing, freeing, moving = (
+        puzzle_chain.new_puzzle_chain(move) for move in ((2, 1), (3, 0), (1, 4))
+    )
+    scores = [move_ordering.score(puzzle_chain, chain) for chain in (completing, moving)]
+    # Scoring learns nothing
+    assert not move_ordering.history and not move_ordering.killer_moves
+    assert scores == [move_ordering.score(puzzle_chain, chain) for chain in (completing, moving)]
+
+    # Learning from the expanded puzzles whose move made progress
+    for _ in range(100):
+        move_ordering.on_expanded(moving)
+        move_ordering.on_expanded(freeing)
+    move_ordering.on_expanded(puzzle_chain)
+    assert move_ordering.history == {(3, 0): 100}
+    assert move_ordering.killer_moves == {1: (3, 0)}
+    # The learned bonus never overrides a progress score
+    assert 0.0 < move_ordering.score(puzzle_chain, freeing) - 2.0 < 0.5
+    assert move_ordering.score(puzzle_chain, completing) > move_ordering.score(
+        puzzle_chain, freeing
+    )
+
+
+@pytest.mark.parametrize("width", [5, 50])
+def test_solver_beam(width):
+    puzzle = puzzle29()
+    solver = PuzzleSolver(puzzle)
+    solution = solver.solve_beam(width=width)
+    check_solution(puzzle, solution)
+    assert solver.status == SolveStatus.SOLVED
+
+
+def test_solver_beam_width_limited():
+    solver = PuzzleSolver(puzzle29())
+    assert solver.solve_beam(width=1, max_width=1) is None
+    assert solver.status == SolveStatus.WIDTH_LIMITED
+
+
+def test_solver_beam_widening():
+    puzzle = puzzle29()
+    solver = PuzzleSolver(puzzle)
+    solution = solver.solve_beam(width=1, max_width=64, widening_factor=2)
+    check_solution(puzzle, solution)
+
+
+@pytest.mark.parametrize("width, widening_factor", [(0, 4), (1, 1), (10, 0)])
+def test_solver_beam_bad_widening(width, widening_factor):
+    solver = PuzzleSolver(puzzle29())
+    with pytest.raises(ValueError):
+        solver.solve_beam(width=width, max_width=64, widening_factor=widening_factor)
+
+
+def shortest_solution_length(puzzle):
+    """@return the number of moves of a shortest solution by a breadth first search."""
+    depths = {puzzle.state_key(): 0}
+    todo = collections.deque([puzzle])
+    while todo:
+        puzzle = todo.popleft()
+        if puzzle.is_done:
+            return depths[puzzle.state_key()]
+        for i_source in range(len(puzzle)):
+            for i_destination in range(len(puzzle)):
+                if i_source == i_destination:
+                    continue
+                if not puzzle[i_source].is_possible_to_pour_one_dose_into(puzzle[i_destination]):
+                    continue
+                new_puzzle = puzzle.clone()
+                new_puzzle.pour(i_source, i_destination)
+                key = new_puzzle.state_key()
+                if key not in depths:
+                    depths[key] = depths[puzzle.state_key()] + 1
+                    todo.append(new_puzzle)
+    return None
+
+
+def merged_colors_level(seed):
+    """@return a random level where colors fill several bottles (colors merged by pairs)."""
+    level = generate_level(random.Random(seed), 4, capacity=3, nb_empty_bottles=1)
+    return Level(
+        capacity=level.capacity,
+        bottles=tuple(tuple(color // 2 for color in doses) for doses in level.bottles),
+    )
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_solver_weighted_shortest_multi_bottle_colors(seed):
+    level = merged_colors_level(seed)
+    puzzle = level.to_puzzle()
+    length = shortest_solution_length(puzzle)
+    solver = PuzzleSolver(puzzle)
+    solution = solver.solve_weighted()
+    if length is None:
+        assert solution is None
+    else:
+        check_solution(puzzle, solution)
+        assert solution.depth == length
+        assert puzzle.lower_bound_nb_moves() <= length
+
+
+@pytest.mark.parametrize(
+    "content",
+    [["AAA", "AAA", "A", "A", "BBBB", ""], ["AAA", "AAA", "AB", "AB", "BB", ""]],
+)
+def test_solver_weighted_shortest_color_in_several_bottles(content):
+    puzzle = puzzle_from_strings(content)
+    solution = PuzzleSolver(puzzle).solve_weighted()
+    check_solution(puzzle, solution)
+    assert solution.depth == shortest_solution_length(puzzle)
+    assert puzzle.lower_bound_nb_moves() == solution.depth
+
+
+def test_solver_weighted_shortest():
+    puzzle = puzzle_from_strings(["AABC", "BCCA", "ABBC", ""])
+    solver = PuzzleSolver(puzzle)
+    solution = solver.solve_weighted()
+    check_solution(puzzle, solution)
+    assert solver.solution_cost == solution.depth
+
+    # No solution is shorter than the A* one
+    solution_dfs = PuzzleSolver(puzzle).solve()
+    assert solution_dfs.depth >= solution.depth
+
+
+@pytest.mark.parametrize(
+    "puzzle, weight",
+    [
+        (puzzle_from_strings(["AABC", "BCCA", "ABBC", ""]), 1.0),
+        (puzzle29(), 2.0),
+    ],
+)
+def test_solver_weighted_empty_bottle_cost_model(puzzle, weight):
+    solver = PuzzleSolver(puzzle)
+    solution = solver.solve_weighted(EmptyBottleCostModel(4, penalty=1.0), weight)
+    check_solution(puzzle, solution)
+    assert solver.solution_cost >= solution.depth
+
+
+def test_solver_weighted_empty_bottle_cost_model_no_solution():
+    puzzle = Level(capacity=4, bottles=((2, 1), (0, 2, 0, 2), (0, 2), (0, 1, 1, 1))).to_puzzle()
+    assert PuzzleSolver(puzzle).solve() is None
+    solver = PuzzleSolver(puzzle, time_limit=10.0)
+    assert solver.solve_weighted(EmptyBottleCostModel(4)) is None
+    assert solver.status == SolveStatus.NO_SOLUTION
+
+
+@pytest.mark.parametrize("nb_chains_without_empty_bottle", [0, 4])
+def test_solver_macro_moves(nb_chains_without_empty_bottle):
+    puzzle = puzzle29()
+    solver = PuzzleSolver(puzzle)
+    solution = solver.solve(
+        nb_chains_without_empty_bottle=nb_chains_without_empty_bottle, macro_moves=True
+    )
+    check_solution(puzzle, solution)
+    assert solver.nb_macro_moves > 0
+    # Macro moves are expanded back in one step per move
+    macro_moves = []
+    puzzle_chain = solution
+    while puzzle_chain is not None:
+        macro_moves += puzzle_chain.macro_moves
+        puzzle_chain = puzzle_chain.previous_puzzle_chain
+    assert macro_moves
+    steps = solution.get_puzzle_chain_as_list()
+    assert all(not step.macro_moves for step in steps)
+    assert steps[-1].puzzle.is_same_as(solution.puzzle)
+
+
+@pytest.mark.parametrize(
+    "strings, move",
+    [
+        (["ABBB", "AAA", "B"], (0, 2)),  # Completes a bottle
+        (["BAA", "AA", "BBB", ""], (0, 1)),  # Completes a bottle
+        (["AAB", "ABBB", "A"], (1, 0)),  # Only interesting move
+        (["AABB", "BBAA", "A"], (1, 2)),  # Only interesting move
+        (["ABAB", "BABA", ""], None),
+        (["AABB", "BBAA", ""], None),
+    ],
+)
+def test_solver_find_forced_move(strings, move):
+    assert PuzzleSolver.find_forced_move(puzzle_from_strings(strings)) == move
+
+
+def test_solver_already_solved():
+    puzzle = puzzle_from_strings(["AAAA", "BBBB", ""])
+    solver = PuzzleSolver(puzzle)
+    solution = solver.solve()
+    check_solution(puzzle, solution)
+    assert solution.depth == 0
+    assert solver.status == SolveStatus.SOLVED
+
+
+def test_solver_no_solution():
+    # Consistent puzzle but without any solution
+    puzzle = puzzle_from_strings(["CBBA", "ABCC", "ACBA", ""])
+    solver = PuzzleSolver(puzzle)
+    assert solver.solve() is None
+    assert solver.status == SolveStatus.NO_SOLUTION
+    assert solver.solve_beam(width=1) is None
+    assert solver.status == SolveStatus.NO_SOLUTION
+    assert solver.solve_weighted() is None
+    assert solver.status == SolveStatus.NO_SOLUTION
+
+
+def test_solver_pruned():
+    # Solvable puzzle but without solution once the puzzles are dropped
+    level = generate_level(random.Random(0), 6)
+    solver = PuzzleSolver(level.to_puzzle())
+    assert solver.solve(nb_chains_without_empty_bottle=1) is None
+    assert solver.status == SolveStatus.PRUNED
+    assert solver.nb_dropped_puzzles > 0
+    assert solver.solve() is not None
+
+
+@pytest.mark.parametrize("keep_search_memory", [False, True])
+@pytest.mark.parametrize("solve_method", ["solve", "solve_weighted", "solve_beam"])
+def test_solver_release_search_memory(solve_method, keep_search_memory):
+    puzzle = puzzle_from_strings(["AABC", "BCCA", "ABBC", ""])
+    solver = PuzzleSolver(puzzle, keep_search_memory=keep_search_memory)
+    solution = getattr(solver, solve_method)()
+    check_solution(puzzle, solution)
+    assert solver.nb_expanded_puzzles > 0
+    assert bool(solver.puzzle_chains_done) == keep_search_memory
+    if solve_method != "solve_weighted":  # Its explored puzzles are local to the search
+        assert bool(solver.puzzle_keys_done) == keep_search_memory
+        assert solver.is_puzzle_already_done(puzzle) == keep_search_memory
+
+
+if __name__ == "__main__":
+
+    pytest.main()
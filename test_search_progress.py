@@ -0,0 +1,119 @@
+#: coding:utf-8
+
+import json
+import random
+
+import pytest
+
+from bottle import Bottle
+from puzzle_generator import generate_level
+from puzzle_samples import puzzle29
+from puzzle_solver import MoveOrdering, PuzzleSolver, SolveStatus
+from search_progress import ProgressEstimate, SearchProgress
+
+
+def explore_binary_tree(search_progress, todo, max_depth, nb_expanded_max):
+    """Depth first search of a complete binary tree (stopped after nb_expanded_max)."""
+    while todo and search_progress.nb_expanded_total < nb_expanded_max:
+        depth = todo.pop()
+        search_progress.on_examined(depth)
+        children = [depth + 1, depth + 1] if depth < max_depth else []
+        search_progress.on_expanded(depth, children)
+        todo.extend(children)
+
+
+def test_search_progress_binary_tree():
+    search_progress = SearchProgress()
+    estimate = search_progress.estimate()
+    assert estimate.nb_expanded == 0 and estimate.is_running
+
+    # Left subtree of the root explored (root, left child and its 6 descendants)
+    todo = [0]
+    explore_binary_tree(search_progress, todo, 3, 8)
+    estimate = search_progress.estimate()
+    assert estimate.nb_expanded == 8
+    assert estimate.nb_puzzles == pytest.approx(15)
+    assert estimate.nb_puzzles_low <= estimate.nb_puzzles <= estimate.nb_puzzles_high
+    assert estimate.fraction_done == pytest.approx(8 / 15)
+    assert estimate.time_remaining == pytest.approx(7 * estimate.time_per_puzzle)
+
+    explore_binary_tree(search_progress, todo, 3, 15)
+    assert not todo
+    estimate = search_progress.estimate()
+    assert estimate.nb_puzzles == estimate.nb_puzzles_low == estimate.nb_puzzles_high == 15
+    search_progress.stop()
+    estimate = search_progress.estimate()
+    assert not estimate.is_running
+    assert estimate.fraction_done == 1.0
+    assert estimate.time_remaining_range == (0.0, 0.0)
+
+
+def test_progress_estimate():
+    estimate = ProgressEstimate(
+        elapsed=2.0,
+        nb_expanded=100,
+        nb_puzzles=400.0,
+        nb_puzzles_low=200.0,
+        nb_puzzles_high=1000.0,
+        is_running=True,
+    )
+    assert estimate.fraction_done == pytest.approx(0.25)
+    assert estimate.time_remaining == pytest.approx(6.0)
+    assert estimate.time_remaining_range == pytest.approx((2.0, 18.0))
+    assert json.loads(json.dumps(estimate.to_dict()))["time_remaining"] == pytest.approx(6.0)
+    assert "25.0% done" in str(estimate)
+
+
+class EstimatingMoveOrdering(MoveOrdering):
+    """Move ordering keeping the progress estimates of the solver during its search."""
+
+    def __init__(self, solver):
+        super().__init__()
+        self.solver = solver
+        self.estimates = []
+
+    def score(self, puzzle_chain, new_puzzle_chain):
+        self.estimates.append(self.solver.progress_estimate())
+        return 0.0
+
+
+def test_solver_progress_estimate():
+    assert Bottle.MAX_DOSES == 4
+    solver = PuzzleSolver(puzzle29())
+    assert solver.progress_estimate() is None
+    move_ordering = EstimatingMoveOrdering(solver)
+    solver.solve(move_ordering=move_ordering)
+    assert move_ordering.estimates
+    for estimate in move_ordering.estimates:
+        assert estimate.is_running
+        assert estimate.nb_expanded <= estimate.nb_puzzles_low
+        assert estimate.nb_puzzles_low <= estimate.nb_puzzles <= estimate.nb_puzzles_high
+    estimate = solver.progress_estimate()
+    assert not estimate.is_running
+    assert estimate.fraction_done == 1.0
+
+    solver.solve_weighted()
+    assert solver.progress_estimate().nb_expanded == solver.nb_expanded_puzzles
+    solver.solve_beam()
+    assert solver.progress_estimate() is None
+
+
+def test_solver_progress_estimate_exhaustive():
+    # Search without solution (every reachable puzzle is expanded)
+    level = generate_level(random.Random(1), 7, capacity=4, nb_empty_bottles=1)
+    solver = PuzzleSolver(level.to_puzzle())
+    move_ordering = EstimatingMoveOrdering(solver)
+    assert solver.solve(move_ordering=move_ordering) is None
+    assert solver.status == SolveStatus.NO_SOLUTION
+    assert move_ordering.estimates[-1].nb_puzzles >= move_ordering.estimates[-1].nb_expanded
+    assert solver.search_progress.nb_expanded_total == solver.nb_expanded_puzzles
+
+
+def test_solve_verbose_progress(capsys):
+    PuzzleSolver(puzzle29()).solve(verbose_cycle=1e-9)
+    assert "end of search in" in capsys.readouterr().out
+
+
+if __name__ == "__main__":
+
+    pytest.main()
@@ -0,0 +1,87 @@
+#: coding:utf-8
+
+import pytest
+
+from bottle import Bottle
+from puzzle_io import Level
+from puzzle_samples import puzzle29, puzzle_from_strings
+from puzzle_solver import PuzzleSolver
+from solution_navigator import DoseChange, SolutionNavigator, move_dose_changes
+from speculative_solver import solution_moves
+
+
+def apply_changes(doses, changes):
+    for change in changes:
+        doses[change.i_bottle][change.i_dose] = change.color
+
+
+def test_move_dose_changes():
+    assert Bottle.MAX_DOSES == 4
+    puzzle = puzzle_from_strings(["ABB", "AB", ""])
+    forward, backward = move_dose_changes(puzzle, (0, 1))
+    assert forward == [
+        DoseChange(0, 1, None),
+        DoseChange(0, 2, None),
+        DoseChange(1, 2, "B"),
+        DoseChange(1, 3, "B"),
+    ]
+    assert backward == [
+        DoseChange(0, 1, "B"),
+        DoseChange(0, 2, "B"),
+        DoseChange(1, 2, None),
+        DoseChange(1, 3, None),
+    ]
+    assert puzzle[1].doses == ["A", "B", "B", "B"]
+
+
+@pytest.mark.parametrize("batch_size", [1, 4, 100])
+def test_solution_navigator(batch_size):
+    puzzle = puzzle29()
+    moves = solution_moves(PuzzleSolver(puzzle).solve(nb_chains_without_empty_bottle=4))
+    navigator = SolutionNavigator(puzzle, moves, batch_size)
+    assert navigator.nb_steps == len(moves) + 1
+    assert navigator.message() == "Puzzle:"
+
+    # Doses of the user interface only updated with the changes
+    doses = [list(bottle.doses) for bottle in puzzle.iter_bottles()]
+    expected = puzzle.clone()
+    for i_step, move in enumerate(moves, 1):
+        changes = navigator.go_to(i_step)
+        assert len(changes) <= 2 * Bottle.MAX_DOSES
+        apply_changes(doses, changes)
+        expected.pour(*move)
+        assert doses == [list(bottle.doses) for bottle in expected.iter_bottles()]
+    assert expected.is_done
+    i_source, i_destination = moves[-1]
+    assert navigator.message() == f"Pour #{i_source + 1} into #{i_destination + 1}"
+
+    # Back to the start
+    apply_changes(doses, navigator.go_to(0))
+    assert doses == [list(bottle.doses) for bottle in puzzle.iter_bottles()]
+    # Bounded steps
+    navigator.go_to(10000)
+    assert navigator.i_step == navigator.nb_steps - 1
+    assert navigator.retained_size() > 0
+
+
+
+def test_solution_navigator_capacity():
+    # Steps of a puzzle of another capacity than Bottle.MAX_DOSES
+    puzzle = Level(capacity=6, bottles=((1, 1, 1, 2, 2, 2), (2, 2, 2, 1, 1, 1), ())).to_puzzle()
+    moves = solution_moves(PuzzleSolver(puzzle).solve())
+    navigator = SolutionNavigator(puzzle, moves, batch_size=1)
+    doses = [list(bottle.doses) for bottle in puzzle.iter_bottles()]
+    Bottle.MAX_DOSES = 2  # Another session of the process
+    try:
+        apply_changes(doses, navigator.go_to(len(moves)))
+    finally:
+        Bottle.MAX_DOSES = 4
+    for move in moves:
+        puzzle.pour(*move)
+    assert puzzle.is_done
+    assert doses == [list(bottle.doses) for bottle in puzzle.iter_bottles()]
+
+
+if __name__ == "__main__":
+
+    pytest.main()
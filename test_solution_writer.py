@@ -0,0 +1,80 @@
+#: coding:utf-8
+
+import io
+import json
+
+import pytest
+
+from puzzle_samples import puzzle_from_strings
+from puzzle_solver import PuzzleSolver
+from solution_writer import (
+    BinarySolutionWriter,
+    JsonLinesSolutionWriter,
+    SolutionWriter,
+    TextSolutionWriter,
+    iter_binary_moves,
+)
+
+
+@pytest.fixture
+def solution():
+    puzzle = puzzle_from_strings(["AABC", "BCCA", "ABBC", ""])
+    return PuzzleSolver(puzzle).solve()
+
+
+def test_text_solution_writer(solution):
+    stream = io.StringIO()
+    nb_steps = TextSolutionWriter(stream).write(solution)
+    assert nb_steps == solution.depth + 1
+    assert stream.getvalue() == solution.show_puzzle_chains()
+
+
+@pytest.mark.parametrize("include_puzzle", [True, False])
+def test_json_lines_solution_writer(solution, include_puzzle):
+    stream = io.StringIO()
+    JsonLinesSolutionWriter(stream, include_puzzle=include_puzzle).write(solution)
+    lines = stream.getvalue().splitlines()
+    steps = solution.get_puzzle_chain_as_list()
+    assert len(lines) == len(steps)
+    for i, (line, puzzle_chain) in enumerate(zip(lines, steps)):
+        json_step = json.loads(line)
+        assert json_step["step"] == i + 1
+        assert json_step["message"] == puzzle_chain.message
+        if puzzle_chain.move is None:
+            assert json_step["move"] is None
+        else:
+            assert tuple(json_step["move"]) == puzzle_chain.move
+        if include_puzzle:
+            assert json_step["bottles"] == [
+                list(bottle.iter_doses()) for bottle in puzzle_chain.puzzle.iter_bottles()
+            ]
+        else:
+            assert "bottles" not in json_step
+
+
+def test_binary_solution_writer(solution):
+    stream = io.BytesIO()
+    BinarySolutionWriter(stream).write(solution)
+    assert len(stream.getvalue()) == 9 + 2 * solution.depth
+    stream.seek(0)
+    moves = list(iter_binary_moves(stream))
+    assert moves == [step.move for step in solution.get_puzzle_chain_as_list()[1:]]
+
+
+def test_binary_solution_truncated(solution):
+    stream = io.BytesIO()
+    BinarySolutionWriter(stream).write(solution)
+    with pytest.raises(ValueError):
+        list(iter_binary_moves(io.BytesIO(stream.getvalue()[:-1])))
+    with pytest.raises(ValueError):
+        list(iter_binary_moves(io.BytesIO(b"XXXX")))
+
+
+def test_solution_writer_is_abstract():
+    with pytest.raises(TypeError):
+        SolutionWriter(io.StringIO())  # pylint: disable=abstract-class-instantiated
+
+
+if __name__ == "__main__":
+
+    pytest.main()
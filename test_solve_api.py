@@ -0,0 +1,272 @@
+#: coding:utf-8
+
+from concurrent.futures import ThreadPoolExecutor
+import http.client
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from bottle import Bottle
+from puzzle_generator import generate_level
+from puzzle_io import Level
+from puzzle_samples import puzzle29
+import solve_api
+from solve_api import (
+    JOB_DONE,
+    JOB_RUNNING,
+    PROGRESS_PERIOD,
+    AdmissionError,
+    ServiceUnavailableError,
+    SolveService,
+    create_server,
+)
+
+
+@pytest.fixture
+def level29():
+    return Level.from_puzzle(puzzle29()).to_json()
+
+
+@pytest.fixture
+def service():
+    service = SolveService(
+        max_queue=2, max_jobs_per_client=1, executor=ThreadPoolExecutor(max_workers=1)
+    )
+    yield service
+    service.shutdown()
+
+
+def test_solve_service(service, level29):
+    job = service.submit(level29, "client")
+    job = service.get(job.job_id, wait=10)
+    assert job.status == JOB_DONE
+    assert job.result["status"] == "solved"
+    assert job.result["length"] == len(job.result["moves"])
+
+    # Same puzzle and options: the result is in the cache
+    job_cached = service.submit(level29, "client")
+    assert job_cached.status == JOB_DONE
+    assert job_cached.result == job.result
+    stats = service.stats()
+    assert stats["cache_hits"] == 1
+    assert stats["active_jobs"] == 0
+
+    assert service.get("unknown") is None
+
+
+def test_solve_service_admission(service, level29):
+    gate = threading.Event()
+    service.executor.submit(gate.wait)  # The only worker is busy
+    try:
+        service.submit(level29, "client1")
+        with pytest.raises(AdmissionError):  # Per client limit
+            service.submit({**level29, "options": {"strategy": "beam"}}, "client1")
+        service.submit({**level29, "options": {"strategy": "beam"}}, "client2")
+        with pytest.raises(AdmissionError):  # Queue limit
+            service.submit({**level29, "options": {"strategy": "weighted"}}, "client3")
+        assert service.stats()["rejected"] == 2
+    finally:
+        gate.set()
+
+
+def test_solve_service_auto_strategy(service, level29):
+    gate = threading.Event()
+    service.executor.submit(gate.wait)  # The only worker is busy
+    try:
+        # Trivial puzzle: solved in the request thread
+        job = service.submit({**level29, "options": {"strategy": "auto"}}, "client")
+        assert job.status == JOB_DONE
+        assert job.result["status"] == "solved"
+        assert job.result["prediction"]["engine"] == "inline"
+    finally:
+        gate.set()
+    stats = service.stats()
+    assert stats["inline_jobs"] == 1
+    assert stats["active_jobs"] == 0
+    assert stats["dispatch"]["inline"]["count"] == 1
+
+
+def test_solve_service_progress():
+    # Job of a worker process that ends with its time limit
+    service = SolveService(nb_workers=1)
+    level = generate_level(random.Random(1), 20, capacity=8, nb_empty_bottles=2)
+    time_limit = 4 * PROGRESS_PERIOD
+    try:
+        job = service.submit({**level.to_json(), "options": {"time_limit": time_limit}}, "client")
+        progress = None
+        deadline = time.perf_counter() + 10 * time_limit
+        while progress is None and job.status != JOB_DONE and time.perf_counter() < deadline:
+            json_job = service.get(job.job_id).to_json()
+            progress = json_job.get("progress")
+            time.sleep(0.05)
+        assert progress is not None
+        assert json_job["status"] == JOB_RUNNING
+        assert 0.0 <= progress["fraction_done"] <= 1.0
+        assert progress["nb_expanded"] > 0
+        job = service.get(job.job_id, wait=10 * time_limit)
+        assert job.result["status"] == "timeout"
+        assert "progress" not in job.to_json()
+    finally:
+        service.shutdown()
+
+
+def test_solve_service_dead_worker(level29):
+    service = SolveService(nb_workers=1)
+    try:
+        assert service.get(service.submit(level29, "client").job_id, wait=10).status == JOB_DONE
+        # Worker process killed (for example for its memory)
+        broken_executor = service.executor
+        for process in list(broken_executor._processes.values()):
+            process.kill()
+        deadline = time.perf_counter() + 10
+        while not broken_executor._broken and time.perf_counter() < deadline:
+            time.sleep(0.01)
+        beam_level29 = {**level29, "options": {"strategy": "beam"}}
+        with pytest.raises(ServiceUnavailableError):
+            service.submit(beam_level29, "client")
+        stats = service.stats()
+        assert stats["active_jobs"] == 0 and stats["clients"] == 0
+        # The workers are restarted
+        assert service.executor is not broken_executor
+        job = service.get(service.submit(beam_level29, "client").job_id, wait=10)
+        assert job.result["status"] == "solved"
+    finally:
+        service.shutdown()
+
+
+def test_solve_service_inline_fallback(service, level29, monkeypatch):
+    auto_level29 = {**level29, "options": {"strategy": "auto"}}
+    # Another puzzle is solved in a request thread: the job goes to a worker
+    with service._inline_lock:
+        job = service.submit(auto_level29, "client")
+    assert service.get(job.job_id, wait=10).result["status"] == "solved"
+    # Wrong prediction: the time limit of the request thread is reached
+    monkeypatch.setattr(solve_api, "INLINE_TIME_LIMIT", 1e-9)
+    job = service.submit({**auto_level29, "bottles": level29["bottles"][::-1]}, "client")
+    assert job.future is not None
+    assert service.get(job.job_id, wait=10).result["status"] == "solved"
+    stats = service.stats()
+    assert stats["inline_jobs"] == 0
+    assert stats["inline_fallbacks"] == 2
+
+
+def test_solve_service_inline_capacity(service):
+    # The capacity of an inline job is the one of its puzzle (not the one of the process)
+    level = {"capacity": 6, "bottles": [[1, 1, 1, 2, 2, 2], [2, 2, 2, 1, 1, 1], []]}
+    job = service.submit({**level, "options": {"strategy": "auto"}}, "client")
+    assert job.status == JOB_DONE
+    assert job.result["status"] == "solved"
+    assert Bottle.MAX_DOSES == 4
+    assert service.submit({**level, "options": {"strategy": "auto"}}, "client").result == (
+        job.result
+    )
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"strategy": "unknown"},
+        {"move_ordering": "unknown"},
+        {"memory_limit": 10},
+        {"time_limit": "never"},
+        {"time_limit": -1},
+        {"time_limit": -0.5},
+        {"beam_width": "x"},
+        {"beam_width": 1.5},
+        {"beam_width": 0},
+        {"weight": None},
+        {"weight": -2.0},
+        {"weight": 0.5},
+        {"nb_chains_without_empty_bottle": -1},
+        {"decompose": 1},
+        {"nb_chains_without_empty_bottle": True},
+        "dfs",
+    ],
+)
+def test_solve_service_bad_options(service, level29, options):
+    with pytest.raises(ValueError):
+        service.submit({**level29, "options": options}, "client")
+
+
+@pytest.mark.parametrize("strategy", ["dfs", "auto"])
+def test_solve_service_bad_colors(service, strategy):
+    level = {"capacity": 2, "bottles": [[[1], [2]], [[2], [1]], []]}
+    with pytest.raises(ValueError):
+        service.submit({**level, "options": {"strategy": strategy}}, "client")
+
+
+@pytest.mark.parametrize(
+    "level",
+    [
+        {"capacity": 1000000000, "bottles": [[], []]},
+        {"capacity": 2, "bottles": [[]] * 256},
+    ],
+)
+def test_solve_service_too_large(service, level):
+    with pytest.raises(ValueError):
+        service.submit(level, "client")
+    assert service.stats()["active_jobs"] == 0
+
+
+def test_solve_service_time_limit(service):
+    assert service.parse_options({"time_limit": 0}).time_limit == service.max_time_limit
+    assert service.parse_options({"time_limit": 1e9}).time_limit == service.max_time_limit
+    assert service.parse_options(None).time_limit == service.time_limit
+
+
+def test_solve_api_http(service, level29):
+    server = create_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        request = urllib.request.Request(
+            f"{url}/jobs", data=json.dumps(level29).encode(), method="POST"
+        )
+        with urllib.request.urlopen(request) as response:
+            assert response.status in (200, 202)
+            job_id = json.loads(response.read())["job_id"]
+        with urllib.request.urlopen(f"{url}/jobs/{job_id}?wait=10") as response:
+            assert json.loads(response.read())["result"]["status"] == "solved"
+        with urllib.request.urlopen(f"{url}/stats") as response:
+            assert json.loads(response.read())["submitted"] == 1
+
+        request = urllib.request.Request(f"{url}/jobs", data=b"not json", method="POST")
+        with pytest.raises(urllib.error.HTTPError) as err:
+            urllib.request.urlopen(request)
+        assert err.value.code == 400
+        for bad_request in (
+            {**level29, "options": {"beam_width": "x"}},
+            {**level29, "options": {"beam_width": 0}},
+            {**level29, "options": {"weight": -1}},
+            {"capacity": 1000000000, "bottles": [[], []]},
+        ):
+            request = urllib.request.Request(
+                f"{url}/jobs", data=json.dumps(bad_request).encode(), method="POST"
+            )
+            with pytest.raises(urllib.error.HTTPError) as err:
+                urllib.request.urlopen(request)
+            assert err.value.code == 400
+        for content_length in ("x", "-1"):
+            connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+            connection.putrequest("POST", "/jobs")
+            connection.putheader("Content-Length", content_length)
+            connection.endheaders()
+            assert connection.getresponse().status == 400
+            connection.close()
+        with pytest.raises(urllib.error.HTTPError) as err:
+            urllib.request.urlopen(f"{url}/jobs/unknown")
+        assert err.value.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+
+    pytest.main()
@@ -0,0 +1,84 @@
+#: coding:utf-8
+
+import io
+
+import pytest
+
+from puzzle import Puzzle
+from puzzle_samples import puzzle29
+from puzzle_solver import PuzzleChain, PuzzleSolver, solve_generic
+from solver_profiling import ROOT_PHASE, SolverProfiler
+
+
+def test_solver_profiler():
+    clone = Puzzle.__dict__["clone"]
+    is_done = Puzzle.__dict__["is_done"]
+    solver = PuzzleSolver(puzzle29())
+    profiler = SolverProfiler(use_cprofile=True)
+    with profiler:
+        solution = solver.solve(nb_chains_without_empty_bottle=4)
+    assert solution is not None
+
+    # Hot paths are restored
+    assert Puzzle.__dict__["clone"] is clone
+    assert Puzzle.__dict__["is_done"] is is_done
+
+    statistics = profiler.statistics()
+    assert statistics["PuzzleSolver.solve"].nb_calls == 1
+    assert statistics["PuzzleChain.__post_init__"].nb_calls > 0
+    assert statistics["Puzzle.clone"].nb_calls == statistics["Puzzle.pour"].nb_calls
+    assert (
+        statistics["PuzzleSolver._explore_a_puzzle_chain"].nb_calls
+        == solver.nb_loops - solver.nb_dropped_puzzles
+    )
+    root = statistics[ROOT_PHASE]
+    assert root.total_time >= statistics["PuzzleSolver.solve"].total_time
+    assert "Puzzle.clone" in profiler.report()
+
+    stream = io.StringIO()
+    profiler.write_folded_stacks(stream)
+    lines = stream.getvalue().splitlines()
+    assert any(
+        line.startswith(f"{ROOT_PHASE};PuzzleSolver.solve;") for line in lines
+    )
+    assert all(int(line.rsplit(" ", 1)[1]) > 0 for line in lines)
+
+    assert profiler.pstats().total_calls > 0
+
+
+def test_solver_profiler_hot_paths():
+    with pytest.raises(ValueError):
+        SolverProfiler(hot_paths=["Puzzle.unknown"])
+    profiler = SolverProfiler(hot_paths=["PuzzleChain.new_puzzle_chain"])
+    with profiler:
+        PuzzleSolver(puzzle29()).solve(nb_chains_without_empty_bottle=4)
+    assert set(profiler.statistics()) == {ROOT_PHASE, "PuzzleChain.new_puzzle_chain"}
+    assert not hasattr(PuzzleChain.new_puzzle_chain, "__wrapped__")
+    with pytest.raises(ValueError):
+        profiler.pstats()
+
+
+def test_solver_profiler_single_active():
+    profiler = SolverProfiler()
+    with profiler:
+        # Another profiler (or the same one) would wrap the wrappers of the hot paths
+        with pytest.raises(RuntimeError):
+            with SolverProfiler():
+                pass
+        with pytest.raises(RuntimeError):
+            with profiler:
+                pass
+        assert hasattr(Puzzle.clone, "__wrapped__")
+    assert not hasattr(Puzzle.clone, "__wrapped__")
+    with SolverProfiler():
+        assert hasattr(Puzzle.clone, "__wrapped__")
+
+
+def test_solve_generic_profile(capsys):
+    solve_generic(puzzle29(), nb_chains_without_empty_bottle=4, profile=True)
+    assert "Bottle.is_interesting_to_pour_into" in capsys.readouterr().out
+
+
+if __name__ == "__main__":
+
+    pytest.main()
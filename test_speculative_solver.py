@@ -0,0 +1,127 @@
+#: coding:utf-8
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from bottle import Bottle
+from puzzle_io import Level
+from puzzle_samples import puzzle29, puzzle_from_strings
+from puzzle_solver import PuzzleSolver, SolveStatus
+from speculative_solver import SpeculativeSolver
+
+
+def test_speculative_solver():
+    async def scenario():
+        speculative_solver = SpeculativeSolver(delay=0.01)
+        assert speculative_solver.progress_estimate() is None
+        puzzle = puzzle29()
+        speculative_solver.update(puzzle)
+        speculative_solver.update(puzzle)  # Same puzzle: not restarted
+        status, moves = await speculative_solver.result(puzzle)
+        assert not speculative_solver.progress_estimate().is_running
+        assert status == SolveStatus.SOLVED
+        for move in moves:
+            puzzle.pour(*move)
+        assert puzzle.is_done
+        assert speculative_solver.nb_started == 1
+        assert speculative_solver.nb_used == 1
+        assert speculative_solver.done_result(puzzle29()) == (status, moves)
+        assert speculative_solver.nb_used == 2
+        # Another puzzle has no result
+        assert await speculative_solver.result(puzzle) is None
+        assert speculative_solver.done_result(puzzle) is None
+
+    asyncio.run(scenario())
+
+
+def test_speculative_solver_debounce():
+    async def scenario():
+        speculative_solver = SpeculativeSolver(delay=10)
+        puzzle = puzzle_from_strings(["AABB", "BBAA", ""])
+        speculative_solver.update(puzzle)
+        waiting = asyncio.create_task(speculative_solver.result(puzzle))
+        await asyncio.sleep(0)
+        # Edits restart the solving before it starts
+        speculative_solver.update(puzzle_from_strings(["ABAB", "BABA", ""]))
+        assert await waiting is None
+        speculative_solver.update(None)
+        assert speculative_solver.nb_started == 0
+        assert speculative_solver.nb_cancelled == 2
+
+    asyncio.run(scenario())
+
+
+def test_speculative_solver_is_started():
+    async def scenario(executor):
+        gate = threading.Event()
+        executor.submit(gate.wait)  # The executor is busy with the job of another session
+        speculative_solver = SpeculativeSolver(delay=0, executor=executor)
+        puzzle = puzzle29()
+        assert not speculative_solver.is_started(puzzle)
+        speculative_solver.update(puzzle)
+        await asyncio.sleep(0.05)
+        assert speculative_solver.nb_started == 1  # Given to the executor...
+        assert not speculative_solver.is_started(puzzle)  # ... but waiting for its thread
+        gate.set()
+        status, _ = await speculative_solver.result(puzzle)
+        assert status == SolveStatus.SOLVED
+        assert speculative_solver.is_started(puzzle)
+        assert not speculative_solver.is_started(puzzle_from_strings(["AABB", "BBAA", ""]))
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        asyncio.run(scenario(executor))
+
+def test_speculative_solver_no_solution():
+    async def scenario():
+        speculative_solver = SpeculativeSolver(delay=0)
+        puzzle = puzzle_from_strings(["CBBA", "ABCC", "ACBA", ""])
+        speculative_solver.update(puzzle)
+        assert await speculative_solver.result(puzzle) == (SolveStatus.NO_SOLUTION, None)
+
+    asyncio.run(scenario())
+
+
+def test_speculative_solver_capacities():
+    # Sessions of different capacities solved at the same time by the executor threads
+    executor = ThreadPoolExecutor(max_workers=2)
+    puzzles = [
+        Level(capacity=capacity, bottles=bottles).to_puzzle()
+        for capacity, bottles in (
+            (2, ((1, 2), (2, 1), ())),
+            (6, ((1, 1, 1, 2, 2, 2), (2, 2, 2, 1, 1, 1), ())),
+        )
+    ]
+
+    async def scenario():
+        speculative_solvers = [SpeculativeSolver(delay=0, executor=executor) for _ in puzzles]
+        for speculative_solver, puzzle in zip(speculative_solvers, puzzles):
+            speculative_solver.update(puzzle)
+        for speculative_solver, puzzle in zip(speculative_solvers, puzzles):
+            status, moves = await speculative_solver.result(puzzle)
+            assert status == SolveStatus.SOLVED
+            for move in moves:
+                puzzle.pour(*move)
+            assert puzzle.is_done
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+    assert Bottle.MAX_DOSES == 4
+
+
+def test_solver_cancel():
+    solver = PuzzleSolver(puzzle29())
+    solver.cancel()
+    assert solver.solve() is None
+    assert solver.status == SolveStatus.TIMEOUT
+    assert solver.solve_beam() is None
+    assert solver.status == SolveStatus.TIMEOUT
+
+
+if __name__ == "__main__":
+
+    pytest.main()
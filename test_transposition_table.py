@@ -0,0 +1,103 @@
+#: coding:utf-8
+
+import collections
+
+import pytest
+
+from puzzle import Puzzle
+from puzzle_samples import puzzle29, puzzle_from_strings
+from puzzle_solver import PuzzleChain, PuzzleSolver
+from transposition_table import REPLACEMENT_POLICIES, TranspositionTable
+
+
+def test_transposition_table_probe_store():
+    table = TranspositionTable(8, "always")
+    assert not table.probe(3, 5)
+    table.store(3, 5)
+    assert table.probe(3, 5)
+    assert table.probe(3, 6)
+    assert not table.probe(3, 4)  # Found at a greater depth
+    table.store(3, 4)
+    assert table.probe(3, 4)
+    assert len(table) == 1
+    assert table.statistics()["hits"] == 3
+
+
+@pytest.mark.parametrize(
+    "policy, kept_keys",
+    [
+        ("always", [9]),  # The new puzzle replaces the old one
+        ("depth", [1]),  # The puzzle of lowest depth is kept
+        ("two-tier", [1, 9]),  # Both are kept
+    ],
+)
+def test_transposition_table_policies(policy, kept_keys):
+    table = TranspositionTable(8, policy)
+    # Same slots for the keys 1 and 9
+    table.store(1, 2)
+    table.store(9, 5)
+    assert [key for key in (1, 9) if table.probe(key, 10)] == kept_keys
+    assert table.statistics()["overwrites"] == 2 - len(kept_keys)
+    assert table.statistics()["collisions"] == 2 - len(kept_keys)
+
+
+def test_transposition_table_two_tier():
+    table = TranspositionTable(2, "two-tier")
+    table.store(1, 5)
+    table.store(2, 3)  # Lower depth: 1 moves to the 'always' slot
+    table.store(3, 7)  # Replaces 1 in the 'always' slot
+    assert table.probe(2, 10) and table.probe(3, 10) and not table.probe(1, 10)
+    assert table.nb_overwrites == 1
+
+
+def test_transposition_table_bad_policy():
+    with pytest.raises(ValueError):
+        TranspositionTable(8, "never")
+
+
+@pytest.mark.parametrize("policy", REPLACEMENT_POLICIES)
+@pytest.mark.parametrize("nb_entries", [16, 1 << 16])
+def test_solver_transposition_table(policy, nb_entries):
+    puzzle = puzzle29()
+    table = TranspositionTable(nb_entries, policy)
+    solver = PuzzleSolver(puzzle)
+    solution = solver.solve(nb_chains_without_empty_bottle=4, transposition_table=table)
+    assert solution is not None and solution.puzzle.is_done
+    assert len(solver.puzzle_chains_done) == 0
+    assert len(table) <= nb_entries
+    assert table.nb_stores == solver.nb_expanded_puzzles + solver.nb_dominated_puzzles
+    if nb_entries > 16:
+        assert solver.is_puzzle_already_done(puzzle)
+
+
+def test_solver_transposition_table_state_keys(monkeypatch):
+    # The cycle checks of a small table use the keys computed once per PuzzleChain
+    nb_state_keys = collections.Counter()
+    state_key = Puzzle.state_key
+    post_init = PuzzleChain.__post_init__
+
+    def counted_state_key(puzzle):
+        nb_state_keys["puzzle"] += 1
+        return state_key(puzzle)
+
+    def counted_post_init(puzzle_chain):
+        nb_state_keys["puzzle_chain"] += 1
+        post_init(puzzle_chain)
+
+    monkeypatch.setattr(Puzzle, "state_key", counted_state_key)
+    monkeypatch.setattr(PuzzleChain, "__post_init__", counted_post_init)
+    solver = PuzzleSolver(puzzle29())
+    solution = solver.solve(transposition_table=TranspositionTable(16))
+    assert solution is not None and solution.puzzle.is_done
+    assert nb_state_keys["puzzle"] == nb_state_keys["puzzle_chain"]
+    assert solution.state_key == solution.puzzle.state_key()
+
+
+def test_solver_transposition_table_no_solution():
+    solver = PuzzleSolver(puzzle_from_strings(["CBBA", "ABCC", "ACBA", ""]))
+    assert solver.solve(transposition_table=TranspositionTable(1024)) is None
+
+
+if __name__ == "__main__":
+
+    pytest.main()
@@ -0,0 +1,140 @@
+#: coding:utf-8
+
+import gc
+import weakref
+
+import pytest
+
+from web_components import (
+    ALL_COLORS,
+    SERVER_TIMES,
+    MyBottlePool,
+    do_update_bottle_dose_button_color,
+    get_my_color_from_id,
+    reset_my_bottle,
+    server_time,
+)
+
+
+class Dose:
+    """Dose button as used by the web components."""
+
+    def __init__(self):
+        self.color = None
+        self.style = ""
+        self.classes = set()
+        self.my_puzzle = None
+
+    def set_class(self, tw_class):
+        self.classes.add(tw_class)
+
+
+class MyBottle:
+    """Bottle component as created by justpy_puzzle_solver.MyBottle."""
+
+    def __init__(self, my_puzzle, i_bottle):
+        self.nb_doses = my_puzzle.nb_doses
+        self.doses = [Dose() for _ in range(my_puzzle.nb_doses)]
+        reset_my_bottle(self, my_puzzle, i_bottle)
+
+
+class Div:
+    def __init__(self):
+        self.removed = []
+
+    def remove_component(self, component):
+        self.removed.append(component)
+
+
+class MyPuzzle:
+    def __init__(self, nb_doses):
+        self.nb_doses = nb_doses
+        self.bottles = []
+        self.div_bottles = Div()
+
+
+def test_get_my_color_from_id():
+    for color in ALL_COLORS:
+        assert get_my_color_from_id(color.id) is color
+    assert get_my_color_from_id(len(ALL_COLORS)).html_color == "black"
+
+
+def test_server_time():
+    SERVER_TIMES.clear()
+    for name in ("page_load", "step", "step"):
+        with server_time(name):
+            pass
+    with pytest.raises(ValueError):
+        with server_time("step"):
+            raise ValueError("Failed step")
+    assert SERVER_TIMES["page_load"][0] == 1
+    assert SERVER_TIMES["step"][0] == 3
+    assert SERVER_TIMES["step"][1] >= 0.0
+    SERVER_TIMES.clear()
+
+
+def test_bottle_pool_reuse():
+    pool = MyBottlePool(10, MyBottle)
+    my_puzzle = MyPuzzle(4)
+    bottles = [pool.acquire(my_puzzle, i_bottle) for i_bottle in range(3)]
+    assert my_puzzle.bottles == bottles
+    assert pool.nb_created == 3
+    for dose in bottles[0].doses:
+        do_update_bottle_dose_button_color(dose, ALL_COLORS[1])
+
+    # Sizes change: the bottles are reused by the bottles of the same number of doses only
+    pool.release(my_puzzle)
+    assert my_puzzle.bottles == [] and my_puzzle.div_bottles.removed == bottles
+    assert pool.size == 3
+    my_puzzle.nb_doses = 5
+    assert pool.acquire(my_puzzle, 0) not in bottles
+    assert pool.nb_created == 4 and pool.nb_reused == 0
+    my_puzzle.nb_doses = 4
+    reused = [pool.acquire(my_puzzle, i_bottle) for i_bottle in range(3)]
+    assert set(map(id, reused)) == set(map(id, bottles))
+    assert pool.nb_created == 4 and pool.nb_reused == 3 and pool.size == 0
+
+    # A reused bottle is an empty bottle of the puzzle
+    for i_bottle, my_bottle in enumerate(reused):
+        assert my_bottle.text == f"Bottle #{i_bottle + 1}"
+        assert my_bottle.i_bottle == i_bottle
+        for dose in my_bottle.doses:
+            assert dose.color is None and "bg-black" in dose.classes
+            assert dose.my_puzzle is my_puzzle
+
+
+def test_bottle_pool_max_size():
+    pool = MyBottlePool(2, MyBottle)
+    my_puzzle = MyPuzzle(4)
+    for i_bottle in range(5):
+        pool.acquire(my_puzzle, i_bottle)
+    pool.release(my_puzzle)
+    assert pool.size == 2
+    assert sum(len(bottles) for bottles in pool.bottles.values()) == 2
+
+
+def test_bottle_pool_session_end():
+    # Page load of a new session after the end of another one: no new component
+    pool = MyBottlePool(10, MyBottle)
+    my_puzzle = MyPuzzle(4)
+    for i_bottle in range(5):
+        pool.acquire(my_puzzle, i_bottle)
+    pool.release(my_puzzle)  # MyWebPage.on_disconnect
+    session = weakref.ref(my_puzzle)
+    del my_puzzle
+    gc.collect()
+    assert session() is None  # The pool does not keep the session alive
+    for bottles in pool.bottles.values():
+        for my_bottle in bottles:
+            assert my_bottle.my_puzzle is None
+            assert all(dose.my_puzzle is None for dose in my_bottle.doses)
+
+    my_puzzle = MyPuzzle(4)
+    for i_bottle in range(5):
+        pool.acquire(my_puzzle, i_bottle)
+    assert pool.nb_created == 5 and pool.nb_reused == 5
+
+
+if __name__ == "__main__":
+
+    pytest.main()
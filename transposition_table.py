@@ -0,0 +1,139 @@
+#! coding:utf-8
+
+"""
+The transposition_table module is a fixed size table of the puzzles already explored.
+
+It is a memory bounded alternative to the set of the keys of the explored puzzles of
+PuzzleSolver (@see PuzzleSolver.solve): the table is an open addressing array of packed keys
+(64 bits hash of Puzzle.state_key) and depths that never grows.
+When the slots of a key are used by other puzzles, the replacement policy chooses the
+puzzle to forget:
+- 'always': the new puzzle always replaces the old one,
+- 'depth': the puzzle with the lowest depth is kept (its sub-tree is the largest),
+- 'two-tier': each key has two slots, a 'depth' one and an 'always' one.
+A forgotten puzzle may be explored again: the search is slower but not wrong.
+Only the 64 bits hash of a puzzle is kept (not its whole key): different puzzles with the same
+hash are seen as the same puzzle. Such a collision is very unlikely, but the unexplored puzzle
+is then taken as explored: its sub-tree is pruned and it may hide a solution (the search can
+report no solution or miss the shortest one).
+"""
+
+from __future__ import annotations
+
+from array import array
+from typing import Hashable
+
+# Replacement policies
+REPLACEMENT_POLICIES = ("always", "depth", "two-tier")
+
+_EMPTY_KEY = 0  # Key of an empty slot
+
+
+class TranspositionTable:
+    """
+    Fixed size table of (packed key, depth) of the explored puzzles.
+
+    nb_entries: number of puzzles in the table (each entry is 12 bytes).
+    policy: replacement policy (@see REPLACEMENT_POLICIES).
+    """
+
+    def __init__(self, nb_entries: int, policy: str = "two-tier") -> None:
+        if policy not in REPLACEMENT_POLICIES:
+            raise ValueError(f"Unknown replacement policy: {policy}")
+        if nb_entries < 2:
+            raise ValueError("A transposition table needs at least 2 entries")
+        self.policy = policy
+        self.bucket_size = 2 if policy == "two-tier" else 1
+        self.nb_buckets = nb_entries // self.bucket_size
+        self.keys = array("q", [_EMPTY_KEY]) * (self.nb_buckets * self.bucket_size)
+        self.depths = array("i", [0]) * (self.nb_buckets * self.bucket_size)
+        self.clear_statistics()
+
+    def clear_statistics(self) -> None:
+        """Reset the statistics."""
+        self.nb_probes = 0
+        self.nb_hits = 0  # Probes of a puzzle already in the table at a lower or equal depth
+        self.nb_collisions = 0  # Probes finding only other puzzles in the slots of the key
+        self.nb_stores = 0
+        self.nb_overwrites = 0  # Stores forgetting a puzzle (the old or the new one)
+
+    def clear(self) -> None:
+        """Remove all the puzzles (and reset the statistics)."""
+        self.keys[:] = array("q", [_EMPTY_KEY]) * len(self.keys)
+        self.clear_statistics()
+
+    @staticmethod
+    def pack_key(puzzle_key: Hashable) -> int:
+        """@return the packed (64 bits) key of a Puzzle.state_key."""
+        return hash(puzzle_key) or 1
+
+    def probe(self, packed_key: int, depth: int) -> bool:
+        """
+        @return True if the puzzle is in the table with a lower or equal depth
+        (or if another puzzle with the same packed key is, @see module docstring).
+        """
+        self.nb_probes += 1
+        i_slot = (packed_key % self.nb_buckets) * self.bucket_size
+        is_collision = False
+        for i in range(i_slot, i_slot + self.bucket_size):
+            key = self.keys[i]
+            if key == packed_key:
+                if self.depths[i] <= depth:
+                    self.nb_hits += 1
+                    return True
+                return False  # Found at a greater depth: to be explored again
+            if key != _EMPTY_KEY:
+                is_collision = True
+        if is_collision:
+            self.nb_collisions += 1
+        return False
+
+    def store(self, packed_key: int, depth: int) -> None:
+        """Store an explored puzzle, replacing another one according to the policy."""
+        self.nb_stores += 1
+        i_slot = (packed_key % self.nb_buckets) * self.bucket_size
+        for i in range(i_slot, i_slot + self.bucket_size):
+            if self.keys[i] == packed_key:
+                self.depths[i] = min(self.depths[i], depth)
+                return
+
+        if self.policy == "always":
+            i_store = i_slot
+        elif self.policy == "depth":
+            if self.keys[i_slot] != _EMPTY_KEY and self.depths[i_slot] < depth:
+                self.nb_overwrites += 1  # The new puzzle is forgotten
+                return
+            i_store = i_slot
+        elif self.keys[i_slot] == _EMPTY_KEY or depth <= self.depths[i_slot]:
+            # 'two-tier': the old puzzle of the 'depth' slot moves to the 'always' slot
+            if self.keys[i_slot] != _EMPTY_KEY:
+                if self.keys[i_slot + 1] != _EMPTY_KEY:
+                    self.nb_overwrites += 1
+                self.keys[i_slot + 1] = self.keys[i_slot]
+                self.depths[i_slot + 1] = self.depths[i_slot]
+                self.keys[i_slot] = _EMPTY_KEY
+            i_store = i_slot
+        else:
+            i_store = i_slot + 1
+
+        if self.keys[i_store] != _EMPTY_KEY:
+            self.nb_overwrites += 1
+        self.keys[i_store] = packed_key
+        self.depths[i_store] = depth
+
+    def statistics(self) -> dict[str, float]:
+        """@return counters and rates of the table (rates are per probe or per store)."""
+        return {
+            "probes": self.nb_probes,
+            "hits": self.nb_hits,
+            "collisions": self.nb_collisions,
+            "stores": self.nb_stores,
+            "overwrites": self.nb_overwrites,
+            "hit_rate": self.nb_hits / self.nb_probes if self.nb_probes else 0.0,
+            "collision_rate": self.nb_collisions / self.nb_probes if self.nb_probes else 0.0,
+            "overwrite_rate": self.nb_overwrites / self.nb_stores if self.nb_stores else 0.0,
+        }
+
+    def __len__(self) -> int:
+        """@return number of puzzles in the table."""
+        return sum(1 for key in self.keys if key != _EMPTY_KEY)
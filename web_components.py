@@ -0,0 +1,147 @@
+#! coding:utf-8
+
+"""
+The web_components module holds the parts of the web layer that do not depend on JustPy.
+
+justpy_puzzle_solver builds its pages with JustPy components: the color table, the reuse of
+the bottle components and the measures of the server time are kept here so that they can be
+imported (and tested) without JustPy.
+The components are only used through the attributes set by justpy_puzzle_solver:
+- a dose button has color, style, my_puzzle and set_class(),
+- a bottle has text, i_bottle, nb_doses, my_puzzle and doses (its dose buttons),
+- a puzzle has bottles (its bottle components) and div_bottles (None or the div of the bottles).
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+import contextlib
+from dataclasses import dataclass
+import time
+from typing import Any, Callable, Iterator, Optional
+
+
+@dataclass
+class MyColor:
+    """This class is used to store one possible puzzle color"""
+
+    id: int  # Unique color identifier
+    html_color: str  # color name when talking to HTML component
+    text_color: str  # color name when talking to the user
+
+
+# List of all possible colors proposed to the user
+ALL_COLORS: list[MyColor] = [
+    MyColor(0, "yellow", "Yellow"),
+    MyColor(1, "orange", "Orange"),
+    MyColor(2, "pink", "Pink"),
+    MyColor(3, "deeppink", "Deep pink"),
+    MyColor(4, "red", "Red"),
+    MyColor(5, "darkorchid", "Light purple"),
+    MyColor(6, "magenta", "Magenta"),
+    MyColor(7, "purple", "Purple"),
+    MyColor(8, "lightgrey", "Light grey"),
+    MyColor(9, "grey", "Grey"),
+    MyColor(10, "aquamarine", "Light green"),
+    MyColor(11, "chartreuse", "Green"),
+    MyColor(12, "green", "Dark green"),
+    MyColor(13, "cyan", "Light blue"),
+    MyColor(14, "cornflowerblue", "Blue"),
+    MyColor(15, "blue", "Dark blue"),
+    MyColor(16, "chocolate", "Light brown"),
+    MyColor(17, "brown", "Brown"),
+]
+
+
+# Colors by id (@see get_my_color_from_id)
+COLORS_BY_ID: dict[int, MyColor] = {color.id: color for color in ALL_COLORS}
+
+
+def get_my_color_from_id(id: int) -> MyColor:
+    """Return a MyColor instance having a specific id color"""
+    color = COLORS_BY_ID.get(id)
+    if color is None:
+        return MyColor(id, "black", "Black")
+    return color
+
+
+# Server time of the page operations: name -> [number of operations, total time in seconds]
+SERVER_TIMES: defaultdict[str, list] = defaultdict(lambda: [0, 0.0])
+
+
+@contextlib.contextmanager
+def server_time(name: str) -> Iterator[None]:
+    """Add the duration of the operation to the server time of the name (@see SERVER_TIMES)"""
+    time_start = time.perf_counter()
+    try:
+        yield
+    finally:
+        server_times = SERVER_TIMES[name]
+        server_times[0] += 1
+        server_times[1] += time.perf_counter() - time_start
+
+
+def do_update_bottle_dose_button_color(self: Any, color: Optional[MyColor]) -> None:
+    self.color = color
+    if color is not None:
+        self.style = f"background-color: {color.html_color}"
+    else:
+        self.style = "color: white"
+        self.set_class("bg-black")
+
+
+def reset_my_bottle(my_bottle: Any, my_puzzle: Any, i_bottle: int) -> None:
+    """(Re)use the bottle as an empty bottle of the puzzle"""
+    my_bottle.text = f"Bottle #{i_bottle + 1}"
+    my_bottle.i_bottle = i_bottle
+    my_bottle.my_puzzle = my_puzzle
+    my_puzzle.bottles.append(my_bottle)
+    for dose in my_bottle.doses:
+        dose.my_puzzle = my_puzzle
+        do_update_bottle_dose_button_color(dose, None)
+
+
+class MyBottlePool:
+    """
+    MyBottle components kept for reuse (by number of doses) when the puzzle sizes change or
+    when a session ends: a new puzzle reuses them instead of creating all its components again.
+
+    max_size: maximum number of kept bottles.
+    create_bottle: creation of a new bottle of the puzzle given (my_puzzle, i_bottle).
+    """
+
+    def __init__(self, max_size: int, create_bottle: Callable[[Any, int], Any]) -> None:
+        self.max_size = max_size
+        self.create_bottle = create_bottle
+        self.bottles: defaultdict[Optional[int], list[Any]] = defaultdict(list)
+        self.size = 0
+        # Statistics
+        self.nb_created = 0
+        self.nb_reused = 0
+
+    def acquire(self, my_puzzle: Any, i_bottle: int) -> Any:
+        """Return an empty bottle of the puzzle (reused if possible)"""
+        bottles = self.bottles[my_puzzle.nb_doses]
+        if bottles:
+            my_bottle = bottles.pop()
+            self.size -= 1
+            self.nb_reused += 1
+            reset_my_bottle(my_bottle, my_puzzle, i_bottle)
+        else:
+            my_bottle = self.create_bottle(my_puzzle, i_bottle)
+            self.nb_created += 1
+        return my_bottle
+
+    def release(self, my_puzzle: Any) -> None:
+        """Remove the bottles from the puzzle and keep them for reuse"""
+        for my_bottle in my_puzzle.bottles:
+            if my_puzzle.div_bottles is not None:
+                my_puzzle.div_bottles.remove_component(my_bottle)
+            # The pool must not keep the session alive
+            my_bottle.my_puzzle = None
+            for dose in my_bottle.doses:
+                dose.my_puzzle = None
+            if self.size < self.max_size:
+                self.bottles[my_bottle.nb_doses].append(my_bottle)
+                self.size += 1
+        my_puzzle.bottles = []